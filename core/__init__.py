@@ -3,17 +3,35 @@
 Package core per University Manager
 """
 
-from .models import Voto, Laurea, Tassa, Domanda, StatisticheVoti
+from .models import Voto, Laurea, Tassa, TassaRicorrente, Domanda, StatisticheVoti
+from .events import BusEventi, Evento, Azione
 from .database import Database
-from .calculator import CalcolatoreVoti, EsportatoreStatistiche
+from .calculator import (
+    CalcolatoreVoti, EsportatoreStatistiche, StatisticheIncrementali, RiepilogoTasse
+)
+from .materie import IndiceMaterie
+from .ricerca import RicercaIncrementale
+from .dedup import DeduplicatoreDomande
+from .ripasso import SchedulatoreRipasso, CampionatoreAlias
 
 __all__ = [
     'Voto',
     'Laurea',
     'Tassa',
+    'TassaRicorrente',
     'Domanda',
     'StatisticheVoti',
+    'BusEventi',
+    'Evento',
+    'Azione',
     'Database',
     'CalcolatoreVoti',
-    'EsportatoreStatistiche'
+    'EsportatoreStatistiche',
+    'StatisticheIncrementali',
+    'RiepilogoTasse',
+    'IndiceMaterie',
+    'RicercaIncrementale',
+    'DeduplicatoreDomande',
+    'SchedulatoreRipasso',
+    'CampionatoreAlias'
 ]
\ No newline at end of file
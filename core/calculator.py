@@ -1,12 +1,11 @@
 # core/calculator.py
 """
-Calcolatore di statistiche e proiezioni per i voti
+Calcolatore di statistiche e proiezioni per i voti (e riepilogo delle tasse)
 """
 
-from typing import List, Dict, Tuple
-import numpy as np
+from typing import Iterable, List, Dict, Tuple
 import datetime
-from .models import Voto, StatisticheVoti, Laurea
+from .models import Voto, StatisticheVoti, Laurea, Tassa
 
 
 class CalcolatoreVoti:
@@ -91,19 +90,21 @@ class CalcolatoreVoti:
         """
         Calcola la media progressiva esame dopo esame
         
+        Con somme correnti: O(n) anche per storici lunghi.
+        
         Args:
             voti: Lista di voti (devono essere ordinati cronologicamente)
             
         Returns:
             Lista di medie progressive
         """
-        if not voti:
-            return []
-        
         medie = []
-        for i in range(len(voti)):
-            voti_subset = voti[:i+1]
-            medie.append(CalcolatoreVoti.calcola_media(voti_subset))
+        somma_ponderata = 0
+        crediti = 0
+        for voto in voti:
+            somma_ponderata += voto.voto_numerico * voto.crediti
+            crediti += voto.crediti
+            medie.append(somma_ponderata / crediti)
         
         return medie
     
@@ -260,6 +261,9 @@ class CalcolatoreVoti:
         if not voti:
             return {'p25': 0, 'p50': 0, 'p75': 0}
         
+        # NumPy importato solo qui: non serve all'avvio
+        import numpy as np
+        
         voti_numerici = sorted([v.voto_numerico for v in voti])
         
         return {
@@ -329,6 +333,102 @@ class CalcolatoreVoti:
         }
 
 
+class StatisticheIncrementali:
+    """
+    Statistiche dei voti aggiornate un voto alla volta
+    
+    Tiene somme correnti e il conteggio di ogni voto (18-30), così
+    aggiungere o togliere un voto costa O(1), minimo e massimo compresi.
+    Il risultato coincide con CalcolatoreVoti.calcola_statistiche.
+    """
+    
+    def __init__(self, laurea: Laurea, voti: List[Voto] = ()):
+        self.laurea = laurea
+        self.somma_ponderata = 0
+        self.crediti = 0
+        self.esami = 0
+        self._conteggi = [0] * 31  # indice = voto numerico
+        for voto in voti:
+            self.aggiungi(voto)
+    
+    def aggiungi(self, voto: Voto):
+        """Aggiunge un voto alle statistiche"""
+        self.somma_ponderata += voto.voto_numerico * voto.crediti
+        self.crediti += voto.crediti
+        self.esami += 1
+        self._conteggi[voto.voto_numerico] += 1
+    
+    def rimuovi(self, voto: Voto):
+        """Toglie un voto eliminato dalle statistiche"""
+        self.somma_ponderata -= voto.voto_numerico * voto.crediti
+        self.crediti -= voto.crediti
+        self.esami -= 1
+        self._conteggi[voto.voto_numerico] -= 1
+    
+    def statistiche(self) -> StatisticheVoti:
+        """Statistiche correnti"""
+        if not self.esami:
+            return CalcolatoreVoti.calcola_statistiche([], self.laurea)
+        
+        media = self.somma_ponderata / self.crediti
+        presenti = [v for v in range(18, 31) if self._conteggi[v]]
+        
+        return StatisticheVoti(
+            media=media,
+            voto_laurea=CalcolatoreVoti.calcola_voto_laurea(media),
+            crediti_acquisiti=self.crediti,
+            crediti_totali=self.laurea.crediti_totali,
+            esami_sostenuti=self.esami,
+            percentuale_completamento=(self.crediti / self.laurea.crediti_totali) * 100,
+            voto_minimo=presenti[0],
+            voto_massimo=presenti[-1]
+        )
+
+
+class RiepilogoTasse:
+    """
+    Riepilogo delle tasse aggiornato una tassa alla volta
+    
+    Parte dal dizionario di Database.get_tasse_summary e lo tiene allineato
+    sommando o togliendo l'importo della tassa aggiunta, pagata o eliminata,
+    senza rileggere il database. La data di riferimento per le scadute è
+    quella del riepilogo di partenza.
+    """
+    
+    CAMPI = ('numero', 'totale_centesimi', 'da_pagare_centesimi', 'scadute', 'scaduto_centesimi')
+    
+    def __init__(self, riepilogo: dict, oggi: datetime.date = None):
+        self.valori = {campo: riepilogo[campo] for campo in self.CAMPI}
+        self.oggi = oggi or datetime.date.today()
+    
+    def _applica(self, tassa: Tassa, segno: int):
+        importo = segno * tassa.importo_centesimi
+        self.valori['numero'] += segno
+        self.valori['totale_centesimi'] += importo
+        if not tassa.pagata:
+            self.valori['da_pagare_centesimi'] += importo
+            if tassa.scadenza.date() < self.oggi:
+                self.valori['scadute'] += segno
+                self.valori['scaduto_centesimi'] += importo
+    
+    def aggiungi(self, tassa: Tassa):
+        """Conta una tassa aggiunta"""
+        self._applica(tassa, 1)
+    
+    def rimuovi(self, tassa: Tassa):
+        """Toglie una tassa eliminata"""
+        self._applica(tassa, -1)
+    
+    def sostituisci(self, vecchia: Tassa, nuova: Tassa):
+        """Una tassa cambiata (per esempio pagata): via la vecchia, dentro la nuova"""
+        self.rimuovi(vecchia)
+        self.aggiungi(nuova)
+    
+    def riepilogo(self) -> dict:
+        """Dizionario con le chiavi di Database.get_tasse_summary"""
+        return dict(self.valori)
+
+
 class EsportatoreStatistiche:
     """Esporta statistiche in vari formati"""
     
@@ -350,74 +450,27 @@ class EsportatoreStatistiche:
                 ])
     
     @staticmethod
-    def esporta_json(voti: List[Voto], filepath: str):
-        """Esporta voti in formato JSON"""
-        import json
-        
-        data = {
-            'voti': [v.to_dict() for v in voti],
-            'esportato_il': datetime.now().isoformat()
-        }
+    def esporta_json(voti: Iterable[Voto], filepath: str):
+        """Esporta voti in formato JSON (a flusso: voti può essere un generatore)"""
+        from utils.exporters import ScrittoreJSON
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        campi = {'esportato_il': datetime.datetime.now().isoformat()}
+        with ScrittoreJSON(filepath, chiave='voti', campi=campi) as scrittore:
+            scrittore.scrivi_tutte(voti)
     
     @staticmethod
-    def genera_report_html(voti: List[Voto], stats: StatisticheVoti, 
-                          laurea: Laurea, filepath: str):
-        """Genera un report HTML completo"""
-        html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Report Voti - {laurea.nome}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 20px; }}
-        h1 {{ color: #2196F3; }}
-        .stats {{ background: #f5f5f5; padding: 15px; border-radius: 5px; }}
-        table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-        th, td {{ padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }}
-        th {{ background: #2196F3; color: white; }}
-    </style>
-</head>
-<body>
-    <h1>Report Voti - {laurea.nome}</h1>
-    
-    <div class="stats">
-        <h2>Statistiche</h2>
-        <p><strong>Media:</strong> {stats.media_display}</p>
-        <p><strong>Voto di Laurea:</strong> {stats.voto_laurea}/110</p>
-        <p><strong>Crediti:</strong> {stats.crediti_acquisiti}/{stats.crediti_totali} 
-           ({stats.percentuale_display})</p>
-        <p><strong>Esami sostenuti:</strong> {stats.esami_sostenuti}</p>
-    </div>
-    
-    <h2>Elenco Voti</h2>
-    <table>
-        <tr>
-            <th>Materia</th>
-            <th>Data</th>
-            <th>Crediti</th>
-            <th>Voto</th>
-        </tr>
-"""
-        
-        for voto in voti:
-            html += f"""
-        <tr>
-            <td>{voto.materia}</td>
-            <td>{voto.data_formattata}</td>
-            <td>{voto.crediti}</td>
-            <td>{voto.voto_display}</td>
-        </tr>
-"""
+    def genera_report_html(voti: Iterable[Voto], stats: StatisticheVoti, 
+                          laurea: Laurea, filepath: str, grafico: bool = False):
+        """Genera un report HTML completo (vedi utils.report_html)"""
+        from utils.report_html import genera_report_voti
         
-        html += """
-    </table>
-</body>
-</html>
-"""
+        genera_report_voti(voti, stats, laurea, filepath, grafico=grafico)
+    
+    @staticmethod
+    def esporta_formati(voti: Iterable[Voto], laurea: Laurea, cartella,
+                        formati: Iterable[str] = ('csv', 'json', 'html', 'pdf'),
+                        stats: StatisticheVoti = None, grafico: bool = False) -> Dict:
+        """Più formati con una sola lettura dei voti (vedi utils.pipeline)"""
+        from utils.pipeline import esporta_formati
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html)
\ No newline at end of file
+        return esporta_formati(voti, laurea, cartella, formati, stats=stats, grafico=grafico)
\ No newline at end of file
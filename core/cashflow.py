@@ -0,0 +1,124 @@
+# core/cashflow.py
+"""
+Previsione mensile dei flussi di cassa delle tasse
+
+NumPy viene importato al primo calcolo (sul caricatore), non all'import
+del modulo.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, List
+
+from .models import aggiungi_mesi
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def indice_mese(giorno: date) -> int:
+    """Indice assoluto di un mese (anno * 12 + mese - 1)"""
+    return giorno.year * 12 + giorno.month - 1
+
+
+@dataclass
+class PrevisioneCassa:
+    """
+    Importi per mese, pronti per un grafico
+
+    Tutti gli array hanno un elemento per mese e sono in centesimi (int64).
+    """
+    mesi: np.ndarray  # datetime64[M]
+    dovuto: np.ndarray  # tasse in scadenza nel mese
+    pagato: np.ndarray  # pagamenti registrati nel mese
+    da_pagare: np.ndarray  # tasse in scadenza nel mese non ancora pagate
+    dovuto_cumulato: np.ndarray
+    pagato_cumulato: np.ndarray
+    da_pagare_cumulato: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.mesi)
+
+    @property
+    def totale_da_pagare(self) -> int:
+        """Centesimi ancora da pagare nell'orizzonte"""
+        return int(self.da_pagare_cumulato[-1]) if len(self) else 0
+
+    def mese_di_picco(self) -> int:
+        """Posizione del mese con più importo da pagare (-1 se non c'è nulla)"""
+        if not len(self) or not self.da_pagare.any():
+            return -1
+        return int(self.da_pagare.argmax())
+
+
+def prevedi_flussi(db, da: date = None, mesi: int = 12) -> PrevisioneCassa:
+    """
+    Previsione dei flussi delle tasse mese per mese
+
+    Le tasse salvate arrivano già raggruppate per mese da una sola query;
+    le rate ricorrenti non salvate vengono distribuite nei mesi con
+    aritmetica NumPy, senza generarle una per una.
+
+    Args:
+        db: Database
+        da: Un giorno del primo mese (default: mese corrente)
+        mesi: Numero di mesi dell'orizzonte (anche anni o decenni)
+
+    Returns:
+        PrevisioneCassa con mensili e cumulati
+    """
+    if mesi <= 0:
+        raise ValueError(f"Orizzonte deve essere positivo, ricevuto: {mesi}")
+
+    import numpy as np
+
+    primo = (da or date.today()).replace(day=1)
+    ultimo = aggiungi_mesi(primo, mesi) - timedelta(days=1)
+    base = indice_mese(primo)
+
+    dovuto = np.zeros(mesi, dtype=np.int64)
+    pagato = np.zeros(mesi, dtype=np.int64)
+    da_pagare = np.zeros(mesi, dtype=np.int64)
+
+    # Tasse salvate: una riga per mese con movimenti
+    righe = db.get_flussi_mensili(primo, ultimo)
+    if righe:
+        flussi = np.array(righe, dtype=np.int64)
+        posizioni = flussi[:, 0] - base
+        dovuto[posizioni] = flussi[:, 1]
+        pagato[posizioni] = flussi[:, 2]
+        da_pagare[posizioni] = flussi[:, 3]
+
+    # Rate ricorrenti non salvate: sempre da pagare
+    salvate: Dict[int, List[int]] = {}
+    for ricorrenza_id, occorrenza in db.get_rate_salvate():
+        salvate.setdefault(ricorrenza_id, []).append(occorrenza)
+
+    for regola in db.get_tasse_ricorrenti():
+        inizio = indice_mese(regola.inizio)
+        prima = max(0, -(-(base - inizio) // regola.intervallo_mesi))
+        ultima = min(regola.ultima_occorrenza(),
+                     (base + mesi - 1 - inizio) // regola.intervallo_mesi)
+        if ultima < prima:
+            continue
+
+        occorrenze = np.arange(prima, ultima + 1)
+        if regola.id in salvate:
+            occorrenze = occorrenze[~np.isin(occorrenze, salvate[regola.id])]
+
+        posizioni = inizio + occorrenze * regola.intervallo_mesi - base
+        importi = np.bincount(posizioni, minlength=mesi)[:mesi] * regola.importo_centesimi
+        dovuto += importi
+        da_pagare += importi
+
+    return PrevisioneCassa(
+        mesi=np.datetime64(primo.strftime('%Y-%m'), 'M') + np.arange(mesi),
+        dovuto=dovuto,
+        pagato=pagato,
+        da_pagare=da_pagare,
+        dovuto_cumulato=np.cumsum(dovuto),
+        pagato_cumulato=np.cumsum(pagato),
+        da_pagare_cumulato=np.cumsum(da_pagare)
+    )
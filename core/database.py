@@ -3,13 +3,83 @@
 Gestione database SQLite per University Manager
 """
 
+import heapq
 import sqlite3
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
+from typing import Iterator, List, Optional
+from datetime import date, datetime, timedelta
 import os
 
-from .models import Voto, Laurea, Tassa, Domanda
+from .models import Voto, Laurea, Tassa, TassaRicorrente, Domanda, euro_in_centesimi
+from .events import BusEventi, Evento, Azione, LAUREE, VOTI, TASSE, RICORRENTI, DOMANDE
+from .ricerca import normalizza_ricerca
+
+
+# Tabelle leggibili per intero con scorri_tabella (i nomi non arrivano mai
+# come parametri SQL, quindi vanno controllati qui)
+TABELLE_ESPORTABILI = ('lauree', 'voti', 'tasse', 'tasse_ricorrenti', 'domande')
+
+# Righe lette per ogni fetchmany nelle letture a flusso
+DIMENSIONE_BLOCCO = 500
+
+# Byte letti e scritti per volta quando si copia un backup
+DIMENSIONE_COPIA = 1024 * 1024
+
+# Primi byte di ogni file di database SQLite
+_INTESTAZIONE_SQLITE = b'SQLite format 3\x00'
+
+# Tasse con urgenza e giorni alla scadenza calcolati rispetto a :oggi,
+# un'unica data di riferimento per tutta la query
+_SELECT_TASSE = '''
+    SELECT *,
+        CAST(julianday(scadenza) - julianday(:oggi) AS INTEGER) AS giorni_rimanenti,
+        CASE
+            WHEN pagata THEN 'pagata'
+            WHEN scadenza < :oggi THEN 'scaduta'
+            WHEN scadenza <= date(:oggi, '+7 days') THEN 'in_scadenza'
+            ELSE 'futura'
+        END AS urgenza
+    FROM tasse
+'''
+
+
+_CREATE_TASSE = '''
+    CREATE TABLE IF NOT EXISTS {tabella} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        descrizione TEXT NOT NULL,
+        importo_centesimi INTEGER NOT NULL
+            CHECK(typeof(importo_centesimi) = 'integer' AND importo_centesimi > 0),
+        scadenza DATE NOT NULL,
+        pagata BOOLEAN DEFAULT 0,
+        data_pagamento DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ricorrenza_id INTEGER REFERENCES tasse_ricorrenti(id) ON DELETE SET NULL,
+        occorrenza INTEGER
+    )
+'''
+
+
+def _data_riferimento(oggi: date = None) -> str:
+    """Data di riferimento per le query sulle scadenze, in formato SQL"""
+    return (oggi or date.today()).strftime('%Y-%m-%d')
+
+
+def _classifica_rata(tassa: Tassa, oggi: date = None) -> Tassa:
+    """
+    Urgenza e giorni alla scadenza di una rata virtuale (non pagata)
+    
+    Stesse regole di _SELECT_TASSE, rispetto alla stessa data di riferimento.
+    """
+    oggi = oggi or date.today()
+    scadenza = tassa.scadenza.date()
+    tassa.giorni_rimanenti = (scadenza - oggi).days
+    if scadenza < oggi:
+        tassa.urgenza = 'scaduta'
+    elif scadenza <= oggi + timedelta(days=7):
+        tassa.urgenza = 'in_scadenza'
+    else:
+        tassa.urgenza = 'futura'
+    return tassa
 
 
 class Database:
@@ -31,17 +101,49 @@ class Database:
         
         self.db_path = Path(db_path)
         self.conn = None
+        # Eventi di modifica, pubblicati dopo ogni commit
+        self.eventi = BusEventi()
         self._init_database()
     
+    @classmethod
+    def sola_lettura(cls, db_path) -> 'Database':
+        """
+        Connessione in sola lettura a un database già inizializzato
+        
+        Non esegue _init_database (né PRAGMA, né DDL, né migrazioni, né
+        commit): serve ai thread di lettura, che così non contendono il
+        lock al thread principale. Ogni scrittura fallisce con
+        sqlite3.OperationalError.
+        """
+        db = cls.__new__(cls)
+        db.db_path = Path(db_path)
+        db.eventi = BusEventi()
+        # Usata da un solo thread, ma chiusa da chi la ha aperta (vedi
+        # CaricatoreAsincrono.chiudi), quindi senza il controllo del thread
+        db.conn = sqlite3.connect(f"{db.db_path.resolve().as_uri()}?mode=ro", uri=True,
+                                  check_same_thread=False)
+        db._configura_connessione()
+        return db
+    
+    def _configura_connessione(self):
+        """Impostazioni di ogni connessione, anche di quelle in sola lettura"""
+        self.conn.row_factory = sqlite3.Row
+        # Stessa normalizzazione della ricerca in memoria (lower() di SQLite
+        # ignora le lettere accentate)
+        self.conn.create_function('casefold', 1, normalizza_ricerca, deterministic=True)
+    
     def _init_database(self):
         """Inizializza il database con le tabelle necessarie"""
         self.conn = sqlite3.connect(str(self.db_path))
-        self.conn.row_factory = sqlite3.Row
+        self._configura_connessione()
         cursor = self.conn.cursor()
         
         # Abilita foreign keys
         cursor.execute('PRAGMA foreign_keys = ON')
         
+        # Journal WAL: le letture in background non bloccano le scritture
+        cursor.execute('PRAGMA journal_mode = WAL')
+        
         # Tabella Lauree
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS lauree (
@@ -78,23 +180,59 @@ class Database:
             ON voti(data)
         ''')
         
-        # Tabella Tasse
+        # Regole delle tasse ricorrenti: le rate si calcolano al bisogno
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tasse (
+            CREATE TABLE IF NOT EXISTS tasse_ricorrenti (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 descrizione TEXT NOT NULL,
-                importo REAL NOT NULL CHECK(importo > 0),
-                scadenza DATE NOT NULL,
-                pagata BOOLEAN DEFAULT 0,
-                data_pagamento DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                importo_centesimi INTEGER NOT NULL
+                    CHECK(typeof(importo_centesimi) = 'integer' AND importo_centesimi > 0),
+                inizio DATE NOT NULL,
+                intervallo_mesi INTEGER NOT NULL DEFAULT 1 CHECK(intervallo_mesi > 0),
+                occorrenze INTEGER CHECK(occorrenze > 0),
+                fino_a DATE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                CHECK(occorrenze IS NOT NULL OR fino_a IS NOT NULL)
             )
         ''')
         
-        # Indice per scadenze tasse
+        # Tabella Tasse (importi in centesimi interi)
+        cursor.execute(_CREATE_TASSE.format(tabella='tasse'))
+        
+        # Database creati prima dei centesimi: importo REAL in euro
+        colonne_tasse = self._colonne('tasse')
+        if 'importo' in colonne_tasse:
+            self._migra_tasse_centesimi()
+        elif 'ricorrenza_id' not in colonne_tasse:
+            cursor.execute('''
+                ALTER TABLE tasse ADD COLUMN ricorrenza_id INTEGER
+                REFERENCES tasse_ricorrenti(id) ON DELETE SET NULL
+            ''')
+            cursor.execute('ALTER TABLE tasse ADD COLUMN occorrenza INTEGER')
+        
+        # Una sola riga salvata per ogni rata di una serie
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_tasse_rata 
+            ON tasse(ricorrenza_id, occorrenza) WHERE ricorrenza_id IS NOT NULL
+        ''')
+        
+        # Indice per scadenze tasse, coprente per i totali per mese
+        cursor.execute('DROP INDEX IF EXISTS idx_tasse_scadenza')
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_tasse_scadenza 
-            ON tasse(scadenza)
+            CREATE INDEX IF NOT EXISTS idx_tasse_scadenza_importi 
+            ON tasse(scadenza, pagata, importo_centesimi)
+        ''')
+        
+        # Indice parziale: solo le tasse ancora da pagare
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tasse_non_pagate 
+            ON tasse(scadenza) WHERE pagata = 0
+        ''')
+        
+        # Indice parziale coprente per i pagamenti per mese (previsione dei flussi)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tasse_pagamenti 
+            ON tasse(data_pagamento, pagata, importo_centesimi) WHERE pagata = 1
         ''')
         
         # Tabella Domande
@@ -115,8 +253,91 @@ class Database:
             ON domande(materia, anno)
         ''')
         
+        # Indice per il filtro per solo anno (ordinato per materia)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_domande_anno_materia 
+            ON domande(anno, materia)
+        ''')
+        
+        # Firme MinHash per il rilevamento dei duplicati
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS domande_minhash (
+                domanda_id INTEGER PRIMARY KEY,
+                firma BLOB NOT NULL,
+                FOREIGN KEY (domanda_id) REFERENCES domande(id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Stato di ripasso (SM-2) delle domande
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ripasso_schede (
+                domanda_id INTEGER PRIMARY KEY,
+                ease REAL NOT NULL DEFAULT 2.5,
+                intervallo REAL NOT NULL DEFAULT 0,
+                ripetizioni INTEGER NOT NULL DEFAULT 0,
+                scadenza TIMESTAMP NOT NULL,
+                FOREIGN KEY (domanda_id) REFERENCES domande(id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Storico delle risposte di ripasso
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ripasso_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                domanda_id INTEGER NOT NULL,
+                voto INTEGER NOT NULL CHECK(voto >= 0 AND voto <= 5),
+                data TIMESTAMP NOT NULL,
+                intervallo REAL NOT NULL,
+                FOREIGN KEY (domanda_id) REFERENCES domande(id) ON DELETE CASCADE
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_ripasso_log_domanda 
+            ON ripasso_log(domanda_id)
+        ''')
+        
         self.conn.commit()
     
+    def _colonne(self, tabella: str) -> List[str]:
+        """Nomi delle colonne di una tabella"""
+        cursor = self.conn.cursor()
+        cursor.execute(f'PRAGMA table_info({tabella})')
+        return [row['name'] for row in cursor.fetchall()]
+    
+    def _migra_tasse_centesimi(self):
+        """
+        Converte tasse.importo (REAL in euro) in tasse.importo_centesimi (INTEGER)
+        
+        SQLite non permette di cambiare tipo o CHECK di una colonna: la tabella
+        viene ricreata e copiata in una sola transazione. Gli indici vengono
+        ricreati subito dopo da _init_database.
+        
+        Il vecchio CHECK chiedeva solo importo > 0: un importo sotto il mezzo
+        centesimo arrotonderebbe a 0 e violerebbe il nuovo CHECK, quindi
+        diventa 1 centesimo. Se la copia fallisce la transazione viene
+        annullata e la vecchia tabella resta com'era.
+        """
+        try:
+            self.conn.executescript(f'''
+                BEGIN;
+                {_CREATE_TASSE.format(tabella='tasse_centesimi')};
+                INSERT INTO tasse_centesimi
+                    (id, descrizione, importo_centesimi, scadenza, pagata, data_pagamento,
+                     created_at)
+                SELECT id, descrizione, MAX(1, CAST(ROUND(importo * 100) AS INTEGER)),
+                       scadenza, pagata, data_pagamento, created_at
+                FROM tasse;
+                DROP TABLE tasse;
+                ALTER TABLE tasse_centesimi RENAME TO tasse;
+                COMMIT;
+            ''')
+        except sqlite3.Error:
+            # executescript lascia aperta la transazione dello script fallito
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            raise
+    
     # ========================================================================
     # OPERAZIONI LAUREE
     # ========================================================================
@@ -135,9 +356,11 @@ class Database:
                 (nome, tipo, crediti_totali)
             )
             self.conn.commit()
-            return cursor.lastrowid
         except sqlite3.IntegrityError:
             raise ValueError(f"Esiste già una laurea con nome '{nome}'")
+        
+        self.eventi.pubblica(Evento(LAUREE, Azione.AGGIUNTA, (cursor.lastrowid,)))
+        return cursor.lastrowid
     
     def get_all_lauree(self) -> List[Laurea]:
         """Recupera tutte le lauree ordinate per nome"""
@@ -189,12 +412,15 @@ class Database:
             query = f"UPDATE lauree SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, params)
             self.conn.commit()
+            self.eventi.pubblica(Evento(LAUREE, Azione.MODIFICA, (laurea_id,)))
     
     def delete_laurea(self, laurea_id: int):
         """Elimina una laurea e tutti i voti associati (CASCADE)"""
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM lauree WHERE id = ?', (laurea_id,))
         self.conn.commit()
+        self.eventi.pubblica(Evento(LAUREE, Azione.ELIMINAZIONE, (laurea_id,)))
+        self.eventi.pubblica(Evento(VOTI, Azione.ELIMINAZIONE, laurea_id=laurea_id))
     
     # ========================================================================
     # OPERAZIONI VOTI
@@ -214,6 +440,7 @@ class Database:
             (materia, data.strftime('%Y-%m-%d'), crediti, voto, laurea_id)
         )
         self.conn.commit()
+        self.eventi.pubblica(Evento(VOTI, Azione.AGGIUNTA, (cursor.lastrowid,), laurea_id))
         return cursor.lastrowid
     
     def get_voti_by_laurea(self, laurea_id: int) -> List[Voto]:
@@ -276,12 +503,23 @@ class Database:
             query = f"UPDATE voti SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, params)
             self.conn.commit()
+            self.eventi.pubblica(Evento(VOTI, Azione.MODIFICA, (voto_id,),
+                                        self._laurea_del_voto(voto_id)))
     
     def delete_voto(self, voto_id: int):
         """Elimina un voto"""
+        laurea_id = self._laurea_del_voto(voto_id)
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM voti WHERE id = ?', (voto_id,))
         self.conn.commit()
+        self.eventi.pubblica(Evento(VOTI, Azione.ELIMINAZIONE, (voto_id,), laurea_id))
+    
+    def _laurea_del_voto(self, voto_id: int) -> Optional[int]:
+        """Corso di un voto, per gli eventi (None se il voto non esiste)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT laurea_id FROM voti WHERE id = ?', (voto_id,))
+        row = cursor.fetchone()
+        return row['laurea_id'] if row else None
     
     # ========================================================================
     # OPERAZIONI TASSE
@@ -291,50 +529,196 @@ class Database:
         """
         Aggiunge una nuova tassa
         
+        Args:
+            importo: Importo in euro, salvato in centesimi interi
+        
         Returns:
             ID della tassa creata
         """
         cursor = self.conn.cursor()
         cursor.execute(
-            'INSERT INTO tasse (descrizione, importo, scadenza) VALUES (?, ?, ?)',
-            (descrizione, importo, scadenza.strftime('%Y-%m-%d'))
+            'INSERT INTO tasse (descrizione, importo_centesimi, scadenza) VALUES (?, ?, ?)',
+            (descrizione, euro_in_centesimi(importo), scadenza.strftime('%Y-%m-%d'))
         )
         self.conn.commit()
+        self.eventi.pubblica(Evento(TASSE, Azione.AGGIUNTA, (cursor.lastrowid,)))
         return cursor.lastrowid
     
-    def get_all_tasse(self, ordina_per_scadenza: bool = True) -> List[Tassa]:
-        """Recupera tutte le tasse"""
-        cursor = self.conn.cursor()
-        query = 'SELECT * FROM tasse'
+    def get_all_tasse(self, ordina_per_scadenza: bool = True,
+                      oggi: date = None, a: date = None) -> List[Tassa]:
+        """
+        Recupera tutte le tasse con l'urgenza calcolata in SQL
+        
+        Include le rate delle tasse ricorrenti non ancora salvate, fino
+        alla scadenza a: una serie lunga genera una rata per occorrenza,
+        quindi le liste mostrate dovrebbero sempre passare un orizzonte.
+        
+        Args:
+            ordina_per_scadenza: Ordina per stato di pagamento e scadenza
+            oggi: Data di riferimento per l'urgenza (default: oggi)
+            a: Ultima scadenza delle rate non salvate (None: fino alla
+                fine di ogni serie)
+        """
+        query = _SELECT_TASSE
         if ordina_per_scadenza:
             query += ' ORDER BY pagata, scadenza'
         
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        cursor = self.conn.cursor()
+        cursor.execute(query, {'oggi': _data_riferimento(oggi)})
+        salvate = (self._tassa_da_row(row) for row in cursor.fetchall())
+        virtuali = self.get_rate_virtuali(a=a, oggi=oggi)
         
-        return [Tassa(
-            id=row['id'],
-            descrizione=row['descrizione'],
-            importo=row['importo'],
-            scadenza=datetime.strptime(row['scadenza'], '%Y-%m-%d'),
-            pagata=bool(row['pagata']),
-            data_pagamento=datetime.strptime(row['data_pagamento'], '%Y-%m-%d') 
-                          if row['data_pagamento'] else None
-        ) for row in rows]
+        if ordina_per_scadenza:
+            # Entrambe le sequenze sono già ordinate: basta una fusione
+            return list(heapq.merge(salvate, virtuali, key=lambda t: (t.pagata, t.scadenza)))
+        return list(salvate) + list(virtuali)
     
-    def get_tasse_non_pagate(self) -> List[Tassa]:
-        """Recupera solo le tasse non pagate"""
+    def get_tasse_non_pagate(self, oggi: date = None, a: date = None) -> List[Tassa]:
+        """
+        Recupera solo le tasse non pagate (rate ricorrenti comprese)
+        
+        Args:
+            oggi: Data di riferimento per l'urgenza (default: oggi)
+            a: Ultima scadenza delle rate non salvate (None: fino alla
+                fine di ogni serie)
+        """
         cursor = self.conn.cursor()
-        cursor.execute('SELECT * FROM tasse WHERE pagata = 0 ORDER BY scadenza')
-        rows = cursor.fetchall()
+        cursor.execute(
+            _SELECT_TASSE + ' WHERE pagata = 0 ORDER BY scadenza',
+            {'oggi': _data_riferimento(oggi)}
+        )
+        salvate = (self._tassa_da_row(row) for row in cursor.fetchall())
+        return list(heapq.merge(salvate, self.get_rate_virtuali(a=a, oggi=oggi),
+                                key=lambda t: t.scadenza))
+    
+    def get_tassa_by_id(self, tassa_id: int, oggi: date = None) -> Optional[Tassa]:
+        """Recupera una tassa per ID"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            _SELECT_TASSE + ' WHERE id = :id',
+            {'oggi': _data_riferimento(oggi), 'id': tassa_id}
+        )
+        row = cursor.fetchone()
+        return self._tassa_da_row(row) if row else None
+    
+    def get_tasse_in_finestra(self, da: Optional[date], a: date,
+                              oggi: date = None) -> List[Tassa]:
+        """
+        Recupera le tasse non pagate con scadenza in una finestra di date
+        
+        Usa l'indice parziale sulle tasse non pagate, quindi il costo non
+        dipende dallo storico delle tasse già pagate. Delle tasse ricorrenti
+        vengono generate solo le rate nella finestra.
+        
+        Args:
+            da: Prima scadenza inclusa (None per includere tutte le scadute)
+            a: Ultima scadenza inclusa
+            oggi: Data di riferimento per l'urgenza (default: oggi)
+        """
+        params = {'oggi': _data_riferimento(oggi), 'a': a.strftime('%Y-%m-%d')}
+        query = _SELECT_TASSE + ' WHERE pagata = 0 AND scadenza <= :a'
+        if da is not None:
+            query += ' AND scadenza >= :da'
+            params['da'] = da.strftime('%Y-%m-%d')
+        query += ' ORDER BY scadenza'
+        
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        salvate = (self._tassa_da_row(row) for row in cursor.fetchall())
+        virtuali = self.get_rate_virtuali(da, a, oggi)
+        return list(heapq.merge(salvate, virtuali, key=lambda t: t.scadenza))
+    
+    def get_tasse_summary(self, oggi: date = None) -> dict:
+        """
+        Riepilogo degli importi delle tasse in una sola query aggregata
         
-        return [Tassa(
+        Le somme sono su interi, quindi esatte. Le rate ricorrenti non
+        salvate si contano per regola, senza generarle (vedi
+        _conta_rate_virtuali).
+        
+        Returns:
+            Dizionario con numero, totale_centesimi, da_pagare_centesimi,
+            scadute (numero) e scaduto_centesimi
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT
+                COUNT(*) AS numero,
+                COALESCE(SUM(importo_centesimi), 0) AS totale_centesimi,
+                COALESCE(SUM(CASE WHEN pagata = 0 THEN importo_centesimi ELSE 0 END), 0)
+                    AS da_pagare_centesimi,
+                COALESCE(SUM(CASE WHEN pagata = 0 AND scadenza < :oggi
+                                  THEN 1 ELSE 0 END), 0) AS scadute,
+                COALESCE(SUM(CASE WHEN pagata = 0 AND scadenza < :oggi
+                                  THEN importo_centesimi ELSE 0 END), 0) AS scaduto_centesimi
+            FROM tasse
+        ''', {'oggi': _data_riferimento(oggi)})
+        riepilogo = dict(cursor.fetchone())
+        
+        # Rate ricorrenti non salvate: tutte da pagare
+        for regola, rate, scadute in self._conta_rate_virtuali(oggi):
+            riepilogo['numero'] += rate
+            riepilogo['totale_centesimi'] += rate * regola.importo_centesimi
+            riepilogo['da_pagare_centesimi'] += rate * regola.importo_centesimi
+            riepilogo['scadute'] += scadute
+            riepilogo['scaduto_centesimi'] += scadute * regola.importo_centesimi
+        return riepilogo
+    
+    def conta_tasse_non_pagate(self, oggi: date = None) -> int:
+        """Numero di tasse non pagate, rate ricorrenti comprese (senza generarle)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM tasse WHERE pagata = 0')
+        return cursor.fetchone()[0] + sum(rate for _, rate, _ in self._conta_rate_virtuali(oggi))
+    
+    def _conta_rate_virtuali(self, oggi: date = None) -> List[tuple]:
+        """
+        Rate non salvate di ogni regola, contate in aritmetica
+        
+        Per regola: rate della serie meno quelle salvate in tasse; per le
+        scadute, rate prima di oggi meno quelle salvate tra esse. Il costo
+        dipende dal numero di regole e di rate salvate, non dalla lunghezza
+        delle serie.
+        
+        Returns:
+            Lista di tuple (regola, rate non salvate, di cui scadute)
+        """
+        regole = self.get_tasse_ricorrenti()
+        if not regole:
+            return []
+        
+        salvate = {}
+        for ricorrenza_id, occorrenza in self.get_rate_salvate():
+            salvate.setdefault(ricorrenza_id, []).append(occorrenza)
+        
+        oggi = datetime.combine(oggi or date.today(), datetime.min.time())
+        conteggi = []
+        for regola in regole:
+            numero = regola.ultima_occorrenza() + 1
+            prima_di_oggi = regola.rate_prima_di(oggi)
+            occorrenze = [o for o in salvate.get(regola.id, ()) if 0 <= o < numero]
+            conteggi.append((
+                regola,
+                numero - len(occorrenze),
+                prima_di_oggi - sum(1 for o in occorrenze if o < prima_di_oggi)
+            ))
+        return conteggi
+    
+    @staticmethod
+    def _tassa_da_row(row) -> Tassa:
+        """Crea una Tassa da una riga di _SELECT_TASSE"""
+        return Tassa(
             id=row['id'],
             descrizione=row['descrizione'],
-            importo=row['importo'],
+            importo_centesimi=row['importo_centesimi'],
             scadenza=datetime.strptime(row['scadenza'], '%Y-%m-%d'),
-            pagata=False
-        ) for row in rows]
+            pagata=bool(row['pagata']),
+            data_pagamento=datetime.strptime(row['data_pagamento'], '%Y-%m-%d') 
+                          if row['data_pagamento'] else None,
+            urgenza=row['urgenza'],
+            giorni_rimanenti=row['giorni_rimanenti'],
+            ricorrenza_id=row['ricorrenza_id'],
+            occorrenza=row['occorrenza']
+        )
     
     def update_tassa(self, tassa_id: int, descrizione: str = None,
                     importo: float = None, scadenza: datetime = None):
@@ -347,8 +731,8 @@ class Database:
             updates.append('descrizione = ?')
             params.append(descrizione)
         if importo is not None:
-            updates.append('importo = ?')
-            params.append(importo)
+            updates.append('importo_centesimi = ?')
+            params.append(euro_in_centesimi(importo))
         if scadenza is not None:
             updates.append('scadenza = ?')
             params.append(scadenza.strftime('%Y-%m-%d'))
@@ -358,6 +742,7 @@ class Database:
             query = f"UPDATE tasse SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, params)
             self.conn.commit()
+            self.eventi.pubblica(Evento(TASSE, Azione.MODIFICA, (tassa_id,)))
     
     def toggle_pagamento_tassa(self, tassa_id: int):
         """Cambia lo stato di pagamento di una tassa"""
@@ -370,12 +755,201 @@ class Database:
             (tassa_id,)
         )
         self.conn.commit()
+        self.eventi.pubblica(Evento(TASSE, Azione.PAGAMENTO, (tassa_id,)))
     
     def delete_tassa(self, tassa_id: int):
         """Elimina una tassa"""
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM tasse WHERE id = ?', (tassa_id,))
         self.conn.commit()
+        self.eventi.pubblica(Evento(TASSE, Azione.ELIMINAZIONE, (tassa_id,)))
+    
+    # ========================================================================
+    # OPERAZIONI TASSE RICORRENTI
+    # ========================================================================
+    
+    def add_tassa_ricorrente(self, descrizione: str, importo: float, inizio: datetime,
+                             intervallo_mesi: int = 1, occorrenze: int = None,
+                             fino_a: datetime = None) -> int:
+        """
+        Aggiunge una regola di tassa ricorrente (nessuna rata viene salvata)
+        
+        Args:
+            importo: Importo di ogni rata in euro, salvato in centesimi interi
+            inizio: Scadenza della prima rata
+            intervallo_mesi: Mesi tra una rata e la successiva
+            occorrenze: Numero di rate (opzionale se c'è fino_a)
+            fino_a: Ultima scadenza possibile (opzionale se c'è occorrenze)
+        
+        Returns:
+            ID della regola creata
+        """
+        regola = TassaRicorrente(
+            descrizione=descrizione,
+            importo_centesimi=euro_in_centesimi(importo),
+            inizio=inizio,
+            intervallo_mesi=intervallo_mesi,
+            occorrenze=occorrenze,
+            fino_a=fino_a
+        )
+        
+        cursor = self.conn.cursor()
+        cursor.execute(
+            '''INSERT INTO tasse_ricorrenti
+               (descrizione, importo_centesimi, inizio, intervallo_mesi, occorrenze, fino_a)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (regola.descrizione, regola.importo_centesimi, inizio.strftime('%Y-%m-%d'),
+             regola.intervallo_mesi, regola.occorrenze,
+             fino_a.strftime('%Y-%m-%d') if fino_a else None)
+        )
+        self.conn.commit()
+        self.eventi.pubblica(Evento(RICORRENTI, Azione.AGGIUNTA, (cursor.lastrowid,)))
+        return cursor.lastrowid
+    
+    def get_tasse_ricorrenti(self) -> List[TassaRicorrente]:
+        """Recupera tutte le regole di tasse ricorrenti"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM tasse_ricorrenti ORDER BY inizio, id')
+        return [self._ricorrente_da_row(row) for row in cursor.fetchall()]
+    
+    def get_tassa_ricorrente_by_id(self, ricorrenza_id: int) -> Optional[TassaRicorrente]:
+        """Recupera una regola di tassa ricorrente per ID"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM tasse_ricorrenti WHERE id = ?', (ricorrenza_id,))
+        row = cursor.fetchone()
+        return self._ricorrente_da_row(row) if row else None
+    
+    @staticmethod
+    def _ricorrente_da_row(row) -> TassaRicorrente:
+        """Crea una TassaRicorrente da una riga di tasse_ricorrenti"""
+        return TassaRicorrente(
+            id=row['id'],
+            descrizione=row['descrizione'],
+            importo_centesimi=row['importo_centesimi'],
+            inizio=datetime.strptime(row['inizio'], '%Y-%m-%d'),
+            intervallo_mesi=row['intervallo_mesi'],
+            occorrenze=row['occorrenze'],
+            fino_a=datetime.strptime(row['fino_a'], '%Y-%m-%d') if row['fino_a'] else None
+        )
+    
+    def get_rate_virtuali(self, da: date = None, a: date = None,
+                          oggi: date = None) -> Iterator[Tassa]:
+        """
+        Rate delle tasse ricorrenti non ancora salvate, ordinate per scadenza
+        
+        Le rate vengono generate pigramente dalle regole, solo nella finestra
+        [da, a]; quelle già salvate in tasse (pagate o modificate) sono escluse.
+        """
+        regole = self.get_tasse_ricorrenti()
+        if not regole:
+            return iter(())
+        
+        salvate = self.get_rate_salvate()
+        
+        inizio = datetime.combine(da, datetime.min.time()) if da is not None else None
+        fine = datetime.combine(a, datetime.min.time()) if a is not None else None
+        
+        def rate(regola):
+            for occorrenza, scadenza in regola.scadenze(inizio, fine):
+                if (regola.id, occorrenza) not in salvate:
+                    yield _classifica_rata(regola.rata(occorrenza, scadenza), oggi)
+        
+        return heapq.merge(*(rate(r) for r in regole), key=lambda t: t.scadenza)
+    
+    def get_rate_salvate(self) -> set:
+        """Coppie (ricorrenza_id, occorrenza) delle rate ricorrenti salvate in tasse"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'SELECT ricorrenza_id, occorrenza FROM tasse WHERE ricorrenza_id IS NOT NULL'
+        )
+        return {(row['ricorrenza_id'], row['occorrenza']) for row in cursor.fetchall()}
+    
+    def get_flussi_mensili(self, da: date, a: date) -> List[tuple]:
+        """
+        Importi delle tasse salvate raggruppati per mese, in una sola query
+        
+        Il mese è un indice assoluto (anno * 12 + mese - 1). Scadenze e
+        pagamenti vengono letti solo dai due indici coprenti, senza toccare
+        la tabella.
+        
+        Args:
+            da: Primo giorno incluso
+            a: Ultimo giorno incluso
+        
+        Returns:
+            Lista di tuple (mese, dovuto, pagato, da_pagare) in centesimi,
+            solo per i mesi con movimenti
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT mese,
+                   SUM(dovuto) AS dovuto,
+                   SUM(pagato) AS pagato,
+                   SUM(da_pagare) AS da_pagare
+            FROM (
+                SELECT substr(scadenza, 1, 4) * 12 + substr(scadenza, 6, 2) - 1 AS mese,
+                       SUM(importo_centesimi) AS dovuto,
+                       0 AS pagato,
+                       SUM(CASE WHEN pagata = 0 THEN importo_centesimi ELSE 0 END) AS da_pagare
+                FROM tasse
+                WHERE scadenza BETWEEN :da AND :a
+                GROUP BY substr(scadenza, 1, 7)
+                UNION ALL
+                SELECT substr(data_pagamento, 1, 4) * 12 + substr(data_pagamento, 6, 2) - 1,
+                       0, SUM(importo_centesimi), 0
+                FROM tasse
+                WHERE pagata = 1 AND data_pagamento BETWEEN :da AND :a
+                GROUP BY substr(data_pagamento, 1, 7)
+            )
+            GROUP BY mese
+        ''', {'da': da.strftime('%Y-%m-%d'), 'a': a.strftime('%Y-%m-%d')})
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    def materializza_rata(self, ricorrenza_id: int, occorrenza: int) -> int:
+        """
+        Salva in tasse una rata di una serie ricorrente (prima di pagarla o modificarla)
+        
+        Returns:
+            ID della tassa (quella già esistente se la rata era salvata)
+        """
+        regola = self.get_tassa_ricorrente_by_id(ricorrenza_id)
+        if regola is None:
+            raise ValueError(f"Tassa ricorrente {ricorrenza_id} non trovata")
+        
+        cursor = self.conn.cursor()
+        cursor.execute(
+            '''INSERT OR IGNORE INTO tasse
+               (descrizione, importo_centesimi, scadenza, ricorrenza_id, occorrenza)
+               VALUES (?, ?, ?, ?, ?)''',
+            (regola.descrizione, regola.importo_centesimi,
+             regola.scadenza(occorrenza).strftime('%Y-%m-%d'), ricorrenza_id, occorrenza)
+        )
+        salvata = cursor.rowcount > 0
+        cursor.execute(
+            'SELECT id FROM tasse WHERE ricorrenza_id = ? AND occorrenza = ?',
+            (ricorrenza_id, occorrenza)
+        )
+        tassa_id = cursor.fetchone()['id']
+        self.conn.commit()
+        if salvata:
+            self.eventi.pubblica(Evento(TASSE, Azione.AGGIUNTA, (tassa_id,)))
+        return tassa_id
+    
+    def delete_tassa_ricorrente(self, ricorrenza_id: int):
+        """
+        Elimina una serie ricorrente e le sue rate salvate non pagate
+        
+        Le rate già pagate restano come tasse singole (ricorrenza_id a NULL).
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'DELETE FROM tasse WHERE ricorrenza_id = ? AND pagata = 0',
+            (ricorrenza_id,)
+        )
+        cursor.execute('DELETE FROM tasse_ricorrenti WHERE id = ?', (ricorrenza_id,))
+        self.conn.commit()
+        # Le rate salvate eliminate non sono elencate: la regola basta a ritrovarle
+        self.eventi.pubblica(Evento(RICORRENTI, Azione.ELIMINAZIONE, (ricorrenza_id,)))
     
     # ========================================================================
     # OPERAZIONI DOMANDE
@@ -395,23 +969,72 @@ class Database:
             (materia, anno, testo, difficolta)
         )
         self.conn.commit()
+        self.eventi.pubblica(Evento(DOMANDE, Azione.AGGIUNTA, (cursor.lastrowid,)))
         return cursor.lastrowid
     
     def get_domande_by_materia(self, materia: str, anno: str = None) -> List[Domanda]:
         """Recupera domande per materia (e opzionalmente anno)"""
-        cursor = self.conn.cursor()
+        return self.query_domande(materia=materia, anno=anno)
+    
+    def query_domande(self, materia: str = None, anno: str = None,
+                      difficolta: str = None, order: str = 'materia',
+                      limit: int = None, after: Domanda = None,
+                      testo: str = None) -> List[Domanda]:
+        """
+        Recupera le domande con filtri combinati in una sola query
         
+        Args:
+            materia: Filtra per materia (opzionale)
+            anno: Filtra per anno (opzionale)
+            difficolta: Filtra per difficoltà (opzionale)
+            order: 'materia' (materia, anno, inserimento) o 'recenti' (più nuove prima)
+            limit: Numero massimo di domande (opzionale)
+            after: Ultima domanda della pagina precedente, per la paginazione
+            testo: Solo le domande che lo contengono, senza maiuscole (opzionale)
+            
+        Returns:
+            Lista di domande nell'ordine richiesto
+        """
+        if order not in ('materia', 'recenti'):
+            raise ValueError(f"Ordinamento non valido: {order}")
+        
+        conditions = []
+        params = []
+        
+        if materia:
+            conditions.append('materia = ?')
+            params.append(materia)
         if anno:
-            cursor.execute(
-                'SELECT * FROM domande WHERE materia = ? AND anno = ?',
-                (materia, anno)
-            )
-        else:
-            cursor.execute(
-                'SELECT * FROM domande WHERE materia = ?',
-                (materia,)
-            )
+            conditions.append('anno = ?')
+            params.append(anno)
+        if difficolta:
+            conditions.append('difficolta = ?')
+            params.append(difficolta)
+        if testo:
+            conditions.append('instr(casefold(testo), ?) > 0')
+            params.append(normalizza_ricerca(testo))
+        
+        # Paginazione keyset: riparte dopo la chiave di ordinamento di "after"
+        if after is not None:
+            if order == 'materia':
+                conditions.append(
+                    '(materia > ? OR (materia = ? AND (anno > ? OR (anno = ? AND id > ?))))'
+                )
+                params.extend([after.materia, after.materia, after.anno, after.anno, after.id])
+            else:
+                conditions.append('id < ?')
+                params.append(after.id)
+        
+        query = 'SELECT * FROM domande'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY materia, anno, id' if order == 'materia' else ' ORDER BY id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
         
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
         rows = cursor.fetchall()
         
         return [Domanda(
@@ -420,9 +1043,27 @@ class Database:
             anno=row['anno'],
             testo=row['testo'],
             difficolta=row['difficolta'],
-            data_creazione=datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S')
+            # fromisoformat: su banche grandi strptime pesa più della query
+            data_creazione=datetime.fromisoformat(row['created_at'])
         ) for row in rows]
     
+    def get_domanda_by_id(self, domanda_id: int) -> Optional[Domanda]:
+        """Recupera una domanda per ID"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM domande WHERE id = ?', (domanda_id,))
+        row = cursor.fetchone()
+        
+        if row:
+            return Domanda(
+                id=row['id'],
+                materia=row['materia'],
+                anno=row['anno'],
+                testo=row['testo'],
+                difficolta=row['difficolta'],
+                data_creazione=datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S')
+            )
+        return None
+    
     def get_all_anni(self) -> List[str]:
         """Recupera tutti gli anni disponibili"""
         cursor = self.conn.cursor()
@@ -461,28 +1102,240 @@ class Database:
             params.append(domanda_id)
             query = f"UPDATE domande SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, params)
+            if testo is not None:
+                # La firma MinHash non è più valida: verrà ricalcolata
+                cursor.execute('DELETE FROM domande_minhash WHERE domanda_id = ?', (domanda_id,))
             self.conn.commit()
+            self.eventi.pubblica(Evento(DOMANDE, Azione.MODIFICA, (domanda_id,)))
     
     def delete_domanda(self, domanda_id: int):
         """Elimina una domanda"""
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM domande WHERE id = ?', (domanda_id,))
         self.conn.commit()
+        self.eventi.pubblica(Evento(DOMANDE, Azione.ELIMINAZIONE, (domanda_id,)))
+    
+    def delete_domande(self, domanda_ids: List[int]):
+        """Elimina più domande in una sola transazione"""
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            'DELETE FROM domande WHERE id = ?',
+            [(domanda_id,) for domanda_id in domanda_ids]
+        )
+        self.conn.commit()
+        self.eventi.pubblica(Evento(DOMANDE, Azione.ELIMINAZIONE, tuple(domanda_ids)))
     
+    def get_testi_domande(self) -> List[tuple]:
+        """Recupera (id, testo) di tutte le domande"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id, testo FROM domande')
+        return [(row['id'], row['testo']) for row in cursor.fetchall()]
+    
+    def get_firme_minhash(self) -> List[tuple]:
+        """Recupera le firme MinHash salvate come (domanda_id, blob)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT domanda_id, firma FROM domande_minhash')
+        return [(row['domanda_id'], row['firma']) for row in cursor.fetchall()]
+    
+    def salva_firme_minhash(self, firme):
+        """Salva (o sostituisce) firme MinHash date come coppie (domanda_id, blob)"""
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            'INSERT OR REPLACE INTO domande_minhash (domanda_id, firma) VALUES (?, ?)',
+            firme
+        )
+        self.conn.commit()
+
+    # ========================================================================
+    # OPERAZIONI RIPASSO
+    # ========================================================================
+    
+    def get_schede_ripasso(self) -> List[sqlite3.Row]:
+        """
+        Recupera lo stato di ripasso di tutte le domande
+        
+        Le domande mai ripassate hanno ease, intervallo, ripetizioni e scadenza NULL.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT d.id AS domanda_id, d.difficolta,
+                   r.ease, r.intervallo, r.ripetizioni, r.scadenza
+            FROM domande d
+            LEFT JOIN ripasso_schede r ON r.domanda_id = d.id
+        ''')
+        return cursor.fetchall()
+    
+    def salva_ripassi(self, schede: List[tuple], log: List[tuple]):
+        """
+        Salva in una sola transazione un blocco di risposte di ripasso
+        
+        Args:
+            schede: Tuple (domanda_id, ease, intervallo, ripetizioni, scadenza)
+            log: Tuple (domanda_id, voto, data, intervallo)
+        """
+        with self.conn:
+            self.conn.executemany(
+                '''INSERT OR REPLACE INTO ripasso_schede
+                   (domanda_id, ease, intervallo, ripetizioni, scadenza)
+                   VALUES (?, ?, ?, ?, ?)''',
+                schede
+            )
+            self.conn.executemany(
+                'INSERT INTO ripasso_log (domanda_id, voto, data, intervallo) VALUES (?, ?, ?, ?)',
+                log
+            )
+    
+    # ========================================================================
+    # OPERAZIONI MATERIE
+    # ========================================================================
+
+    def get_conteggio_materie(self) -> List[tuple]:
+        """
+        Recupera i nomi distinti delle materie usati in voti e domande
+
+        Returns:
+            Lista di tuple (materia, numero di utilizzi)
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT materia, COUNT(*) AS utilizzi FROM (
+                SELECT materia FROM voti
+                UNION ALL
+                SELECT materia FROM domande
+            )
+            GROUP BY materia
+        ''')
+        return [(row['materia'], row['utilizzi']) for row in cursor.fetchall()]
+
+    def rinomina_materia(self, vecchia: str, nuova: str) -> int:
+        """
+        Rinomina una materia in voti e domande (per unire varianti dello stesso nome)
+
+        Returns:
+            Numero di righe aggiornate
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('UPDATE voti SET materia = ? WHERE materia = ?', (nuova, vecchia))
+        aggiornate = cursor.rowcount
+        cursor.execute('UPDATE domande SET materia = ? WHERE materia = ?', (nuova, vecchia))
+        aggiornate += cursor.rowcount
+        self.conn.commit()
+        self.eventi.pubblica(Evento(VOTI, Azione.MODIFICA))
+        self.eventi.pubblica(Evento(DOMANDE, Azione.MODIFICA))
+        return aggiornate
+
     # ========================================================================
     # UTILITY
     # ========================================================================
     
-    def backup_database(self, backup_path: str = None):
-        """Crea un backup del database"""
+    def scorri(self, query: str, params=(), blocco: int = DIMENSIONE_BLOCCO) -> Iterator[sqlite3.Row]:
+        """
+        Righe di una query lette a blocchi di fetchmany
+        
+        In memoria c'è al più un blocco alla volta, qualunque sia il numero
+        di righe: è la sorgente per gli esportatori a flusso.
+        
+        Args:
+            query: SELECT da eseguire
+            params: Parametri della query
+            blocco: Righe per ogni fetchmany
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                righe = cursor.fetchmany(blocco)
+                if not righe:
+                    return
+                yield from righe
+        finally:
+            cursor.close()
+    
+    def scorri_tabella(self, tabella: str, blocco: int = DIMENSIONE_BLOCCO) -> Iterator[sqlite3.Row]:
+        """Tutte le righe di una tabella in ordine di id, a blocchi (vedi scorri)"""
+        if tabella not in TABELLE_ESPORTABILI:
+            raise ValueError(f"Tabella non esportabile: {tabella}")
+        return self.scorri(f'SELECT * FROM {tabella} ORDER BY id', blocco=blocco)
+    
+    def backup_database(self, backup_path: str = None, compressione: str = None,
+                        livello: int = None):
+        """
+        Crea un backup del database
+        
+        Args:
+            backup_path: File di backup (None: nome con data e ora)
+            compressione: 'gzip', 'lzma', 'bz2' o None; la copia viene
+                fatta in un file temporaneo accanto al backup e compressa
+                a flusso
+            livello: Livello di compressione (None: predefinito del codec)
+        
+        Returns:
+            Percorso del backup
+        """
+        from utils.compressione import apri_scrittura, con_estensione
+        
         if backup_path is None:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_path = f"{self.db_path.stem}_backup_{timestamp}.db"
+            backup_path = str(con_estensione(f"{self.db_path.stem}_backup_{timestamp}.db", compressione))
+        
+        if compressione is None:
+            self._copia_consistente(backup_path)
+            return backup_path
         
+        # Copia consistente accanto al backup, poi compressa a flusso
         import shutil
-        shutil.copy2(self.db_path, backup_path)
+        import tempfile
+        descrittore, copia = tempfile.mkstemp(suffix='.db', dir=Path(backup_path).resolve().parent)
+        os.close(descrittore)
+        try:
+            self._copia_consistente(copia)
+            with open(copia, 'rb') as origine, \
+                    apri_scrittura(backup_path, compressione, livello) as destinazione:
+                shutil.copyfileobj(origine, destinazione, DIMENSIONE_COPIA)
+        finally:
+            os.remove(copia)
         return backup_path
     
+    def _copia_consistente(self, percorso):
+        """
+        Copia il database in un file con l'API di backup di SQLite
+        
+        Copiare il file principale non basta in WAL: se un lettore (per
+        esempio un'esportazione in background) tiene aperta una lettura, il
+        checkpoint resta parziale e il file copiato è incompleto. L'API di
+        backup legge invece una fotografia consistente, log WAL compreso.
+        La copia è in journal_mode DELETE, quindi un file solo.
+        """
+        destinazione = sqlite3.connect(percorso)
+        try:
+            self.conn.backup(destinazione)
+            destinazione.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            destinazione.close()
+    
+    @staticmethod
+    def ripristina_backup(backup_path, db_path):
+        """
+        Scrive db_path dal backup, compresso o no (riconosciuto dai primi byte)
+        
+        Il database di destinazione non deve essere aperto. Prima di
+        sovrascriverlo controlla che il backup contenga davvero un database
+        SQLite.
+        
+        Raises:
+            ValueError: Se il backup non è un database SQLite
+        """
+        from utils.compressione import apri_lettura
+        
+        import shutil
+        with apri_lettura(backup_path) as origine:
+            intestazione = origine.read(len(_INTESTAZIONE_SQLITE))
+            if intestazione != _INTESTAZIONE_SQLITE:
+                raise ValueError(f"Il backup non è un database SQLite: {backup_path}")
+            with open(db_path, 'wb') as destinazione:
+                destinazione.write(intestazione)
+                shutil.copyfileobj(origine, destinazione, DIMENSIONE_COPIA)
+    
     def close(self):
         """Chiude la connessione al database"""
         if self.conn:
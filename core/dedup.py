@@ -0,0 +1,231 @@
+# core/dedup.py
+"""
+Rilevamento di domande quasi duplicate con MinHash e LSH
+
+NumPy viene importato al primo calcolo, non all'import del modulo.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+NUM_PERMUTAZIONI = 64
+BANDE = 16
+RIGHE_PER_BANDA = NUM_PERMUTAZIONI // BANDE
+LUNGHEZZA_SHINGLE = 5
+
+# Primo maggiore di 2^32: a*x + b resta sotto 2^64 per x, a, b < 2^32
+_PRIMO = 4294967311
+_MASCHERA = 0xFFFFFFFF
+
+
+@lru_cache(maxsize=None)
+def _coefficienti() -> Tuple[np.ndarray, np.ndarray]:
+    """Coefficienti a, b delle permutazioni (colonne uint64)"""
+    import numpy as np
+
+    rng = random.Random(20240901)  # seed fisso: le firme salvate devono restare valide
+    a = np.array([rng.randrange(1, _MASCHERA) for _ in range(NUM_PERMUTAZIONI)],
+                 dtype=np.uint64).reshape(-1, 1)
+    b = np.array([rng.randrange(0, _MASCHERA) for _ in range(NUM_PERMUTAZIONI)],
+                 dtype=np.uint64).reshape(-1, 1)
+    return a, b
+
+_NON_ALFANUMERICI = re.compile(r'[^a-z0-9]+')
+
+
+def shingles(testo: str) -> Set[int]:
+    """
+    Hash dei k-shingle di caratteri del testo normalizzato
+
+    Il testo viene ridotto a minuscole senza accenti né punteggiatura,
+    così piccole differenze di formattazione non contano.
+    """
+    testo = unicodedata.normalize('NFKD', testo)
+    testo = ''.join(c for c in testo if not unicodedata.combining(c)).lower()
+    testo = _NON_ALFANUMERICI.sub(' ', testo).strip()
+
+    if len(testo) <= LUNGHEZZA_SHINGLE:
+        return {zlib.crc32(testo.encode('utf-8'))} if testo else set()
+
+    return {
+        zlib.crc32(testo[i:i + LUNGHEZZA_SHINGLE].encode('utf-8'))
+        for i in range(len(testo) - LUNGHEZZA_SHINGLE + 1)
+    }
+
+
+def firma_minhash(testo: str) -> np.ndarray:
+    """Firma MinHash (NUM_PERMUTAZIONI valori uint32) di un testo"""
+    import numpy as np
+
+    valori = np.fromiter(shingles(testo), dtype=np.uint64)
+    if valori.size == 0:
+        return np.full(NUM_PERMUTAZIONI, _MASCHERA, dtype=np.uint32)
+
+    a, b = _coefficienti()
+    hash_permutati = (a * valori + b) % _PRIMO
+    return (hash_permutati.min(axis=1) & _MASCHERA).astype(np.uint32)
+
+
+def somiglianza_stimata(firma_a: np.ndarray, firma_b: np.ndarray) -> float:
+    """Stima dell'indice di Jaccard tra due firme"""
+    return float((firma_a == firma_b).sum()) / NUM_PERMUTAZIONI
+
+
+class DeduplicatoreDomande:
+    """
+    Indice LSH delle firme MinHash delle domande
+
+    Le firme sono salvate nella tabella domande_minhash e ricaricate
+    all'avvio; solo le domande nuove (o modificate) vengono ricalcolate.
+    Ogni firma è divisa in BANDE bande: due domande sono candidate se
+    coincidono in almeno una banda, e la somiglianza viene poi verificata
+    sulla firma completa.
+    """
+
+    def __init__(self, soglia: float = 0.7):
+        self.soglia = soglia
+        self._firme: Dict[int, np.ndarray] = {}
+        self._bucket: Dict[Tuple[int, bytes], Set[int]] = {}
+
+    @classmethod
+    def da_database(cls, db, soglia: float = 0.7) -> 'DeduplicatoreDomande':
+        """Carica le firme salvate, calcola quelle mancanti e le salva"""
+        indice, nuove = cls.calcola(db, soglia)
+        if nuove:
+            db.salva_firme_minhash(nuove)
+        return indice
+
+    @classmethod
+    def calcola(cls, db, soglia: float = 0.7) -> Tuple['DeduplicatoreDomande', List[Tuple[int, bytes]]]:
+        """
+        Indice dalle firme salvate e da quelle calcolate per le domande senza
+
+        Fa solo letture, quindi può girare su un thread del caricatore con
+        una connessione in sola lettura: le firme nuove vengono restituite,
+        da salvare poi con db.salva_firme_minhash.
+
+        Returns:
+            (indice, [(domanda_id, firma in byte), ...] da salvare)
+        """
+        import numpy as np
+
+        indice = cls(soglia)
+
+        for domanda_id, blob in db.get_firme_minhash():
+            firma = np.frombuffer(blob, dtype=np.uint32)
+            if firma.size == NUM_PERMUTAZIONI:
+                indice._inserisci(domanda_id, firma)
+
+        nuove = []
+        for domanda_id, testo in db.get_testi_domande():
+            if domanda_id not in indice._firme:
+                firma = firma_minhash(testo)
+                indice._inserisci(domanda_id, firma)
+                nuove.append((domanda_id, firma.tobytes()))
+
+        return indice, nuove
+
+    def __len__(self) -> int:
+        return len(self._firme)
+
+    def _bande(self, firma: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for banda in range(BANDE):
+            inizio = banda * RIGHE_PER_BANDA
+            yield banda, firma[inizio:inizio + RIGHE_PER_BANDA].tobytes()
+
+    def _inserisci(self, domanda_id: int, firma: np.ndarray):
+        self._firme[domanda_id] = firma
+        for chiave in self._bande(firma):
+            self._bucket.setdefault(chiave, set()).add(domanda_id)
+
+    def aggiungi(self, db, domanda_id: int, testo: str):
+        """Calcola, salva e indicizza la firma di una nuova domanda"""
+        firma = firma_minhash(testo)
+        db.salva_firme_minhash([(domanda_id, firma.tobytes())])
+        self._inserisci(domanda_id, firma)
+
+    def rimuovi(self, domanda_id: int):
+        """Rimuove una domanda dall'indice (la firma salvata va via in cascata)"""
+        firma = self._firme.pop(domanda_id, None)
+        if firma is None:
+            return
+        for chiave in self._bande(firma):
+            bucket = self._bucket.get(chiave)
+            if bucket:
+                bucket.discard(domanda_id)
+                if not bucket:
+                    del self._bucket[chiave]
+
+    def _candidati(self, firma: np.ndarray) -> Set[int]:
+        candidati = set()
+        for chiave in self._bande(firma):
+            candidati.update(self._bucket.get(chiave, ()))
+        return candidati
+
+    def probabili_duplicati(self, testo: str, limite: int = 5) -> List[Tuple[int, float]]:
+        """
+        Domande già presenti probabilmente uguali al testo dato
+
+        Returns:
+            Lista di (id domanda, somiglianza stimata) in ordine decrescente
+        """
+        firma = firma_minhash(testo)
+        risultati = []
+        for domanda_id in self._candidati(firma):
+            somiglianza = somiglianza_stimata(firma, self._firme[domanda_id])
+            if somiglianza >= self.soglia:
+                risultati.append((domanda_id, somiglianza))
+
+        risultati.sort(key=lambda x: (-x[1], x[0]))
+        return risultati[:limite]
+
+    def trova_cluster(self) -> List[List[int]]:
+        """
+        Gruppi di domande quasi duplicate
+
+        Confronta solo le coppie che condividono un bucket LSH, quindi il
+        costo cresce con il numero di candidati e non con n^2.
+
+        Returns:
+            Lista di gruppi di ID ordinati (il primo è la domanda più vecchia)
+        """
+        padre = {}
+
+        def radice(x):
+            padre.setdefault(x, x)
+            while padre[x] != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        verificate = set()
+        for bucket in self._bucket.values():
+            if len(bucket) < 2:
+                continue
+            membri = sorted(bucket)
+            for i, a in enumerate(membri):
+                for b in membri[i + 1:]:
+                    if (a, b) in verificate:
+                        continue
+                    verificate.add((a, b))
+                    if somiglianza_stimata(self._firme[a], self._firme[b]) >= self.soglia:
+                        padre[radice(b)] = radice(a)
+
+        gruppi: Dict[int, List[int]] = {}
+        for domanda_id in padre:
+            gruppi.setdefault(radice(domanda_id), []).append(domanda_id)
+
+        return sorted(
+            (sorted(gruppo) for gruppo in gruppi.values() if len(gruppo) > 1),
+            key=lambda g: g[0]
+        )
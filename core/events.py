@@ -0,0 +1,77 @@
+# core/events.py
+"""
+Eventi di modifica pubblicati dal Database
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Argomenti: la parte di dati modificata (a cui ci si iscrive)
+LAUREE = 'lauree'
+VOTI = 'voti'
+TASSE = 'tasse'
+RICORRENTI = 'ricorrenti'
+DOMANDE = 'domande'
+
+
+class Azione(Enum):
+    """Tipo di modifica"""
+    AGGIUNTA = 'aggiunta'
+    MODIFICA = 'modifica'
+    ELIMINAZIONE = 'eliminazione'
+    PAGAMENTO = 'pagamento'  # tassa segnata come pagata o non pagata
+
+
+@dataclass(frozen=True)
+class Evento:
+    """
+    Modifica salvata nel database
+
+    Attributes:
+        argomento: Dati modificati (LAUREE, VOTI, TASSE, RICORRENTI, DOMANDE)
+        azione: Tipo di modifica
+        ids: ID delle righe interessate (vuoto se sono molte o non note,
+            es. eliminazione in cascata o rinomina di una materia)
+        laurea_id: Per i voti, il corso interessato (None: qualsiasi corso)
+    """
+    argomento: str
+    azione: Azione
+    ids: Tuple[int, ...] = ()
+    laurea_id: Optional[int] = None
+
+    def riguarda_laurea(self, laurea_id: int) -> bool:
+        """True se l'evento può toccare i dati del corso dato"""
+        return self.laurea_id is None or self.laurea_id == laurea_id
+
+
+class BusEventi:
+    """
+    Pubblica gli eventi agli iscritti, per argomento
+
+    Le chiamate sono sincrone e nell'ordine di iscrizione, sul thread che
+    ha fatto la modifica. Gli iscritti devono essere veloci: chi deve
+    rileggere dati si segna cosa è cambiato e rilegge dopo.
+    """
+
+    def __init__(self):
+        self._iscritti: Dict[str, List[Callable[[Evento], None]]] = defaultdict(list)
+
+    def iscrivi(self, argomenti: Iterable[str], callback: Callable[[Evento], None]):
+        """Chiama callback per ogni evento su uno degli argomenti"""
+        for argomento in argomenti:
+            self._iscritti[argomento].append(callback)
+
+    def disiscrivi(self, argomenti: Iterable[str], callback: Callable[[Evento], None]):
+        """Annulla un'iscrizione fatta con iscrivi()"""
+        for argomento in argomenti:
+            if callback in self._iscritti.get(argomento, ()):
+                self._iscritti[argomento].remove(callback)
+
+    def pubblica(self, evento: Evento):
+        """Notifica un evento agli iscritti al suo argomento"""
+        # Copia: un iscritto può disiscriversi durante la notifica
+        for callback in list(self._iscritti.get(evento.argomento, ())):
+            callback(evento)
@@ -0,0 +1,245 @@
+# core/materie.py
+"""
+Indice a trigrammi dei nomi delle materie per autocompletamento e ricerca fuzzy
+"""
+
+import bisect
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+
+# Numeri romani usati comunemente nei nomi dei corsi ("Analisi II")
+_ROMANI = {
+    'ii': '2', 'iii': '3', 'iv': '4', 'v': '5',
+    'vi': '6', 'vii': '7', 'viii': '8', 'ix': '9', 'x': '10'
+}
+
+_NON_ALFANUMERICI = re.compile(r'[^a-z0-9]+')
+
+
+def normalizza_materia(nome: str) -> str:
+    """
+    Normalizza il nome di una materia per il confronto
+
+    Rimuove accenti, punteggiatura e maiuscole e converte i numeri romani
+    in cifre, così "Analisi I" e "analisi 1" coincidono.
+    """
+    testo = unicodedata.normalize('NFKD', nome)
+    testo = ''.join(c for c in testo if not unicodedata.combining(c)).lower()
+    parole = _NON_ALFANUMERICI.sub(' ', testo).split()
+
+    for i, parola in enumerate(parole):
+        if parola in _ROMANI:
+            parole[i] = _ROMANI[parola]
+        elif parola == 'i' and i == len(parole) - 1 and i > 0:
+            # "i" è anche un articolo: lo trattiamo come numero solo in coda
+            parole[i] = '1'
+
+    return ' '.join(parole)
+
+
+def _numeri(testo_normalizzato: str) -> Tuple[str, ...]:
+    """Parole numeriche di un nome normalizzato ("analisi 2" -> ("2",))"""
+    return tuple(p for p in testo_normalizzato.split() if p.isdigit())
+
+
+def trigrammi(testo_normalizzato: str) -> Set[str]:
+    """Trigrammi di un testo normalizzato (ogni parola con padding)"""
+    risultato = set()
+    for parola in testo_normalizzato.split():
+        padded = f"  {parola} "
+        for i in range(len(padded) - 2):
+            risultato.add(padded[i:i + 3])
+    return risultato
+
+
+class IndiceMaterie:
+    """
+    Indice in memoria dei nomi distinti delle materie
+
+    Mantiene una lista ordinata delle chiavi normalizzate per le ricerche
+    per prefisso e un indice invertito trigramma -> chiavi per la ricerca
+    fuzzy. Si costruisce una volta dal database e si aggiorna con
+    aggiungi() a ogni inserimento.
+    """
+
+    def __init__(self):
+        self._chiavi: List[str] = []  # chiavi normalizzate, ordinate
+        self._varianti: Dict[str, Counter] = {}  # chiave -> {nome: utilizzi}
+        self._trigrammi: Dict[str, Set[str]] = {}  # chiave -> trigrammi
+        self._postings: Dict[str, Set[str]] = {}  # trigramma -> chiavi
+
+    @classmethod
+    def da_database(cls, db) -> 'IndiceMaterie':
+        """Costruisce l'indice dalle materie di voti e domande"""
+        indice = cls()
+        for materia, utilizzi in db.get_conteggio_materie():
+            indice.aggiungi(materia, utilizzi)
+        return indice
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._varianti.values())
+
+    def __contains__(self, nome: str) -> bool:
+        varianti = self._varianti.get(normalizza_materia(nome))
+        return bool(varianti) and nome in varianti
+
+    def aggiungi(self, nome: str, utilizzi: int = 1):
+        """Registra un utilizzo del nome di una materia"""
+        nome = nome.strip()
+        chiave = normalizza_materia(nome)
+        if not chiave:
+            return
+
+        varianti = self._varianti.get(chiave)
+        if varianti is None:
+            varianti = self._varianti[chiave] = Counter()
+            bisect.insort(self._chiavi, chiave)
+
+            grammi = trigrammi(chiave)
+            self._trigrammi[chiave] = grammi
+            for grammo in grammi:
+                self._postings.setdefault(grammo, set()).add(chiave)
+
+        varianti[nome] += utilizzi
+
+    def rimuovi(self, nome: str, utilizzi: int = 1):
+        """Rimuove utilizzi di un nome (ad es. dopo un'eliminazione o un'unione)"""
+        chiave = normalizza_materia(nome)
+        varianti = self._varianti.get(chiave)
+        if not varianti or nome not in varianti:
+            return
+
+        varianti[nome] -= utilizzi
+        if varianti[nome] <= 0:
+            del varianti[nome]
+        if varianti:
+            return
+
+        # Nessuna variante rimasta: elimina la chiave dall'indice
+        del self._varianti[chiave]
+        del self._chiavi[bisect.bisect_left(self._chiavi, chiave)]
+        for grammo in self._trigrammi.pop(chiave):
+            chiavi = self._postings[grammo]
+            chiavi.discard(chiave)
+            if not chiavi:
+                del self._postings[grammo]
+
+    def nome_canonico(self, chiave: str) -> str:
+        """Variante più usata per una chiave normalizzata"""
+        return self._varianti[chiave].most_common(1)[0][0]
+
+    def cerca_prefisso(self, testo: str, limite: int = 5) -> List[str]:
+        """
+        Materie il cui nome normalizzato inizia con il testo dato
+
+        Returns:
+            Nomi canonici in ordine alfabetico
+        """
+        prefisso = normalizza_materia(testo)
+        if not prefisso:
+            return []
+
+        risultati = []
+        i = bisect.bisect_left(self._chiavi, prefisso)
+        while i < len(self._chiavi) and len(risultati) < limite:
+            chiave = self._chiavi[i]
+            if not chiave.startswith(prefisso):
+                break
+            risultati.append(self.nome_canonico(chiave))
+            i += 1
+        return risultati
+
+    def cerca_simili(self, testo: str, limite: int = 5,
+                     soglia: float = 0.3) -> List[Tuple[str, float]]:
+        """
+        Ricerca fuzzy per somiglianza di trigrammi (indice di Jaccard)
+
+        Returns:
+            Lista di (nome canonico, somiglianza) in ordine decrescente
+        """
+        chiave = normalizza_materia(testo)
+        grammi = trigrammi(chiave)
+        if not grammi:
+            return []
+
+        condivisi = Counter()
+        for grammo in grammi:
+            condivisi.update(self._postings.get(grammo, ()))
+
+        punteggi = []
+        for candidato, comuni in condivisi.items():
+            unione = len(grammi) + len(self._trigrammi[candidato]) - comuni
+            somiglianza = comuni / unione
+            if somiglianza >= soglia:
+                punteggi.append((candidato, somiglianza))
+
+        punteggi.sort(key=lambda x: (-x[1], x[0]))
+        return [(self.nome_canonico(c), round(s, 3)) for c, s in punteggi[:limite]]
+
+    def suggerisci(self, testo: str, limite: int = 3) -> List[str]:
+        """
+        Suggerimenti per l'autocompletamento: prima i prefissi, poi i simili
+
+        Il testo già digitato non viene riproposto.
+        """
+        testo = testo.strip()
+        if len(testo) < 2:
+            return []
+
+        suggerimenti = []
+        for nome in self.cerca_prefisso(testo, limite):
+            if nome != testo and nome not in suggerimenti:
+                suggerimenti.append(nome)
+
+        if len(suggerimenti) < limite:
+            for nome, _ in self.cerca_simili(testo, limite):
+                if nome != testo and nome not in suggerimenti:
+                    suggerimenti.append(nome)
+                if len(suggerimenti) >= limite:
+                    break
+
+        return suggerimenti[:limite]
+
+    def suggerisci_unioni(self, soglia: float = 0.6) -> List[List[str]]:
+        """
+        Gruppi di nomi che probabilmente indicano la stessa materia
+
+        Raggruppa le varianti con la stessa chiave normalizzata e le chiavi
+        con somiglianza di trigrammi oltre la soglia. Nomi con numeri diversi
+        ("Analisi 1" e "Analisi 2") non vengono mai uniti.
+
+        Returns:
+            Lista di gruppi; il primo nome di ogni gruppo è il più usato
+        """
+        # Union-find sulle chiavi simili
+        padre = {chiave: chiave for chiave in self._chiavi}
+
+        def radice(chiave):
+            while padre[chiave] != chiave:
+                padre[chiave] = padre[padre[chiave]]
+                chiave = padre[chiave]
+            return chiave
+
+        for chiave, grammi in self._trigrammi.items():
+            condivisi = Counter()
+            for grammo in grammi:
+                condivisi.update(self._postings[grammo])
+            for candidato, comuni in condivisi.items():
+                if candidato <= chiave or _numeri(candidato) != _numeri(chiave):
+                    continue
+                unione = len(grammi) + len(self._trigrammi[candidato]) - comuni
+                if comuni / unione >= soglia:
+                    padre[radice(candidato)] = radice(chiave)
+
+        gruppi: Dict[str, Counter] = {}
+        for chiave, varianti in self._varianti.items():
+            gruppi.setdefault(radice(chiave), Counter()).update(varianti)
+
+        return [
+            [nome for nome, _ in varianti.most_common()]
+            for varianti in gruppi.values()
+            if len(varianti) > 1
+        ]
@@ -4,11 +4,43 @@ Modelli dati per University Manager
 """
 
 from dataclasses import dataclass, field
+from calendar import monthrange
 from datetime import datetime
-from typing import Optional, List
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, List, Iterator, Tuple
 import json
 
 
+def euro_in_centesimi(importo) -> int:
+    """
+    Converte un importo in euro (int, float, Decimal o stringa) in centesimi
+    
+    Passa per la rappresentazione decimale, così 12.35 diventa 1235 e non 1234.
+    """
+    euro = Decimal(str(importo)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return int(euro * 100)
+
+
+def formatta_centesimi(centesimi: int) -> str:
+    """Formatta un importo in centesimi come valuta (es. "€ 12.35")"""
+    segno = "-" if centesimi < 0 else ""
+    euro, cent = divmod(abs(centesimi), 100)
+    return f"€ {segno}{euro}.{cent:02d}"
+
+
+def aggiungi_mesi(data: datetime, mesi: int) -> datetime:
+    """
+    Sposta una data di un numero di mesi
+    
+    Il giorno viene limitato all'ultimo del mese (31/01 + 1 mese = 28/02 o 29/02).
+    """
+    mese = data.month - 1 + mesi
+    anno = data.year + mese // 12
+    mese = mese % 12 + 1
+    giorno = min(data.day, monthrange(anno, mese)[1])
+    return data.replace(year=anno, month=mese, day=giorno)
+
+
 @dataclass
 class Voto:
     """Modello per un voto universitario"""
@@ -109,17 +141,40 @@ class Laurea:
 class Tassa:
     """Modello per una tassa universitaria"""
     descrizione: str
-    importo: float
+    importo_centesimi: int
     scadenza: datetime
     pagata: bool = False
     id: Optional[int] = None
     data_pagamento: Optional[datetime] = None
+    # Calcolati dal database rispetto a un'unica data di riferimento
+    urgenza: Optional[str] = None  # "pagata", "scaduta", "in_scadenza", "futura"
+    giorni_rimanenti: Optional[int] = None
+    # Rata di una tassa ricorrente (id None: rata non ancora salvata)
+    ricorrenza_id: Optional[int] = None
+    occorrenza: Optional[int] = None
     
     def __post_init__(self):
         """Validazione dopo inizializzazione"""
-        if self.importo <= 0:
+        if self.importo_centesimi <= 0:
             raise ValueError(f"Importo deve essere positivo, ricevuto: {self.importo}")
     
+    @property
+    def virtuale(self) -> bool:
+        """True per una rata ricorrente calcolata dalla regola e non salvata"""
+        return self.id is None and self.ricorrenza_id is not None
+    
+    @property
+    def chiave(self):
+        """Identificativo stabile: id della riga o (ricorrenza, occorrenza) per le rate virtuali"""
+        if self.virtuale:
+            return ('ricorrente', self.ricorrenza_id, self.occorrenza)
+        return self.id
+    
+    @property
+    def importo(self) -> float:
+        """Importo in euro (per visualizzazione e compatibilità)"""
+        return self.importo_centesimi / 100
+    
     @property
     def scadenza_formattata(self) -> str:
         """Scadenza formattata"""
@@ -128,13 +183,15 @@ class Tassa:
     @property
     def importo_formattato(self) -> str:
         """Importo formattato con valuta"""
-        return f"€ {self.importo:.2f}"
+        return formatta_centesimi(self.importo_centesimi)
     
     @property
     def stato(self) -> str:
         """Stato del pagamento"""
         if self.pagata:
             return "✅ Pagata"
+        elif self.urgenza is not None:
+            return "⚠️ Scaduta" if self.urgenza == 'scaduta' else "⏳ Da pagare"
         elif self.scadenza < datetime.now():
             return "⚠️ Scaduta"
         else:
@@ -143,6 +200,8 @@ class Tassa:
     @property
     def giorni_alla_scadenza(self) -> int:
         """Giorni rimanenti alla scadenza"""
+        if self.giorni_rimanenti is not None:
+            return self.giorni_rimanenti
         delta = self.scadenza - datetime.now()
         return delta.days
     
@@ -152,9 +211,12 @@ class Tassa:
             'id': self.id,
             'descrizione': self.descrizione,
             'importo': self.importo,
+            'importo_centesimi': self.importo_centesimi,
             'scadenza': self.scadenza.strftime('%Y-%m-%d'),
             'pagata': self.pagata,
-            'data_pagamento': self.data_pagamento.strftime('%Y-%m-%d') if self.data_pagamento else None
+            'data_pagamento': self.data_pagamento.strftime('%Y-%m-%d') if self.data_pagamento else None,
+            'ricorrenza_id': self.ricorrenza_id,
+            'occorrenza': self.occorrenza
         }
     
     @classmethod
@@ -163,12 +225,125 @@ class Tassa:
         return cls(
             id=data.get('id'),
             descrizione=data['descrizione'],
-            importo=data['importo'],
+            importo_centesimi=(data['importo_centesimi'] if 'importo_centesimi' in data
+                               else euro_in_centesimi(data['importo'])),
             scadenza=datetime.strptime(data['scadenza'], '%Y-%m-%d'),
             pagata=data.get('pagata', False),
             data_pagamento=datetime.strptime(data['data_pagamento'], '%Y-%m-%d') 
-                          if data.get('data_pagamento') else None
+                          if data.get('data_pagamento') else None,
+            ricorrenza_id=data.get('ricorrenza_id'),
+            occorrenza=data.get('occorrenza')
+        )
+
+
+@dataclass
+class TassaRicorrente:
+    """
+    Regola per una tassa che si ripete ogni intervallo_mesi mesi
+    
+    La serie termina dopo un numero di rate (occorrenze) o a una data
+    (fino_a); se sono indicate entrambe vale il limite che arriva prima.
+    Le rate non vengono salvate: si calcolano con scadenze() nella
+    finestra che serve.
+    """
+    descrizione: str
+    importo_centesimi: int
+    inizio: datetime
+    intervallo_mesi: int = 1
+    occorrenze: Optional[int] = None
+    fino_a: Optional[datetime] = None
+    id: Optional[int] = None
+    
+    def __post_init__(self):
+        """Validazione dopo inizializzazione"""
+        if self.importo_centesimi <= 0:
+            raise ValueError(f"Importo deve essere positivo, ricevuto: {self.importo_centesimi / 100}")
+        if self.intervallo_mesi <= 0:
+            raise ValueError(f"Intervallo deve essere positivo, ricevuto: {self.intervallo_mesi}")
+        if self.occorrenze is None and self.fino_a is None:
+            raise ValueError("Indica il numero di rate o la data di fine")
+        if self.occorrenze is not None and self.occorrenze <= 0:
+            raise ValueError(f"Numero di rate deve essere positivo, ricevuto: {self.occorrenze}")
+    
+    @property
+    def importo_formattato(self) -> str:
+        """Importo di una rata formattato con valuta"""
+        return formatta_centesimi(self.importo_centesimi)
+    
+    def scadenza(self, occorrenza: int) -> datetime:
+        """Scadenza della rata numero occorrenza (da 0), sempre calcolata dall'inizio"""
+        return aggiungi_mesi(self.inizio, occorrenza * self.intervallo_mesi)
+    
+    def ultima_occorrenza(self) -> int:
+        """Indice dell'ultima rata della serie (-1 se la serie è vuota)"""
+        ultima = self.occorrenze - 1 if self.occorrenze is not None else None
+        if self.fino_a is not None:
+            mesi = (self.fino_a.year - self.inizio.year) * 12 + self.fino_a.month - self.inizio.month
+            entro_fine = mesi // self.intervallo_mesi
+            if entro_fine >= 0 and self.scadenza(entro_fine) > self.fino_a:
+                entro_fine -= 1
+            ultima = entro_fine if ultima is None else min(ultima, entro_fine)
+        return max(ultima, -1)
+    
+    def rate_prima_di(self, data: datetime) -> int:
+        """Numero di rate con scadenza prima di data (senza generarle)"""
+        occorrenza = 0
+        if data > self.inizio:
+            mesi = (data.year - self.inizio.year) * 12 + data.month - self.inizio.month
+            occorrenza = max(0, mesi // self.intervallo_mesi - 1)
+    
+        ultima = self.ultima_occorrenza()
+        while occorrenza <= ultima and self.scadenza(occorrenza) < data:
+            occorrenza += 1
+        return min(occorrenza, ultima + 1)
+    
+    def scadenze(self, da: datetime = None, a: datetime = None) -> Iterator[Tuple[int, datetime]]:
+        """
+        Genera (occorrenza, scadenza) delle rate in una finestra di date
+        
+        Salta direttamente alla prima rata utile, quindi il costo dipende
+        solo dalle rate nella finestra.
+        
+        Args:
+            da: Prima scadenza inclusa (None: dalla prima rata)
+            a: Ultima scadenza inclusa (None: fino alla fine della serie)
+        """
+        occorrenza = 0
+        if da is not None and da > self.inizio:
+            mesi = (da.year - self.inizio.year) * 12 + da.month - self.inizio.month
+            occorrenza = max(0, mesi // self.intervallo_mesi - 1)
+        
+        while self.occorrenze is None or occorrenza < self.occorrenze:
+            scadenza = self.scadenza(occorrenza)
+            if self.fino_a is not None and scadenza > self.fino_a:
+                return
+            if a is not None and scadenza > a:
+                return
+            if da is None or scadenza >= da:
+                yield occorrenza, scadenza
+            occorrenza += 1
+    
+    def rata(self, occorrenza: int, scadenza: datetime = None) -> Tassa:
+        """Rata virtuale (non salvata) della serie"""
+        return Tassa(
+            descrizione=self.descrizione,
+            importo_centesimi=self.importo_centesimi,
+            scadenza=scadenza or self.scadenza(occorrenza),
+            ricorrenza_id=self.id,
+            occorrenza=occorrenza
         )
+    
+    def to_dict(self) -> dict:
+        """Converte in dizionario"""
+        return {
+            'id': self.id,
+            'descrizione': self.descrizione,
+            'importo_centesimi': self.importo_centesimi,
+            'inizio': self.inizio.strftime('%Y-%m-%d'),
+            'intervallo_mesi': self.intervallo_mesi,
+            'occorrenze': self.occorrenze,
+            'fino_a': self.fino_a.strftime('%Y-%m-%d') if self.fino_a else None
+        }
 
 
 @dataclass
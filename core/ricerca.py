@@ -0,0 +1,85 @@
+# core/ricerca.py
+"""
+Ricerca per sottostringa con raffinamento incrementale dei risultati
+"""
+
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+
+def normalizza_ricerca(testo: Optional[str]) -> str:
+    """
+    Forma usata per confrontare testo e ricerca (senza maiuscole)
+
+    È la stessa funzione che il database registra come casefold(), così
+    un filtro in SQL e uno in memoria trovano le stesse righe.
+    """
+    return testo.casefold() if testo else ''
+
+
+# Risultato di una ricerca: righe e, allineati, i loro testi normalizzati
+Risultati = Tuple[List[dict], List[str]]
+
+
+class RicercaIncrementale:
+    """
+    Ultimi risultati di una ricerca, per raffinarli senza tornare al database
+
+    Se una riga contiene "integrale doppio" contiene anche "integrale":
+    quando la nuova ricerca contiene una ricerca già fatta (con gli stessi
+    filtri) basta filtrare in memoria quei risultati. La ricerca vuota è
+    l'intera lista, quindi dopo il primo caricamento anche la prima
+    lettera si filtra in memoria. Le voci sono immutabili (solo liste
+    nuove), quindi si possono filtrare da un thread di lavoro.
+    """
+
+    def __init__(self, massimo: int = 8):
+        """
+        Args:
+            massimo: Ricerche tenute in memoria (le meno recenti escono)
+        """
+        self.massimo = massimo
+        self._voci: 'OrderedDict[Tuple[Hashable, str], Risultati]' = OrderedDict()
+        # Cambia a ogni svuota(): un risultato chiesto prima è obsoleto
+        self.versione = 0
+
+    def base(self, filtri: Hashable, ricerca: str) -> Optional[Risultati]:
+        """
+        Risultati già noti da cui filtrare ricerca (None se serve il database)
+
+        Tra le ricerche contenute in quella nuova sceglie quella con meno
+        righe, di solito la più lunga.
+        """
+        migliore = None
+        for (filtri_voce, ricerca_voce), risultati in self._voci.items():
+            if filtri_voce == filtri and ricerca_voce in ricerca:
+                if migliore is None or len(risultati[0]) < len(migliore[0]):
+                    migliore = risultati
+        return migliore
+
+    def salva(self, filtri: Hashable, ricerca: str, risultati: Risultati):
+        """Memorizza i risultati di una ricerca"""
+        chiave = (filtri, ricerca)
+        self._voci[chiave] = risultati
+        self._voci.move_to_end(chiave)
+        while len(self._voci) > self.massimo:
+            self._voci.popitem(last=False)
+
+    def svuota(self):
+        """Dimentica tutti i risultati (i dati sono cambiati)"""
+        self._voci.clear()
+        self.versione += 1
+
+    @staticmethod
+    def filtra(risultati: Risultati, ricerca: str) -> Risultati:
+        """Righe di risultati il cui testo normalizzato contiene ricerca"""
+        righe, testi = risultati
+        if not ricerca:
+            return risultati
+        indici = [i for i, testo in enumerate(testi) if ricerca in testo]
+        return [righe[i] for i in indici], [testi[i] for i in indici]
+
+    @staticmethod
+    def crea(righe: Sequence[dict], testi: Sequence[str]) -> Risultati:
+        """Risultati da righe e testi originali (li normalizza)"""
+        return list(righe), [normalizza_ricerca(testo) for testo in testi]
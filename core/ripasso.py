@@ -0,0 +1,253 @@
+# core/ripasso.py
+"""
+Ripetizione dilazionata (SM-2) delle domande d'esame
+"""
+
+import heapq
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+
+# Peso delle domande nel quiz casuale: le più difficili escono più spesso
+PESI_DIFFICOLTA = {
+    'facile': 1.0,
+    'media': 2.0,
+    'difficile': 3.0,
+    None: 2.0
+}
+
+# Dopo una risposta sbagliata la scheda torna disponibile a breve
+RIPROPOSTA_ERRORE = timedelta(minutes=10)
+
+
+@dataclass
+class SchedaRipasso:
+    """Stato di ripasso di una domanda"""
+    domanda_id: int
+    scadenza: datetime
+    ease: float = 2.5
+    intervallo: float = 0.0  # giorni
+    ripetizioni: int = 0
+    difficolta: Optional[str] = None
+
+    def valuta(self, voto: int, adesso: datetime):
+        """
+        Aggiorna la scheda con l'algoritmo SM-2
+
+        Args:
+            voto: Qualità della risposta da 0 (non ricordata) a 5 (perfetta)
+            adesso: Istante della risposta
+        """
+        if not 0 <= voto <= 5:
+            raise ValueError(f"Voto di ripasso deve essere tra 0 e 5, ricevuto: {voto}")
+
+        if voto < 3:
+            self.ripetizioni = 0
+            self.intervallo = 0.0
+            self.scadenza = adesso + RIPROPOSTA_ERRORE
+        else:
+            self.ripetizioni += 1
+            if self.ripetizioni == 1:
+                self.intervallo = 1.0
+            elif self.ripetizioni == 2:
+                self.intervallo = 6.0
+            else:
+                self.intervallo = round(self.intervallo * self.ease, 1)
+            self.scadenza = adesso + timedelta(days=self.intervallo)
+
+        self.ease = max(1.3, self.ease + 0.1 - (5 - voto) * (0.08 + (5 - voto) * 0.02))
+
+
+class CampionatoreAlias:
+    """
+    Campionamento pesato in O(1) con il metodo alias di Vose
+
+    La costruzione delle tabelle è O(n); ogni estrazione costa un numero
+    casuale e un confronto.
+    """
+
+    def __init__(self, pesi: Sequence[float]):
+        n = len(pesi)
+        if n == 0:
+            raise ValueError("Serve almeno un elemento per il campionamento")
+
+        totale = float(sum(pesi))
+        scalati = [p * n / totale for p in pesi]
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+
+        piccoli = [i for i, p in enumerate(scalati) if p < 1.0]
+        grandi = [i for i, p in enumerate(scalati) if p >= 1.0]
+
+        while piccoli and grandi:
+            s = piccoli.pop()
+            g = grandi.pop()
+            self._prob[s] = scalati[s]
+            self._alias[s] = g
+            scalati[g] = scalati[g] + scalati[s] - 1.0
+            (piccoli if scalati[g] < 1.0 else grandi).append(g)
+
+        # Residui numerici: probabilità piena
+        for i in piccoli + grandi:
+            self._prob[i] = 1.0
+
+    def __len__(self) -> int:
+        return len(self._prob)
+
+    def campiona(self, rng: random.Random = random) -> int:
+        """Estrae un indice con probabilità proporzionale al suo peso"""
+        i = rng.randrange(len(self._prob))
+        return i if rng.random() < self._prob[i] else self._alias[i]
+
+
+class SchedulatoreRipasso:
+    """
+    Coda di ripasso delle domande
+
+    Le schede sono in un min-heap ordinato per scadenza; le voci superate
+    da una nuova valutazione restano nell'heap e vengono scartate quando
+    arrivano in cima (cancellazione pigra), così prossima() e valuta()
+    sono O(log n). Le valutazioni vengono scritte su SQLite a blocchi di
+    dimensione_batch.
+    """
+
+    def __init__(self, db, dimensione_batch: int = 50):
+        self.db = db
+        self.dimensione_batch = dimensione_batch
+        self._schede: Dict[int, SchedaRipasso] = {}
+        self._heap: List[tuple] = []
+        self._log_in_attesa: List[tuple] = []
+        self._modificate: Dict[int, SchedaRipasso] = {}
+        self._campionatore = None
+        self._ids_campionatore: List[int] = []
+
+    @classmethod
+    def da_database(cls, db, dimensione_batch: int = 50) -> 'SchedulatoreRipasso':
+        """Carica lo stato di tutte le domande (le nuove sono subito da ripassare)"""
+        schedulatore = cls(db, dimensione_batch)
+        adesso = datetime.now()
+
+        for row in db.get_schede_ripasso():
+            scheda = SchedaRipasso(
+                domanda_id=row['domanda_id'],
+                scadenza=(datetime.strptime(row['scadenza'], '%Y-%m-%d %H:%M:%S')
+                          if row['scadenza'] else adesso),
+                ease=row['ease'] if row['ease'] is not None else 2.5,
+                intervallo=row['intervallo'] or 0.0,
+                ripetizioni=row['ripetizioni'] or 0,
+                difficolta=row['difficolta']
+            )
+            schedulatore._schede[scheda.domanda_id] = scheda
+            schedulatore._heap.append((scheda.scadenza, scheda.domanda_id))
+
+        heapq.heapify(schedulatore._heap)
+        return schedulatore
+
+    def __len__(self) -> int:
+        return len(self._schede)
+
+    def aggiungi(self, domanda_id: int, difficolta: str = None):
+        """Aggiunge una nuova domanda, da ripassare subito"""
+        scheda = SchedaRipasso(domanda_id=domanda_id, scadenza=datetime.now(),
+                               difficolta=difficolta)
+        self._schede[domanda_id] = scheda
+        heapq.heappush(self._heap, (scheda.scadenza, domanda_id))
+        self._campionatore = None
+
+    def rimuovi(self, domanda_id: int):
+        """Rimuove una domanda eliminata (la sua voce nell'heap verrà scartata)"""
+        if self._schede.pop(domanda_id, None) is not None:
+            self._modificate.pop(domanda_id, None)
+            self._log_in_attesa = [r for r in self._log_in_attesa if r[0] != domanda_id]
+            self._campionatore = None
+
+    def _pulisci_cima(self):
+        """Scarta le voci obsolete in cima all'heap"""
+        while self._heap:
+            scadenza, domanda_id = self._heap[0]
+            scheda = self._schede.get(domanda_id)
+            if scheda is not None and scheda.scadenza == scadenza:
+                return
+            heapq.heappop(self._heap)
+
+    def prossima(self, adesso: datetime = None) -> Optional[int]:
+        """
+        ID della prossima domanda da ripassare
+
+        Returns:
+            ID della domanda con scadenza più vicina, o None se nessuna è scaduta
+        """
+        adesso = adesso or datetime.now()
+        self._pulisci_cima()
+        if self._heap and self._heap[0][0] <= adesso:
+            return self._heap[0][1]
+        return None
+
+    def da_ripassare(self, adesso: datetime = None) -> int:
+        """Numero di domande già scadute (O(n), per le statistiche)"""
+        adesso = adesso or datetime.now()
+        return sum(1 for s in self._schede.values() if s.scadenza <= adesso)
+
+    def valuta(self, domanda_id: int, voto: int, adesso: datetime = None):
+        """
+        Registra una risposta e ripianifica la domanda
+
+        Args:
+            domanda_id: Domanda ripassata
+            voto: Qualità della risposta da 0 a 5
+            adesso: Istante della risposta (default: ora)
+        """
+        adesso = adesso or datetime.now()
+        scheda = self._schede[domanda_id]
+        scheda.valuta(voto, adesso)
+        heapq.heappush(self._heap, (scheda.scadenza, domanda_id))
+
+        self._modificate[domanda_id] = scheda
+        self._log_in_attesa.append(
+            (domanda_id, voto, adesso.strftime('%Y-%m-%d %H:%M:%S'), scheda.intervallo)
+        )
+        if len(self._log_in_attesa) >= self.dimensione_batch:
+            self.flush()
+
+    def flush(self):
+        """Scrive su database le valutazioni in attesa"""
+        if not self._log_in_attesa and not self._modificate:
+            return
+
+        schede = [
+            (s.domanda_id, s.ease, s.intervallo, s.ripetizioni,
+             s.scadenza.strftime('%Y-%m-%d %H:%M:%S'))
+            for s in self._modificate.values()
+        ]
+        self.db.salva_ripassi(schede, self._log_in_attesa)
+        self._modificate = {}
+        self._log_in_attesa = []
+
+    def quiz_casuale(self, n: int = 10, rng: random.Random = random) -> List[int]:
+        """
+        Estrae n domande distinte pesate per difficoltà (metodo alias)
+
+        Returns:
+            Lista di ID di domande
+        """
+        if not self._schede:
+            return []
+
+        if self._campionatore is None:
+            self._ids_campionatore = list(self._schede)
+            self._campionatore = CampionatoreAlias([
+                PESI_DIFFICOLTA.get(self._schede[i].difficolta, 2.0)
+                for i in self._ids_campionatore
+            ])
+
+        n = min(n, len(self._ids_campionatore))
+        estratte = []
+        viste = set()
+        while len(estratte) < n:
+            domanda_id = self._ids_campionatore[self._campionatore.campiona(rng)]
+            if domanda_id not in viste:
+                viste.add(domanda_id)
+                estratte.append(domanda_id)
+        return estratte
@@ -0,0 +1,187 @@
+# tools/compressione.py
+"""
+Confronta i codec di compressione su dati realistici
+
+Crea in una cartella temporanea un database con lauree, voti, tasse e
+domande, poi ne ricava tre file tipici: il backup del database, il CSV
+dei voti e il JSON Lines delle domande. Ogni file viene compresso con
+gzip, lzma e bz2 a più livelli, sempre a flusso come fanno esportatori
+e backup, e riletto con il riconoscimento automatico del formato.
+
+Per ogni combinazione riporta il rapporto di compressione e la velocità
+di compressione e di decompressione (MB non compressi al secondo).
+Esce con codice 1 se un file riletto non coincide con l'originale.
+
+Uso:
+    python tools/compressione.py [--voti 5000] [--domande 20000] [--livelli min,predefinito,max]
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.database import Database  # noqa: E402
+from utils.compressione import CODEC, apri_lettura, apri_scrittura, codec_disponibili  # noqa: E402
+from utils.exporters import ScrittoreCSV, ScrittoreJSONL  # noqa: E402
+
+MATERIE = (
+    "Analisi Matematica I", "Analisi Matematica II", "Geometria e Algebra Lineare",
+    "Fisica Generale I", "Fisica Generale II", "Fondamenti di Informatica",
+    "Algoritmi e Strutture Dati", "Basi di Dati", "Sistemi Operativi", "Reti di Calcolatori",
+    "Calcolo delle Probabilità", "Elettrotecnica", "Economia Aziendale",
+    "Ingegneria del Software", "Ricerca Operativa", "Chimica", "Lingua Inglese",
+)
+
+INIZI = (
+    "Enunciare e dimostrare", "Spiegare", "Descrivere", "Confrontare", "Discutere",
+    "Illustrare con un esempio", "Definire", "Calcolare",
+)
+
+ARGOMENTI = (
+    "il teorema di Lagrange", "il criterio di convergenza della serie armonica",
+    "la complessità dell'ordinamento per fusione", "il modello relazionale",
+    "la normalizzazione in terza forma normale", "lo scheduling round robin",
+    "il protocollo TCP e il controllo di congestione", "la legge di Gauss",
+    "il principio di conservazione dell'energia", "la diagonalizzazione di una matrice",
+    "il metodo del simplesso", "la distribuzione normale", "il paging della memoria",
+    "le transazioni e le proprietà ACID", "il teorema fondamentale del calcolo integrale",
+)
+
+CONTESTI = (
+    "", " nel caso generale", " con riferimento agli esercizi svolti a lezione",
+    " e discuterne i limiti", " in almeno due casi particolari",
+)
+
+# Livelli provati per ogni codec, per nome
+LIVELLI = {
+    'min': lambda c: c.livello_minimo,
+    'predefinito': lambda c: c.livello_predefinito,
+    'max': lambda c: c.livello_massimo,
+}
+
+
+def crea_database(percorso: Path, voti: int, domande: int, seme: int = 1) -> Database:
+    """Database con contenuti simili a quelli reali (ripetitivi come i veri)"""
+    casuale = random.Random(seme)
+    db = Database(str(percorso))
+    laurea_id = db.add_laurea("Ingegneria Informatica", "triennale", 180)
+    inizio = date(2019, 9, 1)
+
+    db.conn.executemany(
+        'INSERT INTO voti (materia, data, crediti, voto, laurea_id) VALUES (?, ?, ?, ?, ?)',
+        [(casuale.choice(MATERIE),
+          (inizio + timedelta(days=casuale.randrange(1800))).strftime('%Y-%m-%d'),
+          casuale.choice((6, 6, 9, 12)), casuale.randint(18, 31), laurea_id)
+         for _ in range(voti)]
+    )
+    db.conn.executemany(
+        'INSERT INTO tasse (descrizione, importo_centesimi, scadenza, pagata) VALUES (?, ?, ?, ?)',
+        [(f"Rata {i % 3 + 1} contributo onnicomprensivo {2019 + i // 3}",
+          casuale.choice((15600, 42000, 61500)),
+          (inizio + timedelta(days=120 * i)).strftime('%Y-%m-%d'), int(i < 12))
+         for i in range(max(1, voti // 100))]
+    )
+    db.conn.executemany(
+        'INSERT INTO domande (materia, anno, testo, difficolta) VALUES (?, ?, ?, ?)',
+        [(casuale.choice(MATERIE), str(casuale.randint(2019, 2024)),
+          f"{casuale.choice(INIZI)} {casuale.choice(ARGOMENTI)}{casuale.choice(CONTESTI)}.",
+          casuale.choice(('facile', 'media', 'difficile')))
+         for _ in range(domande)]
+    )
+    db.conn.commit()
+    return db
+
+
+def crea_file(db: Database, cartella: Path) -> dict:
+    """I file da comprimere, non compressi: nome -> percorso"""
+    backup = cartella / 'backup.db'
+    db.backup_database(str(backup))
+
+    voti_csv = cartella / 'voti.csv'
+    with ScrittoreCSV(voti_csv) as scrittore:
+        scrittore.scrivi_tutte(db.scorri_tabella('voti'))
+
+    domande_jsonl = cartella / 'domande.jsonl'
+    with ScrittoreJSONL(domande_jsonl) as scrittore:
+        scrittore.scrivi_tutte(db.scorri_tabella('domande'))
+
+    return {'backup': backup, 'voti.csv': voti_csv, 'domande.jsonl': domande_jsonl}
+
+
+def misura(origine: Path, destinazione: Path, compressione: str, livello: int):
+    """
+    Comprime e rilegge un file a flusso
+
+    Returns:
+        (byte compressi, secondi di compressione, secondi di lettura, riletto uguale)
+    """
+    inizio = time.perf_counter()
+    with open(origine, 'rb') as f, apri_scrittura(destinazione, compressione, livello) as z:
+        shutil.copyfileobj(f, z, 1024 * 1024)
+    compressione_s = time.perf_counter() - inizio
+
+    inizio = time.perf_counter()
+    with apri_lettura(destinazione) as z:
+        riletto = z.read()
+    lettura_s = time.perf_counter() - inizio
+
+    return destinazione.stat().st_size, compressione_s, lettura_s, riletto == origine.read_bytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confronta i codec di compressione")
+    parser.add_argument('--voti', type=int, default=5000, help="voti nel database di prova")
+    parser.add_argument('--domande', type=int, default=20000, help="domande nel database di prova")
+    parser.add_argument('--livelli', default='min,predefinito,max',
+                        help="livelli da provare, tra " + ", ".join(LIVELLI))
+    args = parser.parse_args()
+
+    livelli = args.livelli.split(',')
+    for nome in livelli:
+        if nome not in LIVELLI:
+            parser.error(f"livello non valido: {nome}")
+
+    mancanti = sorted(set(CODEC) - set(codec_disponibili()))
+    if mancanti:
+        print(f"Codec non disponibili in questo Python: {', '.join(mancanti)}")
+
+    ok = True
+    with tempfile.TemporaryDirectory() as cartella:
+        cartella = Path(cartella)
+        db = crea_database(cartella / 'prova.db', args.voti, args.domande)
+        try:
+            file = crea_file(db, cartella)
+        finally:
+            db.close()
+
+        print(f"{'file':<14} {'codec':<6} {'livello':>7} {'MB':>7} {'rapporto':>9} "
+              f"{'comp. MB/s':>11} {'lett. MB/s':>11}")
+        for nome_file, origine in file.items():
+            megabyte = origine.stat().st_size / 1e6
+            print(f"{nome_file:<14} {'-':<6} {'-':>7} {megabyte:7.2f} {1:9.2f}")
+            for compressione in codec_disponibili():
+                c = CODEC[compressione]
+                for livello in sorted({LIVELLI[nome](c) for nome in livelli}):
+                    destinazione = cartella / f"{origine.name}{c.estensione}"
+                    byte, comp_s, lett_s, uguale = misura(origine, destinazione,
+                                                          compressione, livello)
+                    ok = ok and uguale
+                    print(f"{'':<14} {compressione:<6} {livello:>7} {byte / 1e6:7.2f} "
+                          f"{origine.stat().st_size / byte:9.2f} "
+                          f"{megabyte / comp_s:11.1f} {megabyte / lett_s:11.1f}"
+                          f"{'' if uguale else '  DIVERSO'}")
+
+    print("OK" if ok else "ERRORE: file riletti diversi dagli originali")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
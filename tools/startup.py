@@ -0,0 +1,153 @@
+# tools/startup.py
+"""
+Misura l'avvio a freddo dell'app
+
+1. Tempi di import con `python -X importtime` (moduli più lenti)
+2. Tempo dal lancio del processo al primo frame disegnato, su più avvii
+
+L'app parte con una home temporanea, quindi il database reale non
+viene toccato. Esce con codice 1 se il tempo al primo frame supera
+l'obiettivo o se all'avvio vengono importati moduli pesanti.
+
+Uso:
+    python tools/startup.py [--avvii 3] [--obiettivo 1.0] [--top 15]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Librerie che non devono essere caricate prima del primo frame
+MODULI_PESANTI = ('numpy', 'pandas', 'matplotlib')
+
+# Obiettivo di tempo al primo frame (secondi, desktop)
+OBIETTIVO_PRIMO_FRAME = 1.0
+
+_SEGNALE = 'PRIMO_FRAME'
+
+
+def _ambiente(home: str) -> dict:
+    """Ambiente dei processi figli: home temporanea, Kivy senza log su console"""
+    env = dict(os.environ)
+    env.update({
+        'HOME': home,
+        'KIVY_HOME': os.path.join(home, '.kivy'),
+        'KIVY_NO_ARGS': '1',
+        'KIVY_NO_CONSOLELOG': '1',
+        'PYTHONPATH': str(ROOT_DIR),
+    })
+    return env
+
+
+def tempi_import(home: str, top: int):
+    """
+    Tempi di import di ui.app con -X importtime
+
+    Returns:
+        Lista di (cumulativo in ms, modulo) ordinata dal più lento
+    """
+    risultato = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ui.app'],
+        cwd=ROOT_DIR, env=_ambiente(home), capture_output=True, text=True
+    )
+    tempi = []
+    for riga in risultato.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not riga.startswith('import time:') or 'cumulative' in riga:
+            continue
+        _, cumulativo, modulo = riga[len('import time:'):].split('|')
+        tempi.append((int(cumulativo) / 1000, modulo.rstrip()))
+
+    tempi.sort(reverse=True)
+    return tempi[:top]
+
+
+def avvio_figlio():
+    """Avvia l'app e segnala il primo frame (eseguito nel processo figlio)"""
+    sys.path.insert(0, str(ROOT_DIR))
+    from kivy.core.window import Window
+    from ui.app import UniversityManagerApp
+
+    app = UniversityManagerApp()
+
+    def primo_frame(*args):
+        Window.unbind(on_flip=primo_frame)
+        pesanti = [m for m in MODULI_PESANTI if m in sys.modules]
+        print(_SEGNALE, ','.join(pesanti), flush=True)
+        app.stop()
+
+    Window.bind(on_flip=primo_frame)
+    app.run()
+
+
+def tempo_primo_frame(home: str):
+    """
+    Lancia l'app in un processo nuovo
+
+    Returns:
+        (secondi dal lancio al primo frame, moduli pesanti già importati)
+    """
+    inizio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, __file__, '--figlio'],
+        cwd=ROOT_DIR, env=_ambiente(home),
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    for riga in processo.stdout:
+        if riga.startswith(_SEGNALE):
+            durata = time.perf_counter() - inizio
+            processo.wait()
+            pesanti = riga[len(_SEGNALE):].strip()
+            return durata, pesanti.split(',') if pesanti else []
+
+    processo.wait()
+    raise RuntimeError(f"L'app è uscita (codice {processo.returncode}) prima del primo frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Misura l'avvio a freddo dell'app")
+    parser.add_argument('--avvii', type=int, default=3, help="numero di avvii misurati")
+    parser.add_argument('--obiettivo', type=float, default=OBIETTIVO_PRIMO_FRAME,
+                        help="tempo massimo al primo frame in secondi")
+    parser.add_argument('--top', type=int, default=15, help="moduli più lenti da mostrare")
+    parser.add_argument('--figlio', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.figlio:
+        avvio_figlio()
+        return 0
+
+    with tempfile.TemporaryDirectory() as home:
+        print(f"Import più lenti (ms cumulativi, {args.top}):")
+        for millisecondi, modulo in tempi_import(home, args.top):
+            print(f"  {millisecondi:8.1f}  {modulo}")
+
+        durate = []
+        pesanti = set()
+        for _ in range(args.avvii):
+            durata, moduli = tempo_primo_frame(home)
+            durate.append(durata)
+            pesanti.update(moduli)
+
+    mediana = statistics.median(durate)
+    print(f"\nPrimo frame: mediana {mediana:.2f}s, min {min(durate):.2f}s, "
+          f"max {max(durate):.2f}s ({args.avvii} avvii, obiettivo {args.obiettivo:.2f}s)")
+
+    ok = mediana <= args.obiettivo
+    if pesanti:
+        print(f"Moduli pesanti importati all'avvio: {', '.join(sorted(pesanti))}")
+        ok = False
+
+    print("OK" if ok else "OBIETTIVO NON RAGGIUNTO")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,24 +3,51 @@
 Applicazione principale KivyMD
 """
 
+import importlib
+
 from kivy.core.window import Window
+from kivy.properties import ObjectProperty
 from kivymd.app import MDApp
 from kivymd.uix.snackbar import Snackbar
 from kivy.uix.screenmanager import ScreenManager, Screen, SlideTransition
 from datetime import datetime
 
 from core.database import Database
+from core.events import LAUREE, VOTI, TASSE, RICORRENTI
 from core.calculator import CalcolatoreVoti
-from ui.screens.home import HomeScreen
-from ui.screens.lauree import LaureeScreen
-from ui.screens.voti import VotiScreen
-from ui.screens.tasse import TasseScreen
-from ui.screens.domande import DomandeScreen
+from core.materie import IndiceMaterie
+from core.dedup import DeduplicatoreDomande
+from core.ripasso import SchedulatoreRipasso
+from ui.promemoria import SchedulatorePromemoria
+from ui.loader import CaricatoreAsincrono
+from ui.stato import StatoApp
+from ui.profilo import Profilatore
+
+
+# Schermate: modulo e classe, importati e costruiti alla prima navigazione
+SCHERMATE = {
+    'home': ('ui.screens.home', 'HomeScreen'),
+    'lauree': ('ui.screens.lauree', 'LaureeScreen'),
+    'voti': ('ui.screens.voti', 'VotiScreen'),
+    'tasse': ('ui.screens.tasse', 'TasseScreen'),
+    'domande': ('ui.screens.domande', 'DomandeScreen'),
+}
+
+# Metodi delle schermate misurati in modalità profilo
+METODI_PROFILATI = ('on_enter', 'refresh_list', 'update_stats')
+
+# Compressione dei backup compatti, dal secondo bottone della home (vedi
+# utils/compressione.py): gzip si apre ovunque e su un database comprime
+# già a una frazione. Il backup normale resta una copia .db non compressa.
+COMPRESSIONE_BACKUP = 'gzip'
 
 
 class UniversityManagerApp(MDApp):
     """Applicazione principale"""
     
+    # Corso selezionato (la media in home lo segue)
+    current_laurea = ObjectProperty(None, allownone=True)
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.title = "University Manager"
@@ -32,9 +59,37 @@ class UniversityManagerApp(MDApp):
         # Database
         self.db = Database()
         
+        # Profilazione (solo con UM_PROFILO impostata, vedi ui/profilo.py)
+        self.profilo = Profilatore.da_ambiente(self.db.db_path.parent)
+        if self.profilo:
+            self.profilo.avvolgi_classe(Database, 'db')
+        
         # Calculator
         self.calculator = CalcolatoreVoti()
         
+        # Indice materie per autocompletamento
+        self.indice_materie = IndiceMaterie.da_database(self.db)
+        
+        # Indice LSH per le domande duplicate (costruito in background, vedi carica_dedup)
+        self.dedup = None
+        
+        # Promemoria scadenze tasse
+        self.promemoria = SchedulatorePromemoria(self.db, self.notifica_promemoria)
+        
+        # Ripasso domande (caricato al primo utilizzo)
+        self.ripasso = None
+        
+        # Letture delle schermate in background
+        self.caricatore = CaricatoreAsincrono(self.db)
+        
+        # Stato condiviso, aggiornato dagli eventi del database
+        self.stato = StatoApp(self.db, self.caricatore)
+        self.stato.definisci('lauree', (LAUREE,), lambda db: db.get_all_lauree())
+        self.stato.definisci('media', (VOTI,), self.leggi_media,
+                             filtro=self.riguarda_laurea_corrente)
+        self.stato.definisci('tasse_da_pagare', (TASSE, RICORRENTI),
+                             lambda db: db.conta_tasse_non_pagate())
+        
         # Stato applicazione
         self.current_laurea = None
         self.lauree = []
@@ -52,20 +107,29 @@ class UniversityManagerApp(MDApp):
         # Crea screen manager
         self.sm = ScreenManager(transition=SlideTransition())
         
-        # Aggiungi schermate
-        self.sm.add_widget(HomeScreen(name='home'))
-        self.sm.add_widget(LaureeScreen(name='lauree'))
-        self.sm.add_widget(VotiScreen(name='voti'))
-        self.sm.add_widget(TasseScreen(name='tasse'))
-        self.sm.add_widget(DomandeScreen(name='domande'))
+        # All'avvio serve solo la home, le altre schermate si costruiscono
+        # alla prima navigazione
+        self.get_screen('home')
         
-        # Carica dati iniziali
-        self.refresh_lauree()
+        # Lauree caricate in background e tenute aggiornate dagli eventi
+        self.stato.osserva('lauree', self.imposta_lauree)
         
         return self.sm
     
+    def get_screen(self, screen_name):
+        """Restituisce una schermata, costruendola se non esiste ancora"""
+        if not self.sm.has_screen(screen_name):
+            modulo, classe = SCHERMATE[screen_name]
+            screen_class = getattr(importlib.import_module(modulo), classe)
+            screen = screen_class(name=screen_name)
+            if self.profilo:
+                self.profilo.avvolgi(screen, METODI_PROFILATI, screen_name)
+            self.sm.add_widget(screen)
+        return self.sm.get_screen(screen_name)
+    
     def go_to_screen(self, screen_name, direction='left'):
         """Naviga a una schermata"""
+        self.get_screen(screen_name)
         self.sm.transition.direction = direction
         self.sm.current = screen_name
     
@@ -73,14 +137,84 @@ class UniversityManagerApp(MDApp):
         """Torna alla schermata precedente"""
         self.go_to_screen('home', direction='right')
     
-    def refresh_lauree(self):
-        """Ricarica la lista delle lauree"""
-        self.lauree = self.db.get_all_lauree()
+    def imposta_lauree(self, lauree):
+        """Aggiorna la lista delle lauree (osservatore dello stato 'lauree')"""
+        self.lauree = lauree
         
         # Se c'è una sola laurea, selezionala automaticamente
         if len(self.lauree) == 1 and self.current_laurea is None:
             self.current_laurea = self.lauree[0]
     
+    def on_current_laurea(self, instance, laurea):
+        """La media mostrata è quella del corso selezionato"""
+        self.stato.invalida('media')
+    
+    def leggi_media(self, db):
+        """Lettura in background: media del corso selezionato (None senza voti)"""
+        laurea = self.current_laurea
+        if laurea is None:
+            return None
+        voti = db.get_voti_by_laurea(laurea.id)
+        return self.calculator.calcola_media(voti) if voti else None
+    
+    def riguarda_laurea_corrente(self, evento):
+        """True se un evento sui voti tocca il corso selezionato"""
+        return self.current_laurea is not None and evento.riguarda_laurea(self.current_laurea.id)
+    
+    def get_ripasso(self):
+        """Restituisce lo schedulatore di ripasso, caricandolo se necessario"""
+        if self.ripasso is None:
+            self.ripasso = SchedulatoreRipasso.da_database(self.db)
+        return self.ripasso
+    
+    def carica_dedup(self):
+        """Costruisce in background l'indice delle domande duplicate (una volta)"""
+        if self.dedup is not None or self.caricatore.in_corso('dedup'):
+            return
+        # Le firme mancanti si calcolano sul thread di lettura: su una banca
+        # grande sono migliaia di MinHash, troppi per il thread di Kivy
+        self.caricatore.carica('dedup', DeduplicatoreDomande.calcola, self._dedup_pronto)
+    
+    def _dedup_pronto(self, risultato):
+        """Salva le firme calcolate in background e rende disponibile l'indice"""
+        indice, nuove = risultato
+        if nuove:
+            self.db.salva_firme_minhash(nuove)
+        self.dedup = indice
+    
+    def get_dedup(self):
+        """
+        Indice delle domande duplicate, o None finché non è pronto
+        
+        Al primo uso avvia la costruzione in background (vedi carica_dedup).
+        """
+        if self.dedup is None:
+            self.carica_dedup()
+        return self.dedup
+    
+    def unisci_materie(self, gruppo):
+        """Rinomina tutte le varianti di un gruppo nel primo nome del gruppo"""
+        canonico = gruppo[0]
+        aggiornate = 0
+        for variante in gruppo[1:]:
+            righe = self.db.rinomina_materia(variante, canonico)
+            self.indice_materie.rimuovi(variante, righe)
+            self.indice_materie.aggiungi(canonico, righe)
+            aggiornate += righe
+        return aggiornate
+    
+    def notifica_promemoria(self, tasse):
+        """Mostra i promemoria delle tasse in scadenza"""
+        if len(tasse) == 1:
+            tassa = tasse[0]
+            if tassa.giorni_alla_scadenza < 0:
+                testo = f"⏰ Tassa scaduta: {tassa.descrizione}"
+            else:
+                testo = f"⏰ {tassa.descrizione} scade il {tassa.scadenza_formattata}"
+        else:
+            testo = f"⏰ {len(tasse)} tasse in scadenza o scadute"
+        self.show_snackbar(testo, duration=4)
+    
     def show_snackbar(self, text, duration=2):
         """Mostra un messaggio snackbar"""
         Snackbar(
@@ -90,14 +224,45 @@ class UniversityManagerApp(MDApp):
             duration=duration
         ).open()
     
-    def create_backup(self):
-        """Crea un backup del database"""
+    def create_backup(self, comprimi: bool = False):
+        """
+        Crea un backup del database
+        
+        Args:
+            comprimi: Backup compresso con COMPRESSIONE_BACKUP invece
+                della copia .db (si ripristina allo stesso modo)
+        """
         try:
-            backup_path = self.db.backup_database()
+            backup_path = self.db.backup_database(
+                compressione=COMPRESSIONE_BACKUP if comprimi else None
+            )
             self.show_snackbar(f"✅ Backup creato: {backup_path}")
         except Exception as e:
             self.show_snackbar(f"❌ Errore backup: {str(e)}")
     
+    def on_start(self):
+        """Arma i promemoria quando l'app è pronta"""
+        self.promemoria.avvia()
+        if self.profilo:
+            self.profilo.avvia()
+    
+    def on_pause(self):
+        """
+        App in background: salva le valutazioni di ripasso in attesa
+        
+        Su Android il processo può essere chiuso dopo on_pause senza
+        passare da on_stop.
+        """
+        if self.ripasso:
+            self.ripasso.flush()
+        return True
+    
     def on_stop(self):
         """Chiude il database quando l'app si chiude"""
+        self.promemoria.ferma()
+        self.caricatore.chiudi()
+        if self.profilo:
+            self.profilo.ferma()
+        if self.ripasso:
+            self.ripasso.flush()
         self.db.close()
\ No newline at end of file
@@ -0,0 +1,134 @@
+# ui/loader.py
+"""
+Caricamento dei dati delle schermate in background
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+from core.database import Database
+
+
+class CaricatoreAsincrono:
+    """
+    Esegue le letture delle schermate su un pool di thread
+
+    Ogni thread ha la sua connessione al database in sola lettura (sqlite3
+    non condivide le connessioni tra thread); con il journal WAL le letture
+    non bloccano le scritture del thread principale. I risultati arrivano sul thread di
+    Kivy con Clock.schedule_once.
+
+    Ogni chiave (di solito il nome della schermata) ha una generazione:
+    una nuova richiesta o annulla() rendono obsoleti i caricamenti
+    precedenti, che vengono scartati all'arrivo. Se nel frattempo il
+    thread principale ha scritto sul database la lettura viene ripetuta,
+    così non sovrascrive una modifica appena mostrata; i lavori che
+    producono file (esportazioni) passano riprova=False e non si ripetono.
+    """
+
+    def __init__(self, db: Database, max_workers: int = 2):
+        """
+        Args:
+            db: Database del thread principale (serve il percorso del file)
+            max_workers: Numero di thread di lettura
+        """
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='caricatore')
+        self._locale = threading.local()
+        # Connessioni aperte dai thread, chiuse da chiudi()
+        self._connessioni: List[Database] = []
+        self._lock_connessioni = threading.Lock()
+        self._generazioni: Dict[str, int] = {}
+        self._in_corso: Dict[str, Future] = {}
+
+    def _database(self) -> Database:
+        """Connessione in sola lettura del thread corrente (aperta al primo uso)"""
+        db = getattr(self._locale, 'db', None)
+        if db is None:
+            db = Database.sola_lettura(self.db.db_path)
+            self._locale.db = db
+            with self._lock_connessioni:
+                self._connessioni.append(db)
+        return db
+
+    def carica(self, chiave: str, lettura: Callable[[Database], object],
+               consegna: Callable[[object], None],
+               errore: Optional[Callable[[Exception], None]] = None,
+               riprova: bool = True):
+        """
+        Avvia una lettura in background
+
+        Args:
+            chiave: Identifica chi carica; un nuovo carica() annulla il precedente
+            lettura: Chiamata su un thread del pool con il Database del thread;
+                non deve toccare widget
+            consegna: Chiamata sul thread di Kivy con il risultato
+            errore: Chiamata sul thread di Kivy se la lettura fallisce
+            riprova: Ripete la lettura se il thread principale scrive sul
+                database mentre è in corso (False per le esportazioni: il
+                file scritto è un'istantanea e rifarlo non serve)
+        """
+        self.annulla(chiave)
+        generazione = self._generazioni[chiave]
+        modifiche = self.db.conn.total_changes
+
+        futuro = self._executor.submit(lambda: lettura(self._database()))
+        self._in_corso[chiave] = futuro
+        futuro.add_done_callback(lambda f: Clock.schedule_once(
+            lambda dt: self._consegna(chiave, generazione, modifiche, f,
+                                      lettura, consegna, errore, riprova)
+        ))
+
+    def _consegna(self, chiave, generazione, modifiche, futuro,
+                  lettura, consegna, errore, riprova):
+        """Consegna un risultato sul thread di Kivy, se non è obsoleto"""
+        if self._generazioni.get(chiave) != generazione or futuro.cancelled():
+            return
+        self._in_corso.pop(chiave, None)
+
+        if riprova and self.db.conn.total_changes != modifiche:
+            # Scrittura durante la lettura: il risultato potrebbe non vederla
+            self.carica(chiave, lettura, consegna, errore)
+            return
+
+        try:
+            risultato = futuro.result()
+        except Exception as e:
+            if errore is not None:
+                errore(e)
+            else:
+                Logger.exception(f"Caricatore: lettura '{chiave}' fallita: {e}")
+            return
+
+        consegna(risultato)
+
+    def annulla(self, chiave: str):
+        """Rende obsoleto il caricamento in corso per una chiave"""
+        self._generazioni[chiave] = self._generazioni.get(chiave, 0) + 1
+        futuro = self._in_corso.pop(chiave, None)
+        if futuro is not None:
+            futuro.cancel()  # se non è ancora partito non parte
+
+    def in_corso(self, chiave: str) -> bool:
+        """True se c'è un caricamento non ancora consegnato"""
+        return chiave in self._in_corso
+
+    def chiudi(self):
+        """
+        Ferma il pool e chiude le connessioni dei thread
+
+        I caricamenti non partiti vengono annullati; si aspetta la fine di
+        quelli già partiti, che usano ancora le loro connessioni.
+        """
+        for chiave in list(self._in_corso):
+            self.annulla(chiave)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock_connessioni:
+            connessioni, self._connessioni = self._connessioni, []
+        for db in connessioni:
+            db.close()
@@ -0,0 +1,277 @@
+# ui/profilo.py
+"""
+Profilazione su dispositivo: tempi di frame, handler e query
+
+Attiva solo con la variabile d'ambiente UM_PROFILO:
+    UM_PROFILO=1 python main.py                  # tracce in profilo.jsonl accanto al database
+    UM_PROFILO=/tmp/tracce.jsonl python main.py  # tracce nel file indicato
+"""
+
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp, sp
+from kivy.uix.label import Label
+
+VARIABILE = 'UM_PROFILO'
+FILE_PREDEFINITO = 'profilo.jsonl'
+
+# Campioni tenuti per ogni misura (percentili sugli ultimi N)
+CAMPIONI = 200
+
+# Frame più lunghi di così finiscono nelle tracce (due frame a 60 Hz)
+SOGLIA_FRAME_MS = 1000 / 30
+
+# Ogni quanto aggiornare l'overlay e scrivere le tracce (secondi)
+INTERVALLO_OVERLAY = 0.5
+INTERVALLO_SCRITTURA = 1.0
+
+
+def percentile(valori, p: float) -> float:
+    """Percentile p (0-100) per rango più vicino (0.0 se non ci sono valori)"""
+    if not valori:
+        return 0.0
+    ordinati = sorted(valori)
+    indice = max(0, min(len(ordinati) - 1, round(p / 100 * len(ordinati)) - 1))
+    return ordinati[indice]
+
+
+class Profilatore:
+    """
+    Misura tempi con perf_counter e li scrive come tracce JSONL
+
+    Ogni misura ha un nome ("voti.refresh_list", "db.get_voti_by_laurea",
+    "frame") e gli ultimi CAMPIONI tempi in memoria per i percentili
+    dell'overlay. Le righe JSONL ({"t", "tipo", "nome", "ms", "thread"})
+    vengono accodate e scritte su file a intervalli, così la misura non
+    aggiunge I/O al frame. Le query arrivano anche dai thread del
+    caricatore: coda e campioni sono protetti da un lock.
+    """
+
+    def __init__(self, percorso):
+        """
+        Args:
+            percorso: File JSONL delle tracce (aperto in append)
+        """
+        self.percorso = Path(percorso)
+        self._campioni: Dict[str, deque] = defaultdict(lambda: deque(maxlen=CAMPIONI))
+        self._da_scrivere = []
+        self._lock = threading.Lock()
+        self._originali = []  # (oggetto, nome, attributo originale) per ripristina()
+        self._eventi = []
+        self.overlay = None
+
+    @classmethod
+    def da_ambiente(cls, cartella) -> Optional['Profilatore']:
+        """
+        Profilatore se UM_PROFILO è impostata, altrimenti None
+
+        Args:
+            cartella: Cartella del file predefinito (quella del database)
+        """
+        valore = os.environ.get(VARIABILE, '').strip()
+        if not valore or valore == '0':
+            return None
+        percorso = Path(cartella) / FILE_PREDEFINITO if valore == '1' else Path(valore)
+        return cls(percorso)
+
+    # ------------------------------------------------------------------
+    # Misure
+    # ------------------------------------------------------------------
+
+    def registra(self, tipo: str, nome: str, millisecondi: float, traccia: bool = True):
+        """
+        Registra una misura (da qualsiasi thread)
+
+        Args:
+            traccia: Se False la misura va solo nei percentili, non nel file
+        """
+        with self._lock:
+            self._campioni[nome].append(millisecondi)
+            if traccia:
+                self._da_scrivere.append({
+                    't': round(time.time(), 6),
+                    'tipo': tipo,
+                    'nome': nome,
+                    'ms': round(millisecondi, 3),
+                    'thread': threading.current_thread().name,
+                })
+
+    def cronometra(self, funzione, tipo: str, nome: str):
+        """
+        Restituisce funzione avvolta in un timer
+
+        Se la funzione restituisce un iteratore (un generatore come
+        Database.scorri, o una lettura a flusso come get_rate_virtuali) il
+        lavoro vero avviene consumandolo: il tempo misurato è quello della
+        chiamata più quello speso in ogni next(), registrato quando
+        l'iteratore finisce o viene chiuso.
+        """
+        @functools.wraps(funzione)
+        def misurata(*args, **kwargs):
+            inizio = time.perf_counter()
+            try:
+                risultato = funzione(*args, **kwargs)
+            except BaseException:
+                self.registra(tipo, nome, (time.perf_counter() - inizio) * 1000)
+                raise
+            trascorso = time.perf_counter() - inizio
+            if isinstance(risultato, Iterator):
+                return self._iterazione_misurata(risultato, tipo, nome, trascorso)
+            self.registra(tipo, nome, trascorso * 1000)
+            return risultato
+        return misurata
+
+    def _iterazione_misurata(self, iteratore: Iterator, tipo: str, nome: str, trascorso: float):
+        """Passa gli elementi di iteratore sommando il tempo dei next() (non del consumatore)"""
+        try:
+            while True:
+                inizio = time.perf_counter()
+                try:
+                    elemento = next(iteratore)
+                except StopIteration:
+                    return
+                finally:
+                    trascorso += time.perf_counter() - inizio
+                yield elemento
+        finally:
+            chiudi = getattr(iteratore, 'close', None)
+            if chiudi is not None:
+                chiudi()  # un consumatore uscito prima chiude anche la lettura
+            self.registra(tipo, nome, trascorso * 1000)
+
+    def avvolgi(self, oggetto, metodi: Iterable[str], prefisso: str, tipo: str = 'handler'):
+        """
+        Misura i metodi di un oggetto (solo quelli che esistono)
+
+        Il metodo avvolto è un attributo dell'istanza, quindi lo usano
+        anche le chiamate interne (self.refresh_list()) e il dispatch
+        degli eventi Kivy (on_enter).
+        """
+        for nome in metodi:
+            metodo = getattr(oggetto, nome, None)
+            if metodo is None:
+                continue
+            self._originali.append((oggetto, nome, oggetto.__dict__.get(nome)))
+            setattr(oggetto, nome, self.cronometra(metodo, tipo, f'{prefisso}.{nome}'))
+
+    def avvolgi_classe(self, classe, prefisso: str, tipo: str = 'db'):
+        """
+        Misura tutti i metodi pubblici di una classe (per tutte le istanze,
+        anche quelle dei thread del caricatore)
+        """
+        for nome, funzione in list(vars(classe).items()):
+            if nome.startswith('_') or not inspect.isfunction(funzione):
+                continue
+            self._originali.append((classe, nome, funzione))
+            setattr(classe, nome, self.cronometra(funzione, tipo, f'{prefisso}.{nome}'))
+
+    def ripristina(self):
+        """Toglie tutti i timer messi da avvolgi() e avvolgi_classe()"""
+        for oggetto, nome, originale in reversed(self._originali):
+            if originale is None:
+                delattr(oggetto, nome)  # era un metodo della classe
+            else:
+                setattr(oggetto, nome, originale)
+        self._originali.clear()
+
+    def percentili(self, nome: str):
+        """(p50, p95, campioni) degli ultimi tempi di una misura"""
+        with self._lock:
+            valori = list(self._campioni.get(nome, ()))
+        return percentile(valori, 50), percentile(valori, 95), len(valori)
+
+    def piu_lenti(self, n: int = 4):
+        """Le n misure (frame esclusi) con il p95 più alto, come (nome, p50, p95)"""
+        with self._lock:
+            nomi = [nome for nome in self._campioni if nome != 'frame']
+        righe = [(nome, *self.percentili(nome)[:2]) for nome in nomi]
+        righe.sort(key=lambda riga: riga[2], reverse=True)
+        return righe[:n]
+
+    # ------------------------------------------------------------------
+    # Frame, overlay e file
+    # ------------------------------------------------------------------
+
+    def avvia(self):
+        """Misura i frame, mostra l'overlay e scrive le tracce a intervalli"""
+        self.overlay = OverlayProfilo()
+        Window.add_widget(self.overlay)
+        self._eventi = [
+            Clock.schedule_interval(self._frame, 0),
+            Clock.schedule_interval(self._aggiorna_overlay, INTERVALLO_OVERLAY),
+            Clock.schedule_interval(lambda dt: self.scrivi(), INTERVALLO_SCRITTURA),
+        ]
+
+    def ferma(self):
+        """Ferma le misure, scrive le ultime tracce e toglie i timer"""
+        for evento in self._eventi:
+            evento.cancel()
+        self._eventi = []
+        if self.overlay is not None:
+            Window.remove_widget(self.overlay)
+            self.overlay = None
+        self.scrivi()
+        self.ripristina()
+
+    def _frame(self, dt):
+        """Tempo dal frame precedente: solo i frame lenti vanno nelle tracce"""
+        millisecondi = dt * 1000
+        self.registra('frame', 'frame', millisecondi, traccia=millisecondi > SOGLIA_FRAME_MS)
+
+    def _aggiorna_overlay(self, dt):
+        p50, p95, _ = self.percentili('frame')
+        righe = [f"frame  p50 {p50:5.1f}  p95 {p95:5.1f} ms"]
+        righe += [f"{nome[:26]:26}  {p50:5.1f}  {p95:5.1f}"
+                  for nome, p50, p95 in self.piu_lenti()]
+        self.overlay.text = "\n".join(righe)
+
+    def scrivi(self):
+        """Accoda al file le tracce raccolte"""
+        with self._lock:
+            righe, self._da_scrivere = self._da_scrivere, []
+        if not righe:
+            return
+        self.percorso.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.percorso, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(riga, ensure_ascii=False) + '\n' for riga in righe)
+
+
+class OverlayProfilo(Label):
+    """Riquadro semitrasparente in alto a destra con i percentili"""
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            font_size=sp(10),
+            font_name='RobotoMono-Regular',
+            halign='left',
+            valign='top',
+            color=(1, 1, 1, 1),
+            size_hint=(None, None),
+            padding=(dp(6), dp(4)),
+            **kwargs
+        )
+        with self.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self._sfondo = Rectangle()
+        self.bind(texture_size=self._ridimensiona, pos=self._ridimensiona)
+        Window.bind(size=self._ridimensiona)
+
+    def _ridimensiona(self, *args):
+        self.size = self.texture_size
+        self.pos = (Window.width - self.width, Window.height - self.height)
+        self._sfondo.pos = self.pos
+        self._sfondo.size = self.size
+
+    def on_touch_down(self, touch):
+        return False  # l'overlay non deve rubare i tocchi
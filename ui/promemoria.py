@@ -0,0 +1,169 @@
+# ui/promemoria.py
+"""
+Promemoria per le scadenze delle tasse
+"""
+
+import heapq
+import itertools
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, List, Optional
+
+from kivy.clock import Clock
+
+from core.events import TASSE, RICORRENTI
+from core.models import aggiungi_mesi
+
+# Mesi di rate ricorrenti caricate: quelle più lontane entrano al prossimo
+# avvio (o alla prossima modifica delle regole), molto prima che servano
+ORIZZONTE_MESI = 12
+
+
+class SchedulatorePromemoria:
+    """
+    Promemoria delle tasse non pagate guidato dagli eventi
+
+    Le tasse non pagate sono in una coda di priorità ordinata per orario
+    del promemoria e c'è un solo evento Clock armato, quello del primo
+    promemoria: tra un promemoria e l'altro non gira nessun codice.
+    L'evento viene riarmato solo quando una modifica cambia la cima della
+    coda. Le voci superate restano nell'heap e vengono scartate quando
+    arrivano in cima.
+
+    Le tasse sono indicizzate per Tassa.chiave, così anche le rate
+    ricorrenti non ancora salvate hanno il loro promemoria.
+
+    Le modifiche arrivano dagli eventi del database: chi modifica le
+    tasse non deve avvisare lo schedulatore.
+    """
+
+    def __init__(self, db, notifica: Callable[[List], None],
+                 anticipo_giorni: int = 3, ora: time = time(9, 0)):
+        """
+        Args:
+            db: Database da cui leggere le tasse
+            notifica: Chiamata con la lista delle tasse da ricordare
+            anticipo_giorni: Giorni di anticipo del promemoria sulla scadenza
+            ora: Ora del giorno a cui mostrare il promemoria
+        """
+        self.db = db
+        self.notifica = notifica
+        self.anticipo_giorni = anticipo_giorni
+        self.ora = ora
+        self._promemoria: Dict[object, datetime] = {}  # Tassa.chiave -> orario
+        self._virtuali: Dict[tuple, object] = {}  # rate ricorrenti non salvate
+        self._heap: List[tuple] = []
+        self._contatore = itertools.count()  # spareggio: le chiavi non sono confrontabili
+        self._evento = None
+        self._armato_per: Optional[tuple] = None
+        db.eventi.iscrivi((TASSE, RICORRENTI), self._su_modifica)
+
+    def orario_promemoria(self, tassa) -> datetime:
+        """Orario del promemoria per una tassa"""
+        giorno = tassa.scadenza.date() - timedelta(days=self.anticipo_giorni)
+        return datetime.combine(giorno, self.ora)
+
+    def avvia(self):
+        """Carica le tasse non pagate e arma il primo promemoria"""
+        orizzonte = aggiungi_mesi(datetime.now(), ORIZZONTE_MESI).date()
+        tasse = self.db.get_tasse_non_pagate(a=orizzonte)
+        self._promemoria = {tassa.chiave: self.orario_promemoria(tassa) for tassa in tasse}
+        self._virtuali = {tassa.chiave: tassa for tassa in tasse if tassa.virtuale}
+        self._heap = [(quando, next(self._contatore), chiave)
+                      for chiave, quando in self._promemoria.items()]
+        heapq.heapify(self._heap)
+        self._arma()
+
+    def _su_modifica(self, evento):
+        """Evento dal database: aggiorna le tasse toccate o ricarica le serie"""
+        if evento.argomento == RICORRENTI:
+            self.ricarica()
+            return
+        for tassa_id in evento.ids:
+            self.aggiorna_tassa(tassa_id)
+
+    def ricarica(self):
+        """Ricarica tutto dopo una modifica alle regole delle tasse ricorrenti"""
+        self.avvia()
+
+    def ferma(self):
+        """Annulla l'evento armato"""
+        if self._evento is not None:
+            self._evento.cancel()
+            self._evento = None
+        self._armato_per = None
+
+    def _testa(self) -> Optional[tuple]:
+        """Prima voce valida dell'heap (scarta quelle superate)"""
+        while self._heap:
+            quando, _, chiave = self._heap[0]
+            if self._promemoria.get(chiave) == quando:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def _arma(self):
+        """Arma un solo evento Clock per il primo promemoria"""
+        testa = self._testa()
+        if testa == self._armato_per:
+            return
+
+        self.ferma()
+        if testa is None:
+            return
+
+        ritardo = max(0.0, (testa[0] - datetime.now()).total_seconds())
+        self._evento = Clock.schedule_once(self._scatta, ritardo)
+        self._armato_per = testa
+
+    def _scatta(self, dt):
+        """Notifica tutti i promemoria scaduti e arma il successivo"""
+        self._evento = None
+        self._armato_per = None
+        adesso = datetime.now()
+
+        da_notificare = []
+        while True:
+            testa = self._testa()
+            if testa is None or testa[0] > adesso:
+                break
+            heapq.heappop(self._heap)
+            del self._promemoria[testa[2]]
+            da_notificare.append(testa[2])
+
+        tasse = [t for t in (self._rileggi(chiave) for chiave in da_notificare)
+                 if t is not None and not t.pagata]
+        if tasse:
+            self.notifica(tasse)
+
+        self._arma()
+
+    def _rileggi(self, chiave):
+        """Stato attuale di una tassa (le rate virtuali non sono nel database)"""
+        if isinstance(chiave, tuple):
+            return self._virtuali.pop(chiave, None)
+        return self.db.get_tassa_by_id(chiave)
+
+    def aggiorna_tassa(self, tassa_id: int):
+        """
+        Ricalcola il promemoria di una tassa aggiunta, modificata,
+        pagata o eliminata
+
+        L'evento Clock viene riarmato solo se cambia la cima della coda.
+        """
+        tassa = self.db.get_tassa_by_id(tassa_id)
+
+        if tassa is not None and tassa.ricorrenza_id is not None:
+            # La rata è stata salvata: il promemoria virtuale non serve più
+            virtuale = ('ricorrente', tassa.ricorrenza_id, tassa.occorrenza)
+            self._promemoria.pop(virtuale, None)
+            self._virtuali.pop(virtuale, None)
+
+        if tassa is None or tassa.pagata:
+            self._promemoria.pop(tassa_id, None)
+        else:
+            quando = self.orario_promemoria(tassa)
+            if self._promemoria.get(tassa_id) != quando:
+                self._promemoria[tassa_id] = quando
+                heapq.heappush(self._heap, (quando, next(self._contatore), tassa_id))
+
+        self._arma()
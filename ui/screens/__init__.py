@@ -1,13 +1,20 @@
 # ui/screens/__init__.py
 """
 Package schermate
+
+Le schermate vengono importate solo quando servono (PEP 562):
+importare una di esse non carica anche le altre.
 """
 
-from .home import HomeScreen
-from .lauree import LaureeScreen
-from .voti import VotiScreen
-from .tasse import TasseScreen
-from .domande import DomandeScreen
+import importlib
+
+_MODULI = {
+    'HomeScreen': '.home',
+    'LaureeScreen': '.lauree',
+    'VotiScreen': '.voti',
+    'TasseScreen': '.tasse',
+    'DomandeScreen': '.domande'
+}
 
 __all__ = [
     'HomeScreen',
@@ -15,4 +22,10 @@ __all__ = [
     'VotiScreen',
     'TasseScreen',
     'DomandeScreen'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(nome):
+    if nome in _MODULI:
+        return getattr(importlib.import_module(_MODULI[nome], __name__), nome)
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -3,33 +3,59 @@
 Schermata gestione domande d'esame
 """
 
+from kivy.clock import Clock
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDRaisedButton, MDIconButton, MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.textfield import MDTextField
-from kivymd.uix.list import MDList, TwoLineAvatarIconListItem, IconLeftWidget, IconRightWidget
 from kivymd.uix.menu import MDDropdownMenu
 from kivy.metrics import dp
 from kivymd.app import MDApp
 
+from core.events import DOMANDE
+from core.materie import IndiceMaterie
+from core.models import Domanda
+from core.ricerca import RicercaIncrementale, normalizza_ricerca
+from ui.widgets import ListaVirtuale, DialogoConferma, apri_menu, azzera_campo
+
+# Attesa dopo l'ultimo tasto prima di cercare (secondi)
+RITARDO_RICERCA = 0.25
+
+# Righe mostrate al massimo: oltre si chiede di restringere la ricerca
+MASSIMO_RIGHE = 500
+
 
 class DomandeScreen(Screen):
     """Schermata gestione domande d'esame"""
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # Dialog e menu costruiti alla prima apertura e poi riusati
         self.dialog = None
+        self.add_dialog = None
+        self.detail_dialog = None
+        self.scheda_dialog = None
+        self.conferma = None
+        self.dup_dialog = None
         self.selected_materia = None
         self.selected_anno = None
+        self.azioni_menu = None
         self.materia_menu = None
         self.anno_menu = None
         self.difficolta_menu = None
         self.selected_difficolta = None
+        self.scheda_id = None
+        self.coda_quiz = None
+        # Lista da ricaricare all'ingresso (le domande sono cambiate altrove)
+        self.da_ricaricare = True
+        # Risultati recenti, raffinati in memoria mentre si digita
+        self.ricerca = RicercaIncrementale()
+        self._cerca = Clock.create_trigger(lambda dt: self.refresh_list(), RITARDO_RICERCA)
         self.build_ui()
+        self.get_app().db.eventi.iscrivi((DOMANDE,), self.su_modifica)
     
     def build_ui(self):
         """Costruisce l'interfaccia"""
@@ -43,11 +69,14 @@ class DomandeScreen(Screen):
         filters = self.create_filters()
         layout.add_widget(filters)
         
-        # Lista domande
-        self.scroll = ScrollView()
-        self.domande_list = MDList()
-        self.scroll.add_widget(self.domande_list)
-        layout.add_widget(self.scroll)
+        # Lista domande (virtualizzata)
+        self.domande_list = ListaVirtuale(
+            viewclass='RigaDueLinee',
+            ordine=lambda domanda: (domanda.materia, domanda.anno, domanda.id),
+            apri=self.show_domanda_detail,
+            elimina=self.confirm_delete_domanda
+        )
+        layout.add_widget(self.domande_list)
         
         # Bottone add
         add_btn = MDRaisedButton(
@@ -90,15 +119,186 @@ class DomandeScreen(Screen):
         )
         header.add_widget(title)
         
+        # Menu azioni
+        menu_btn = MDIconButton(
+            icon="dots-vertical",
+            on_release=self.show_menu
+        )
+        header.add_widget(menu_btn)
+        
         return header
     
+    def show_menu(self, instance):
+        """Mostra menu azioni"""
+        if self.azioni_menu is None:
+            menu_items = [
+                {"text": "🧠 Modalità studio", "on_release": lambda x=None: self.avvia_studio()},
+                {"text": "🎲 Quiz casuale", "on_release": lambda x=None: self.avvia_quiz()},
+                {"text": "🧹 Unisci duplicati", "on_release": lambda x=None: self.show_duplicati()},
+            ]
+            self.azioni_menu = MDDropdownMenu(items=menu_items, width_mult=4)
+        
+        apri_menu(self.azioni_menu, instance)
+    
+    def avvia_studio(self):
+        """Ripasso delle domande scadute secondo la ripetizione dilazionata"""
+        self.azioni_menu.dismiss()
+        self.coda_quiz = None
+        self.show_prossima_scheda()
+    
+    def avvia_quiz(self, n=10):
+        """Quiz su domande casuali, pesate per difficoltà"""
+        self.azioni_menu.dismiss()
+        self.coda_quiz = self.get_app().get_ripasso().quiz_casuale(n)
+        self.show_prossima_scheda()
+    
+    def show_prossima_scheda(self):
+        """Mostra la prossima domanda da ripassare"""
+        app = self.get_app()
+        ripasso = app.get_ripasso()
+        
+        if self.coda_quiz is not None:
+            domanda_id = self.coda_quiz.pop(0) if self.coda_quiz else None
+        else:
+            domanda_id = ripasso.prossima()
+        
+        if domanda_id is None:
+            if self.dialog:
+                self.dialog.dismiss()
+            ripasso.flush()
+            app.show_snackbar("🎉 Nessuna domanda da ripassare")
+            return
+        
+        domanda = app.db.get_domanda_by_id(domanda_id)
+        
+        if self.scheda_dialog is None:
+            self.scheda_dialog = self.create_scheda_dialog()
+        
+        # Tra una scheda e l'altra il dialog resta aperto: cambiano solo i testi
+        if self.dialog and self.dialog is not self.scheda_dialog:
+            self.dialog.dismiss()
+        
+        self.scheda_id = domanda_id
+        self.scheda_dialog.title = f"{domanda.difficolta_emoji} {domanda.materia} ({domanda.anno})"
+        self.scheda_label.text = domanda.testo
+        self.dialog = self.scheda_dialog
+        self.dialog.open()
+    
+    def create_scheda_dialog(self):
+        """Costruisce il dialog delle schede di ripasso"""
+        self.scheda_label = MDLabel(
+            size_hint_y=None,
+            height=dp(200)
+        )
+        
+        # Valutazioni SM-2: 1 = non ricordata, 5 = perfetta
+        dialog = MDDialog(
+            title=" ",
+            type="custom",
+            content_cls=self.scheda_label,
+            buttons=[
+                MDFlatButton(
+                    text="DI NUOVO",
+                    on_release=lambda x: self.valuta_scheda(self.scheda_id, 1)
+                ),
+                MDFlatButton(
+                    text="DIFFICILE",
+                    on_release=lambda x: self.valuta_scheda(self.scheda_id, 3)
+                ),
+                MDFlatButton(
+                    text="BENE",
+                    on_release=lambda x: self.valuta_scheda(self.scheda_id, 4)
+                ),
+                MDRaisedButton(
+                    text="FACILE",
+                    on_release=lambda x: self.valuta_scheda(self.scheda_id, 5)
+                )
+            ]
+        )
+        dialog.bind(on_dismiss=self.chiudi_scheda)
+        return dialog
+    
+    def chiudi_scheda(self, dialog):
+        """Sessione interrotta o finita: le valutazioni in attesa vanno su database"""
+        app = self.get_app()
+        if app.ripasso:
+            app.ripasso.flush()
+    
+    def valuta_scheda(self, domanda_id, voto):
+        """Registra la risposta e passa alla domanda successiva"""
+        self.get_app().get_ripasso().valuta(domanda_id, voto)
+        self.show_prossima_scheda()
+    
+    def show_duplicati(self):
+        """Mostra i gruppi di domande quasi duplicate"""
+        self.azioni_menu.dismiss()
+        app = self.get_app()
+        dedup = app.get_dedup()
+        if dedup is None:
+            app.show_snackbar("⏳ Analisi delle domande in corso, riprova tra poco")
+            return
+        cluster = dedup.trova_cluster()
+        
+        if not cluster:
+            app.show_snackbar("✅ Nessuna domanda duplicata")
+            return
+        
+        if self.dialog:
+            self.dialog.dismiss()
+        
+        da_eliminare = sum(len(gruppo) - 1 for gruppo in cluster)
+        
+        if self.conferma is None:
+            self.conferma = DialogoConferma()
+        
+        self.dialog = self.conferma
+        self.conferma.apri(
+            "Domande duplicate",
+            (f"Trovati {len(cluster)} gruppi di domande simili.\n"
+             f"Verrà mantenuta la domanda più vecchia di ogni gruppo "
+             f"({da_eliminare} da eliminare)."),
+            lambda: self.unisci_duplicati(cluster),
+            conferma="UNISCI"
+        )
+    
+    def unisci_duplicati(self, cluster):
+        """Elimina i duplicati tenendo la prima domanda di ogni gruppo"""
+        app = self.get_app()
+        duplicati = [domanda_id for gruppo in cluster for domanda_id in gruppo[1:]]
+        
+        app.db.delete_domande(duplicati)
+        for domanda_id in duplicati:
+            if app.dedup is not None:
+                app.dedup.rimuovi(domanda_id)
+            if app.ripasso:
+                app.ripasso.rimuovi(domanda_id)
+        app.indice_materie = IndiceMaterie.da_database(app.db)
+        
+        self.dialog.dismiss()
+        for domanda_id in duplicati:
+            self.domande_list.rimuovi(domanda_id)
+        app.show_snackbar(f"🧹 {len(duplicati)} domande duplicate eliminate")
+    
     def create_filters(self):
         """Crea i filtri"""
+        container = BoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            height=dp(120),
+            padding=[dp(10), 0, dp(10), 0]
+        )
+        
+        # Ricerca nel testo mentre si digita
+        self.cerca_field = MDTextField(
+            hint_text="Cerca nel testo",
+            icon_right="magnify"
+        )
+        self.cerca_field.bind(text=self.on_cerca_text)
+        container.add_widget(self.cerca_field)
+        
         filters = BoxLayout(
             orientation='horizontal',
-            size_hint_y=None,
-            height=dp(60),
-            padding=dp(10),
+            padding=[0, dp(10)],
             spacing=dp(10)
         )
         
@@ -118,7 +318,13 @@ class DomandeScreen(Screen):
         )
         filters.add_widget(self.anno_btn)
         
-        return filters
+        container.add_widget(filters)
+        return container
+    
+    def on_cerca_text(self, instance, text):
+        """Ogni tasto rimanda la ricerca: parte solo quando si smette di digitare"""
+        self._cerca.cancel()
+        self._cerca()
     
     def show_materia_menu(self, instance):
         """Mostra menu materie"""
@@ -140,12 +346,12 @@ class DomandeScreen(Screen):
                 "on_release": lambda x=materia: self.select_materia(x)
             })
         
-        self.materia_menu = MDDropdownMenu(
-            caller=instance,
-            items=menu_items,
-            width_mult=4
-        )
-        self.materia_menu.open()
+        # Il menu viene riusato: cambiano solo chiamante e voci
+        if self.materia_menu is None:
+            self.materia_menu = MDDropdownMenu(width_mult=4)
+        
+        self.materia_menu.items = menu_items
+        apri_menu(self.materia_menu, instance)
     
     def select_materia(self, materia):
         """Seleziona una materia"""
@@ -175,12 +381,11 @@ class DomandeScreen(Screen):
                 "on_release": lambda x=anno: self.select_anno(x)
             })
         
-        self.anno_menu = MDDropdownMenu(
-            caller=instance,
-            items=menu_items,
-            width_mult=3
-        )
-        self.anno_menu.open()
+        if self.anno_menu is None:
+            self.anno_menu = MDDropdownMenu(width_mult=3)
+        
+        self.anno_menu.items = menu_items
+        apri_menu(self.anno_menu, instance)
     
     def select_anno(self, anno):
         """Seleziona un anno"""
@@ -191,93 +396,160 @@ class DomandeScreen(Screen):
         self.refresh_list()
     
     def on_enter(self):
-        """Aggiorna quando si entra"""
-        self.refresh_list()
+        """Ricarica la lista solo se le domande sono cambiate altrove"""
+        if self.da_ricaricare:
+            self.refresh_list()
+        # L'indice dei duplicati serve ad "Aggiungi" e "Duplicati": si prepara ora
+        self.get_app().carica_dedup()
+    
+    def on_leave(self):
+        """Annulla il caricamento se si esce prima che finisca"""
+        caricatore = self.get_app().caricatore
+        if caricatore.in_corso(self.name):
+            self.da_ricaricare = True
+        caricatore.annulla(self.name)
+    
+    def su_modifica(self, evento):
+        """Evento dal database: le modifiche fatte qui sono già nella lista"""
+        # I risultati in memoria invece non le conoscono
+        self.ricerca.svuota()
+        if self.manager is None or self.manager.current != self.name:
+            self.da_ricaricare = True
     
     def refresh_list(self):
-        """Aggiorna lista domande"""
-        self.domande_list.clear_widgets()
-        app = self.get_app()
-        
-        # Filtra domande
-        if self.selected_materia:
-            domande = app.db.get_domande_by_materia(
-                self.selected_materia,
-                self.selected_anno
-            )
-        else:
-            # Prendi tutte le domande
-            materie = app.db.get_all_materie()
-            domande = []
-            for materia in materie:
-                domande.extend(app.db.get_domande_by_materia(materia, self.selected_anno))
-        
-        if not domande:
-            empty_label = MDLabel(
-                text="Nessuna domanda trovata.\nAggiungi la tua prima domanda!",
-                halign="center",
-                theme_text_color="Secondary"
-            )
-            self.domande_list.add_widget(empty_label)
+        """
+        Carica la lista domande in background
+        
+        Se la ricerca contiene una ricerca già fatta con gli stessi filtri,
+        si filtrano in memoria quei risultati invece di rileggere il
+        database. Ogni nuova ricerca annulla quella precedente (stessa
+        chiave nel caricatore).
+        """
+        self.da_ricaricare = False
+        self._cerca.cancel()
+        
+        # Filtri letti ora: se cambiano parte un nuovo caricamento
+        materia, anno = self.selected_materia, self.selected_anno
+        filtri = (materia, anno)
+        ricerca = normalizza_ricerca(self.cerca_field.text.strip())
+        versione = self.ricerca.versione
+        
+        base = self.ricerca.base(filtri, ricerca)
+        if base is not None:
+            # La lista attuale resta visibile finché arrivano i risultati
+            lettura = lambda db: RicercaIncrementale.filtra(base, ricerca)
         else:
-            for domanda in domande:
-                item = self.create_domanda_item(domanda)
-                self.domande_list.add_widget(item)
+            self.domande_list.mostra_caricamento()
+            lettura = lambda db: self.leggi_domande(db, materia, anno, ricerca)
+        
+        self.get_app().caricatore.carica(
+            self.name,
+            lettura,
+            lambda risultati: self.mostra_domande(filtri, ricerca, versione, risultati)
+        )
     
-    def create_domanda_item(self, domanda):
-        """Crea un item per una domanda"""
-        item = TwoLineAvatarIconListItem(
-            text=f"{domanda.difficolta_emoji} {domanda.testo[:50]}...",
-            secondary_text=f"{domanda.materia} • {domanda.anno}",
-            on_release=lambda x: self.show_domanda_detail(domanda)
+    def leggi_domande(self, db, materia, anno, ricerca):
+        """Lettura in background: righe della lista (nessun widget)"""
+        # Filtra domande (una sola query anche senza materia selezionata)
+        domande = db.query_domande(materia=materia, anno=anno, testo=ricerca)
+        return RicercaIncrementale.crea(
+            [self.create_domanda_item(domanda) for domanda in domande],
+            [domanda.testo for domanda in domande]
         )
+    
+    def mostra_domande(self, filtri, ricerca, versione, risultati):
+        """Mostra le domande caricate"""
+        if versione != self.ricerca.versione:
+            # Le domande sono cambiate durante la lettura: si rilegge
+            self.refresh_list()
+            return
         
-        # Icona
-        icon_widget = IconLeftWidget(icon="file-document-outline")
-        item.add_widget(icon_widget)
-        
-        # Bottone elimina
-        delete_btn = IconRightWidget(
-            icon="delete",
-            on_release=lambda x: self.confirm_delete_domanda(domanda)
+        self.ricerca.salva(filtri, ricerca, risultati)
+        righe, _ = risultati
+        if ricerca:
+            vuoto = "Nessuna domanda contiene il testo cercato."
+        else:
+            vuoto = "Nessuna domanda trovata.\nAggiungi la tua prima domanda!"
+        # Già nell'ordine della lista: la query ordina per materia, anno, id
+        # e il filtro in memoria lo conserva
+        self.domande_list.mostra(
+            righe,
+            vuoto=vuoto,
+            ordinate=True,
+            massimo=MASSIMO_RIGHE,
+            oltre="… e altre {n} domande: affina la ricerca o i filtri"
         )
-        item.add_widget(delete_btn)
-        
-        return item
+    
+    def create_domanda_item(self, domanda):
+        """Dati della riga di una domanda"""
+        return {
+            'text': f"{domanda.difficolta_emoji} {domanda.testo[:50]}...",
+            'secondary_text': f"{domanda.materia} • {domanda.anno}",
+            'icona': "file-document-outline",
+            'elemento': domanda,
+            'chiave': domanda.id
+        }
     
     def show_domanda_detail(self, domanda):
         """Mostra dettaglio domanda"""
         if self.dialog:
             self.dialog.dismiss()
         
-        content = MDLabel(
-            text=domanda.testo,
-            size_hint_y=None,
-            height=dp(200)
-        )
+        if self.detail_dialog is None:
+            self.detail_label = MDLabel(
+                size_hint_y=None,
+                height=dp(200)
+            )
+            self.detail_dialog = MDDialog(
+                title=" ",
+                type="custom",
+                content_cls=self.detail_label,
+                buttons=[
+                    MDFlatButton(
+                        text="CHIUDI",
+                        on_release=lambda x: self.dialog.dismiss()
+                    )
+                ]
+            )
         
-        self.dialog = MDDialog(
-            title=f"{domanda.materia} ({domanda.anno})",
-            type="custom",
-            content_cls=content,
-            buttons=[
-                MDFlatButton(
-                    text="CHIUDI",
-                    on_release=lambda x: self.dialog.dismiss()
-                )
-            ]
-        )
+        self.detail_dialog.title = f"{domanda.materia} ({domanda.anno})"
+        self.detail_label.text = domanda.testo
+        self.dialog = self.detail_dialog
         self.dialog.open()
     
     def show_add_dialog(self, instance):
-        """Mostra dialog per aggiungere domanda"""
+        """Mostra dialog per aggiungere domanda (riusato: si azzerano solo i campi)"""
         if self.dialog:
             self.dialog.dismiss()
         
+        if self.add_dialog is None:
+            self.add_dialog = self.create_add_dialog()
+        
+        azzera_campo(self.materia_field)
+        self.suggerimenti_box.clear_widgets()
+        azzera_campo(self.anno_field)
+        azzera_campo(self.testo_field)
+        self.selected_difficolta = None
+        self.difficolta_btn.text = "Difficoltà: Non specificata"
+        
+        self.dialog = self.add_dialog
+        self.dialog.open()
+    
+    def create_add_dialog(self):
+        """Costruisce il dialog per aggiungere domanda"""
         self.materia_field = MDTextField(
             hint_text="Materia",
             required=True
         )
+        self.materia_field.bind(text=self.on_materia_text)
+        
+        # Suggerimenti materie già usate
+        self.suggerimenti_box = BoxLayout(
+            orientation='horizontal',
+            spacing=dp(5),
+            size_hint_y=None,
+            height=dp(36)
+        )
         
         self.anno_field = MDTextField(
             hint_text="Anno (es. 2024/25)",
@@ -292,7 +564,6 @@ class DomandeScreen(Screen):
         
         # Bottone difficoltà
         self.difficolta_btn = MDRaisedButton(
-            text="Difficoltà: Non specificata",
             on_release=self.show_difficolta_menu
         )
         
@@ -300,14 +571,15 @@ class DomandeScreen(Screen):
             orientation='vertical',
             spacing=dp(10),
             size_hint_y=None,
-            height=dp(280)
+            height=dp(320)
         )
         content.add_widget(self.materia_field)
+        content.add_widget(self.suggerimenti_box)
         content.add_widget(self.anno_field)
         content.add_widget(self.testo_field)
         content.add_widget(self.difficolta_btn)
         
-        self.dialog = MDDialog(
+        return MDDialog(
             title="Nuova Domanda",
             type="custom",
             content_cls=content,
@@ -322,10 +594,31 @@ class DomandeScreen(Screen):
                 )
             ]
         )
-        self.dialog.open()
+    
+    def on_materia_text(self, instance, text):
+        """Aggiorna i suggerimenti mentre si digita la materia"""
+        self.suggerimenti_box.clear_widgets()
+        
+        for nome in self.get_app().indice_materie.suggerisci(text):
+            self.suggerimenti_box.add_widget(MDFlatButton(
+                text=nome,
+                on_release=lambda x, n=nome: self.select_suggerimento(n)
+            ))
+    
+    def select_suggerimento(self, nome):
+        """Usa una materia suggerita"""
+        self.materia_field.text = nome
+        self.suggerimenti_box.clear_widgets()
     
     def show_difficolta_menu(self, instance):
         """Mostra menu difficoltà"""
+        if self.difficolta_menu is None:
+            self.difficolta_menu = self.create_difficolta_menu()
+        
+        apri_menu(self.difficolta_menu, instance)
+    
+    def create_difficolta_menu(self):
+        """Costruisce il menu difficoltà"""
         menu_items = [
             {
                 "text": "🟢 Facile",
@@ -344,12 +637,10 @@ class DomandeScreen(Screen):
             }
         ]
         
-        self.difficolta_menu = MDDropdownMenu(
-            caller=instance,
+        return MDDropdownMenu(
             items=menu_items,
             width_mult=3
         )
-        self.difficolta_menu.open()
     
     def select_difficolta(self, difficolta):
         """Seleziona difficoltà"""
@@ -359,8 +650,8 @@ class DomandeScreen(Screen):
         if self.difficolta_menu:
             self.difficolta_menu.dismiss()
     
-    def add_domanda(self, instance):
-        """Aggiunge una domanda"""
+    def add_domanda(self, instance, forza=False):
+        """Aggiunge una domanda (se forza è False, prima cerca duplicati)"""
         materia = self.materia_field.text.strip()
         anno = self.anno_field.text.strip()
         testo = self.testo_field.text.strip()
@@ -369,50 +660,96 @@ class DomandeScreen(Screen):
             self.get_app().show_snackbar("❌ Compila tutti i campi obbligatori")
             return
         
+        app = self.get_app()
+        # Finché l'indice non è pronto il controllo si salta: la firma della
+        # nuova domanda viene calcolata con le altre quando l'indice è costruito
+        dedup = app.get_dedup()
+        if not forza and dedup is not None:
+            duplicati = dedup.probabili_duplicati(testo)
+            if duplicati:
+                self.confirm_duplicato(duplicati[0])
+                return
+        
         try:
-            app = self.get_app()
-            app.db.add_domanda(
+            domanda_id = app.db.add_domanda(
                 materia=materia,
                 anno=anno,
                 testo=testo,
                 difficolta=self.selected_difficolta
             )
+            app.indice_materie.aggiungi(materia)
+            if dedup is not None:
+                dedup.aggiungi(app.db, domanda_id, testo)
+            if app.ripasso:
+                app.ripasso.aggiungi(domanda_id, self.selected_difficolta)
             
             self.dialog.dismiss()
-            self.refresh_list()
+            
+            # Nella lista solo se rispetta i filtri attivi e la ricerca
+            ricerca = normalizza_ricerca(self.cerca_field.text.strip())
+            if (self.selected_materia in (None, materia)
+                    and self.selected_anno in (None, anno)
+                    and ricerca in normalizza_ricerca(testo)):
+                self.domande_list.inserisci(self.create_domanda_item(Domanda(
+                    id=domanda_id,
+                    materia=materia,
+                    anno=anno,
+                    testo=testo,
+                    difficolta=self.selected_difficolta
+                )))
             app.show_snackbar(f"✅ Domanda aggiunta")
             
         except Exception as e:
             self.get_app().show_snackbar(f"❌ Errore: {str(e)}")
     
+    def confirm_duplicato(self, duplicato):
+        """Avvisa che la domanda sembra già presente"""
+        domanda_id, somiglianza = duplicato
+        esistente = self.get_app().db.get_domanda_by_id(domanda_id)
+        
+        # Si apre sopra il dialog di aggiunta, quindi è un'istanza a parte
+        if self.dup_dialog is None:
+            self.dup_dialog = DialogoConferma()
+        
+        self.dup_dialog.apri(
+            f"Possibile duplicato ({somiglianza:.0%})",
+            f"{esistente.materia} ({esistente.anno}):\n{esistente.testo}",
+            lambda: self.add_domanda_duplicata(None),
+            conferma="AGGIUNGI COMUNQUE"
+        )
+    
+    def add_domanda_duplicata(self, instance):
+        """Aggiunge la domanda nonostante l'avviso di duplicato"""
+        self.dup_dialog.dismiss()
+        self.add_domanda(instance, forza=True)
+    
     def confirm_delete_domanda(self, domanda):
         """Conferma eliminazione domanda"""
         if self.dialog:
             self.dialog.dismiss()
         
-        self.dialog = MDDialog(
-            title="Elimina Domanda",
-            text=f"Vuoi eliminare questa domanda?",
-            buttons=[
-                MDFlatButton(
-                    text="ANNULLA",
-                    on_release=lambda x: self.dialog.dismiss()
-                ),
-                MDRaisedButton(
-                    text="ELIMINA",
-                    on_release=lambda x: self.delete_domanda(domanda)
-                )
-            ]
+        if self.conferma is None:
+            self.conferma = DialogoConferma()
+        
+        self.dialog = self.conferma
+        self.conferma.apri(
+            "Elimina Domanda",
+            "Vuoi eliminare questa domanda?",
+            lambda: self.delete_domanda(domanda)
         )
-        self.dialog.open()
     
     def delete_domanda(self, domanda):
         """Elimina una domanda"""
         app = self.get_app()
         app.db.delete_domanda(domanda.id)
+        app.indice_materie.rimuovi(domanda.materia)
+        if app.dedup is not None:
+            app.dedup.rimuovi(domanda.id)
+        if app.ripasso:
+            app.ripasso.rimuovi(domanda.id)
         
         self.dialog.dismiss()
-        self.refresh_list()
+        self.domande_list.rimuovi(domanda.id)
         app.show_snackbar(f"🗑️ Domanda eliminata")
     
     def get_app(self):
@@ -19,6 +19,12 @@ class HomeScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.build_ui()
+        
+        # Statistiche tenute aggiornate dallo stato dell'app (nessuna query qui)
+        stato = self.get_app().stato
+        stato.osserva('lauree', self.mostra_lauree)
+        stato.osserva('media', self.mostra_media)
+        stato.osserva('tasse_da_pagare', self.mostra_tasse)
     
     def build_ui(self):
         """Costruisce l'interfaccia"""
@@ -101,33 +107,16 @@ class HomeScreen(Screen):
             height=dp(80)
         )
         
-        # Prendi statistiche dall'app
-        app = self.get_app()
-        
-        # Conta lauree
-        num_lauree = len(app.lauree) if hasattr(app, 'lauree') else 0
-        
-        # Media attuale (se c'è una laurea selezionata)
-        media_text = "---"
-        if app.current_laurea:
-            voti = app.db.get_voti_by_laurea(app.current_laurea.id)
-            if voti:
-                media = app.calculator.calcola_media(voti)
-                media_text = f"{media:.2f}"
-        
-        # Tasse non pagate
-        tasse_non_pagate = len(app.db.get_tasse_non_pagate())
-        
-        # Aggiungi stat boxes
-        self.add_stat_box(stats_grid, "Corsi", str(num_lauree), "📚")
-        self.add_stat_box(stats_grid, "Media", media_text, "🎯")
-        self.add_stat_box(stats_grid, "Tasse", str(tasse_non_pagate), "💰")
+        # Valori in arrivo dallo stato dell'app (vedi __init__)
+        self.lauree_value = self.add_stat_box(stats_grid, "Corsi", "…", "📚")
+        self.media_value = self.add_stat_box(stats_grid, "Media", "…", "🎯")
+        self.tasse_value = self.add_stat_box(stats_grid, "Tasse", "…", "💰")
         
         card.add_widget(stats_grid)
         parent.add_widget(card)
     
     def add_stat_box(self, parent, label, value, emoji):
-        """Aggiunge un box con una statistica"""
+        """Aggiunge un box con una statistica e ne restituisce la label del valore"""
         box = BoxLayout(orientation='vertical', spacing=dp(5))
         
         emoji_label = MDLabel(
@@ -154,6 +143,7 @@ class HomeScreen(Screen):
         box.add_widget(label_label)
         
         parent.add_widget(box)
+        return value_label
     
     def add_menu_buttons(self, parent):
         """Aggiunge i bottoni del menu principale"""
@@ -294,6 +284,13 @@ class HomeScreen(Screen):
         )
         footer.add_widget(backup_btn)
         
+        # Bottone backup compresso
+        backup_compresso_btn = MDIconButton(
+            icon="archive-arrow-down",
+            on_release=self.create_backup_compresso
+        )
+        footer.add_widget(backup_compresso_btn)
+        
         parent.add_widget(footer)
     
     def navigate_to(self, screen_name):
@@ -316,13 +313,24 @@ class HomeScreen(Screen):
         app = self.get_app()
         app.create_backup()
     
+    def create_backup_compresso(self, instance):
+        """Crea un backup compresso dei dati"""
+        app = self.get_app()
+        app.create_backup(comprimi=True)
+    
     def get_app(self):
         """Ottiene l'istanza dell'app"""
         from kivymd.app import MDApp
         return MDApp.get_running_app()
     
-    def on_enter(self):
-        """Chiamato quando si entra nella schermata"""
-        # Aggiorna le statistiche
-        app = self.get_app()
-        app.refresh_lauree()
\ No newline at end of file
+    def mostra_lauree(self, lauree):
+        """Numero di corsi (osservatore dello stato 'lauree')"""
+        self.lauree_value.text = str(len(lauree))
+    
+    def mostra_media(self, media):
+        """Media del corso selezionato (osservatore dello stato 'media')"""
+        self.media_value.text = "---" if media is None else f"{media:.2f}"
+    
+    def mostra_tasse(self, tasse_da_pagare):
+        """Tasse non pagate (osservatore dello stato 'tasse_da_pagare')"""
+        self.tasse_value.text = str(tasse_da_pagare)
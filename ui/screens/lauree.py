@@ -5,25 +5,34 @@ Schermata gestione corsi di laurea
 
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDRaisedButton, MDIconButton, MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.textfield import MDTextField
 from kivymd.uix.selectioncontrol import MDSwitch
-from kivymd.uix.list import MDList, TwoLineAvatarIconListItem, IconLeftWidget, IconRightWidget
 from kivy.metrics import dp
 from kivymd.app import MDApp
 
+from core.events import LAUREE, VOTI
+from core.materie import IndiceMaterie
+from core.models import Laurea
+from ui.widgets import ListaVirtuale, DialogoConferma, azzera_campo
+
 
 class LaureeScreen(Screen):
     """Schermata per gestire i corsi di laurea"""
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # Dialog costruiti alla prima apertura e poi riusati
         self.dialog = None
+        self.add_dialog = None
+        self.conferma = None
+        # Lista da ricaricare all'ingresso (le lauree o i voti sono cambiati altrove)
+        self.da_ricaricare = True
         self.build_ui()
+        self.get_app().db.eventi.iscrivi((LAUREE, VOTI), self.su_modifica)
     
     def build_ui(self):
         """Costruisce l'interfaccia"""
@@ -33,11 +42,14 @@ class LaureeScreen(Screen):
         header = self.create_header()
         layout.add_widget(header)
         
-        # Lista lauree (scrollable)
-        self.scroll = ScrollView()
-        self.lauree_list = MDList()
-        self.scroll.add_widget(self.lauree_list)
-        layout.add_widget(self.scroll)
+        # Lista lauree (virtualizzata)
+        self.lauree_list = ListaVirtuale(
+            viewclass='RigaDueLinee',
+            ordine=lambda laurea: laurea.nome,
+            apri=self.open_voti,
+            elimina=self.confirm_delete
+        )
+        layout.add_widget(self.lauree_list)
         
         # Bottone add
         add_btn = MDRaisedButton(
@@ -85,58 +97,57 @@ class LaureeScreen(Screen):
         return header
     
     def on_enter(self):
-        """Aggiorna lista quando si entra nella schermata"""
-        self.refresh_list()
+        """Ricarica la lista solo se i dati sono cambiati altrove"""
+        if self.da_ricaricare:
+            self.refresh_list()
+    
+    def on_leave(self):
+        """Annulla il caricamento se si esce prima che finisca"""
+        caricatore = self.get_app().caricatore
+        if caricatore.in_corso(self.name):
+            self.da_ricaricare = True
+        caricatore.annulla(self.name)
+    
+    def su_modifica(self, evento):
+        """Evento dal database: le modifiche fatte qui sono già nella lista"""
+        if self.manager is None or self.manager.current != self.name:
+            self.da_ricaricare = True
     
     def refresh_list(self):
-        """Aggiorna la lista delle lauree"""
-        self.lauree_list.clear_widgets()
-        app = self.get_app()
-        app.refresh_lauree()
-        
-        if not app.lauree:
-            # Nessuna laurea
-            empty_label = MDLabel(
-                text="Nessun corso di laurea.\nAggiungi il tuo primo corso!",
-                halign="center",
-                theme_text_color="Secondary"
-            )
-            self.lauree_list.add_widget(empty_label)
-        else:
-            for laurea in app.lauree:
-                item = self.create_laurea_item(laurea)
-                self.lauree_list.add_widget(item)
+        """Carica la lista delle lauree in background"""
+        self.da_ricaricare = False
+        self.lauree_list.mostra_caricamento()
+        self.get_app().caricatore.carica(self.name, self.leggi_lauree, self.mostra_lauree)
     
-    def create_laurea_item(self, laurea):
-        """Crea un item per una laurea"""
-        # Conta voti
-        app = self.get_app()
-        voti = app.db.get_voti_by_laurea(laurea.id)
-        num_voti = len(voti)
-        
-        # Calcola crediti
-        crediti_acquisiti = sum(v.crediti for v in voti)
-        
-        item = TwoLineAvatarIconListItem(
-            text=laurea.nome,
-            secondary_text=f"{laurea.tipo_display} • {num_voti} esami • {crediti_acquisiti}/{laurea.crediti_totali} CFU",
-            on_release=lambda x: self.open_voti(laurea)
-        )
-        
-        # Icona
-        icon_widget = IconLeftWidget(
-            icon="school" if laurea.tipo == "triennale" else "school-outline"
-        )
-        item.add_widget(icon_widget)
-        
-        # Bottone elimina
-        delete_btn = IconRightWidget(
-            icon="delete",
-            on_release=lambda x: self.confirm_delete(laurea)
+    def leggi_lauree(self, db):
+        """Lettura in background: lauree e righe della lista (nessun widget)"""
+        lauree = db.get_all_lauree()
+        righe = []
+        for laurea in lauree:
+            # Conta voti e crediti
+            voti = db.get_voti_by_laurea(laurea.id)
+            righe.append(self.create_laurea_item(
+                laurea, len(voti), sum(v.crediti for v in voti)
+            ))
+        return lauree, righe
+    
+    def mostra_lauree(self, risultato):
+        """Mostra le lauree caricate"""
+        lauree, righe = risultato
+        self.lauree_list.mostra(
+            righe,
+            vuoto="Nessun corso di laurea.\nAggiungi il tuo primo corso!"
         )
-        item.add_widget(delete_btn)
-        
-        return item
+    
+    def create_laurea_item(self, laurea, num_voti=0, crediti_acquisiti=0):
+        """Dati della riga di una laurea"""
+        return {
+            'text': laurea.nome,
+            'secondary_text': f"{laurea.tipo_display} • {num_voti} esami • {crediti_acquisiti}/{laurea.crediti_totali} CFU",
+            'icona': "school" if laurea.tipo == "triennale" else "school-outline",
+            'elemento': laurea,
+            'chiave': laurea.id
+        }
     
     def open_voti(self, laurea):
         """Apre la schermata voti per una laurea"""
@@ -145,10 +156,22 @@ class LaureeScreen(Screen):
         app.go_to_screen('voti')
     
     def show_add_dialog(self, instance):
-        """Mostra dialog per aggiungere laurea"""
+        """Mostra dialog per aggiungere laurea (riusato: si azzerano solo i campi)"""
         if self.dialog:
             self.dialog.dismiss()
         
+        if self.add_dialog is None:
+            self.add_dialog = self.create_add_dialog()
+        
+        azzera_campo(self.nome_field)
+        azzera_campo(self.crediti_field, "180")
+        self.tipo_switch.active = False
+        
+        self.dialog = self.add_dialog
+        self.dialog.open()
+    
+    def create_add_dialog(self):
+        """Costruisce il dialog per aggiungere laurea"""
         # Campi input
         self.nome_field = MDTextField(
             hint_text="Nome corso (es. Informatica)",
@@ -182,7 +205,7 @@ class LaureeScreen(Screen):
         content.add_widget(self.crediti_field)
         content.add_widget(switch_box)
         
-        self.dialog = MDDialog(
+        return MDDialog(
             title="Nuovo Corso di Laurea",
             type="custom",
             content_cls=content,
@@ -197,7 +220,6 @@ class LaureeScreen(Screen):
                 )
             ]
         )
-        self.dialog.open()
     
     def add_laurea(self, instance):
         """Aggiunge una nuova laurea"""
@@ -212,10 +234,12 @@ class LaureeScreen(Screen):
             tipo = "magistrale" if self.tipo_switch.active else "triennale"
             
             app = self.get_app()
-            app.db.add_laurea(nome, tipo, crediti)
+            laurea_id = app.db.add_laurea(nome, tipo, crediti)
             
             self.dialog.dismiss()
-            self.refresh_list()
+            self.lauree_list.inserisci(self.create_laurea_item(
+                Laurea(nome=nome, tipo=tipo, crediti_totali=crediti, id=laurea_id)
+            ))
             app.show_snackbar(f"✅ {nome} aggiunto!")
             
         except ValueError as e:
@@ -230,32 +254,28 @@ class LaureeScreen(Screen):
         if self.dialog:
             self.dialog.dismiss()
         
-        self.dialog = MDDialog(
-            title="Elimina Corso",
-            text=f"Vuoi eliminare '{laurea.nome}'?\nVerranno eliminati anche tutti i voti associati.",
-            buttons=[
-                MDFlatButton(
-                    text="ANNULLA",
-                    on_release=lambda x: self.dialog.dismiss()
-                ),
-                MDRaisedButton(
-                    text="ELIMINA",
-                    on_release=lambda x: self.delete_laurea(laurea)
-                )
-            ]
+        if self.conferma is None:
+            self.conferma = DialogoConferma()
+        
+        self.dialog = self.conferma
+        self.conferma.apri(
+            "Elimina Corso",
+            f"Vuoi eliminare '{laurea.nome}'?\nVerranno eliminati anche tutti i voti associati.",
+            lambda: self.delete_laurea(laurea)
         )
-        self.dialog.open()
     
     def delete_laurea(self, laurea):
         """Elimina una laurea"""
         app = self.get_app()
         app.db.delete_laurea(laurea.id)
+        # I voti eliminati in cascata cambiano i conteggi delle materie
+        app.indice_materie = IndiceMaterie.da_database(app.db)
         
         if app.current_laurea and app.current_laurea.id == laurea.id:
             app.current_laurea = None
         
         self.dialog.dismiss()
-        self.refresh_list()
+        self.lauree_list.rimuovi(laurea.id)
         app.show_snackbar(f"🗑️ {laurea.nome} eliminato")
     
     def get_app(self):
@@ -5,17 +5,40 @@ Schermata gestione tasse universitarie
 
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDRaisedButton, MDIconButton, MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.textfield import MDTextField
-from kivymd.uix.list import MDList, ThreeLineAvatarIconListItem, IconLeftWidget, IconRightWidget
 from kivymd.uix.pickers import MDDatePicker
 from kivy.metrics import dp
 from kivymd.app import MDApp
-from datetime import datetime
+from datetime import date, datetime
+
+from core.calculator import RiepilogoTasse
+from core.events import TASSE, RICORRENTI
+from core.models import aggiungi_mesi, formatta_centesimi
+from core.cashflow import prevedi_flussi
+from ui.widgets import ListaVirtuale, DialogoConferma, azzera_campo
+
+
+# Icona per ogni livello di urgenza (vedi Database.get_all_tasse)
+ICONE_URGENZA = {
+    'pagata': "check-circle",
+    'scaduta': "alert-circle",
+    'in_scadenza': "clock-alert",
+    'futura': "clock-outline"
+}
+
+MESI_BREVI = ('Gen', 'Feb', 'Mar', 'Apr', 'Mag', 'Giu',
+              'Lug', 'Ago', 'Set', 'Ott', 'Nov', 'Dic')
+
+# Mesi coperti dalla card di previsione
+ORIZZONTE_PREVISIONE = 12
+
+# Mesi di rate ricorrenti non salvate mostrate nella lista (le serie
+# possono durare anni: il riepilogo le conta tutte, la lista no)
+ORIZZONTE_RATE = 12
 
 
 class TasseScreen(Screen):
@@ -23,10 +46,18 @@ class TasseScreen(Screen):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # Dialog costruiti alla prima apertura e poi riusati
         self.dialog = None
+        self.add_dialog = None
+        self.conferma = None
         self.date_picker = None
         self.selected_date = datetime.now()
+        # Giorno dei dati mostrati (None: da ricaricare all'ingresso)
+        self.giorno_caricato = None
+        # Riepilogo aggiornato tassa per tassa (caricato con la lista)
+        self.riepilogo = None
         self.build_ui()
+        self.get_app().db.eventi.iscrivi((TASSE, RICORRENTI), self.su_modifica)
     
     def build_ui(self):
         """Costruisce l'interfaccia"""
@@ -40,11 +71,19 @@ class TasseScreen(Screen):
         self.summary_card = self.create_summary_card()
         layout.add_widget(self.summary_card)
         
-        # Lista tasse
-        self.scroll = ScrollView()
-        self.tasse_list = MDList()
-        self.scroll.add_widget(self.tasse_list)
-        layout.add_widget(self.scroll)
+        # Card previsione
+        self.previsione_card = self.create_previsione_card()
+        layout.add_widget(self.previsione_card)
+        
+        # Lista tasse (virtualizzata)
+        self.tasse_list = ListaVirtuale(
+            viewclass='RigaTreLinee',
+            altezza_riga=dp(88),
+            ordine=lambda tassa: (tassa.pagata, tassa.scadenza),
+            apri=self.toggle_pagamento,
+            elimina=self.confirm_delete_tassa
+        )
+        layout.add_widget(self.tasse_list)
         
         # Bottone add
         add_btn = MDRaisedButton(
@@ -96,7 +135,7 @@ class TasseScreen(Screen):
             padding=dp(15),
             spacing=dp(10),
             size_hint=(0.95, None),
-            height=dp(120),
+            height=dp(150),
             pos_hint={'center_x': 0.5},
             elevation=3,
             radius=[15]
@@ -128,94 +167,214 @@ class TasseScreen(Screen):
         )
         card.add_widget(self.da_pagare_label)
         
+        self.scadute_label = MDLabel(
+            text="Scadute: 0",
+            font_style="Body2",
+            theme_text_color="Secondary",
+            size_hint_y=None,
+            height=dp(25)
+        )
+        card.add_widget(self.scadute_label)
+        
         return card
     
-    def update_summary(self):
-        """Aggiorna il riepilogo"""
-        app = self.get_app()
-        tasse = app.db.get_all_tasse()
+    def create_previsione_card(self):
+        """Crea card previsione dei pagamenti"""
+        card = MDCard(
+            orientation='vertical',
+            padding=dp(15),
+            spacing=dp(5),
+            size_hint=(0.95, None),
+            height=dp(110),
+            pos_hint={'center_x': 0.5},
+            elevation=3,
+            radius=[15]
+        )
         
-        totale = sum(t.importo for t in tasse)
-        da_pagare = sum(t.importo for t in tasse if not t.pagata)
+        title = MDLabel(
+            text=f"📈 Prossimi {ORIZZONTE_PREVISIONE} mesi",
+            font_style="H6",
+            size_hint_y=None,
+            height=dp(30)
+        )
+        card.add_widget(title)
         
-        self.totale_label.text = f"Totale: € {totale:.2f}"
-        self.da_pagare_label.text = f"Da pagare: € {da_pagare:.2f}"
+        self.previsione_label = MDLabel(
+            text="Da pagare: € 0.00",
+            font_style="Body1",
+            size_hint_y=None,
+            height=dp(25)
+        )
+        card.add_widget(self.previsione_label)
+        
+        self.mesi_label = MDLabel(
+            text="",
+            font_style="Caption",
+            theme_text_color="Secondary",
+            size_hint_y=None,
+            height=dp(25)
+        )
+        card.add_widget(self.mesi_label)
+        
+        return card
+    
+    def update_previsione(self, previsione):
+        """Mostra una previsione già calcolata (vedi leggi_previsione)"""
+        testo = f"Da pagare: {formatta_centesimi(previsione.totale_da_pagare)}"
+        picco = previsione.mese_di_picco()
+        if picco >= 0:
+            mese = previsione.mesi[picco].item()
+            testo += (f" • picco {MESI_BREVI[mese.month - 1]} {mese.year} "
+                      f"({formatta_centesimi(int(previsione.da_pagare[picco]))})")
+        self.previsione_label.text = testo
+        
+        # Solo i mesi con qualcosa da pagare
+        self.mesi_label.text = "  ".join(
+            f"{MESI_BREVI[mese.item().month - 1]} {importo // 100}€"
+            for mese, importo in zip(previsione.mesi, previsione.da_pagare.tolist())
+            if importo
+        ) or "Nessun pagamento previsto"
+    
+    def update_summary(self, riepilogo):
+        """Mostra un riepilogo (dizionario di Database.get_tasse_summary)"""
+        self.totale_label.text = f"Totale: {formatta_centesimi(riepilogo['totale_centesimi'])}"
+        self.da_pagare_label.text = (
+            f"Da pagare: {formatta_centesimi(riepilogo['da_pagare_centesimi'])}"
+        )
+        self.scadute_label.text = (
+            f"Scadute: {riepilogo['scadute']} "
+            f"({formatta_centesimi(riepilogo['scaduto_centesimi'])})"
+        )
     
     def on_enter(self):
-        """Aggiorna quando si entra"""
+        """Ricarica solo se le tasse sono cambiate altrove o è cambiato il giorno"""
+        # Urgenze e previsione dipendono dalla data di oggi
+        if self.giorno_caricato != date.today():
+            self.refresh()
+    
+    def on_leave(self):
+        """Annulla il caricamento se si esce prima che finisca"""
+        caricatore = self.get_app().caricatore
+        if caricatore.in_corso(self.name):
+            self.giorno_caricato = None
+        caricatore.annulla(self.name)
+        caricatore.annulla(f"{self.name}.previsione")
+    
+    def su_modifica(self, evento):
+        """Evento dal database: le modifiche fatte qui sono già nella lista"""
+        if self.manager is None or self.manager.current != self.name:
+            self.giorno_caricato = None
+    
+    def refresh(self):
+        """Aggiorna lista, riepilogo e previsione"""
         self.refresh_list()
-        self.update_summary()
+    
+    def update_riepiloghi(self, vecchia=None, nuova=None):
+        """
+        Aggiorna il riepilogo dalla tassa cambiata e la previsione in background
+        
+        Args:
+            vecchia: Tassa com'era prima (None se aggiunta)
+            nuova: Tassa com'è adesso (None se eliminata)
+        """
+        if self.riepilogo is not None:
+            if vecchia is not None:
+                self.riepilogo.rimuovi(vecchia)
+            if nuova is not None:
+                self.riepilogo.aggiungi(nuova)
+            self.update_summary(self.riepilogo.riepilogo())
+        
+        # La previsione espande le rate ricorrenti: si ricalcola fuori dal thread di Kivy
+        self.get_app().caricatore.carica(
+            f"{self.name}.previsione", self.leggi_previsione, self.update_previsione
+        )
     
     def refresh_list(self):
-        """Aggiorna lista tasse"""
-        self.tasse_list.clear_widgets()
-        app = self.get_app()
-        tasse = app.db.get_all_tasse()
-        
-        if not tasse:
-            empty_label = MDLabel(
-                text="Nessuna tassa registrata.\nAggiungi la tua prima tassa!",
-                halign="center",
-                theme_text_color="Secondary"
-            )
-            self.tasse_list.add_widget(empty_label)
-        else:
-            for tassa in tasse:
-                item = self.create_tassa_item(tassa)
-                self.tasse_list.add_widget(item)
+        """Carica lista tasse, riepilogo e previsione in background"""
+        self.giorno_caricato = date.today()
+        self.tasse_list.mostra_caricamento()
+        caricatore = self.get_app().caricatore
+        caricatore.annulla(f"{self.name}.previsione")
+        caricatore.carica(self.name, self.leggi_tasse, self.mostra_tasse)
     
-    def create_tassa_item(self, tassa):
-        """Crea un item per una tassa"""
-        # Determina colore basato su stato
-        if tassa.pagata:
-            icon = "check-circle"
-            icon_color = [0, 1, 0, 1]  # Verde
-        elif tassa.giorni_alla_scadenza < 0:
-            icon = "alert-circle"
-            icon_color = [1, 0, 0, 1]  # Rosso
-        elif tassa.giorni_alla_scadenza <= 7:
-            icon = "clock-alert"
-            icon_color = [1, 0.6, 0, 1]  # Arancione
-        else:
-            icon = "clock-outline"
-            icon_color = [0.5, 0.5, 0.5, 1]  # Grigio
-        
-        item = ThreeLineAvatarIconListItem(
-            text=tassa.descrizione,
-            secondary_text=f"Scadenza: {tassa.scadenza_formattata}",
-            tertiary_text=f"{tassa.importo_formattato} • {tassa.stato}",
-            on_release=lambda x: self.toggle_pagamento(tassa)
+    def leggi_tasse(self, db):
+        """Lettura in background: righe, riepilogo e previsione (nessun widget)"""
+        oggi = date.today()
+        orizzonte = aggiungi_mesi(datetime.now(), ORIZZONTE_RATE).date()
+        tasse = db.get_all_tasse(oggi=oggi, a=orizzonte)
+        return (
+            [self.create_tassa_item(tassa) for tassa in tasse],
+            RiepilogoTasse(db.get_tasse_summary(oggi=oggi), oggi),
+            self.leggi_previsione(db)
         )
-        
-        # Icona stato
-        icon_widget = IconLeftWidget(icon=icon)
-        item.add_widget(icon_widget)
-        
-        # Bottone elimina
-        delete_btn = IconRightWidget(
-            icon="delete",
-            on_release=lambda x: self.confirm_delete_tassa(tassa)
+    
+    @staticmethod
+    def leggi_previsione(db):
+        """Lettura in background: previsione dei prossimi mesi"""
+        return prevedi_flussi(db, mesi=ORIZZONTE_PREVISIONE)
+    
+    def mostra_tasse(self, risultato):
+        """Mostra i dati caricati"""
+        righe, self.riepilogo, previsione = risultato
+        self.tasse_list.mostra(
+            righe,
+            vuoto="Nessuna tassa registrata.\nAggiungi la tua prima tassa!"
         )
-        item.add_widget(delete_btn)
-        
-        return item
+        self.update_summary(self.riepilogo.riepilogo())
+        self.update_previsione(previsione)
+    
+    def create_tassa_item(self, tassa):
+        """Dati della riga di una tassa"""
+        scadenza = f"Scadenza: {tassa.scadenza_formattata}"
+        if tassa.ricorrenza_id is not None:
+            scadenza += f" • 🔁 rata {tassa.occorrenza + 1}"
+        
+        return {
+            'text': tassa.descrizione,
+            'secondary_text': scadenza,
+            'tertiary_text': f"{tassa.importo_formattato} • {tassa.stato}",
+            # Icona basata sull'urgenza calcolata dal database
+            'icona': ICONE_URGENZA[tassa.urgenza],
+            'elemento': tassa,
+            'chiave': tassa.chiave
+        }
     
     def toggle_pagamento(self, tassa):
         """Cambia stato pagamento"""
         app = self.get_app()
-        app.db.toggle_pagamento_tassa(tassa.id)
+        tassa_id = tassa.id
+        if tassa.virtuale:
+            # Solo le rate pagate o modificate vengono salvate
+            tassa_id = app.db.materializza_rata(tassa.ricorrenza_id, tassa.occorrenza)
+        app.db.toggle_pagamento_tassa(tassa_id)
         
         stato = "pagata" if not tassa.pagata else "da pagare"
         app.show_snackbar(f"✅ Tassa segnata come {stato}")
         
-        self.refresh_list()
-        self.update_summary()
+        # La riga (virtuale o no) viene sostituita da quella salvata
+        aggiornata = app.db.get_tassa_by_id(tassa_id)
+        self.tasse_list.aggiorna(self.create_tassa_item(aggiornata), chiave=tassa.chiave)
+        self.update_riepiloghi(tassa, aggiornata)
     
     def show_add_dialog(self, instance):
-        """Mostra dialog per aggiungere tassa"""
+        """Mostra dialog per aggiungere tassa (riusato: si azzerano solo i campi)"""
         if self.dialog:
             self.dialog.dismiss()
         
+        if self.add_dialog is None:
+            self.add_dialog = self.create_add_dialog()
+        
+        azzera_campo(self.descrizione_field)
+        azzera_campo(self.importo_field)
+        self.date_btn.text = f"Scadenza: {self.selected_date.strftime('%d/%m/%Y')}"
+        azzera_campo(self.intervallo_field)
+        azzera_campo(self.rate_field)
+        
+        self.dialog = self.add_dialog
+        self.dialog.open()
+    
+    def create_add_dialog(self):
+        """Costruisce il dialog per aggiungere tassa"""
         self.descrizione_field = MDTextField(
             hint_text="Descrizione (es. Prima rata)",
             required=True
@@ -228,21 +387,33 @@ class TasseScreen(Screen):
         
         # Data picker button
         self.date_btn = MDRaisedButton(
-            text=f"Scadenza: {self.selected_date.strftime('%d/%m/%Y')}",
             on_release=self.show_date_picker
         )
         
+        # Ricorrenza (vuoto = tassa singola)
+        self.intervallo_field = MDTextField(
+            hint_text="Ripeti ogni N mesi (vuoto: una volta)",
+            input_filter="int"
+        )
+        
+        self.rate_field = MDTextField(
+            hint_text="Numero di rate",
+            input_filter="int"
+        )
+        
         content = BoxLayout(
             orientation='vertical',
             spacing=dp(10),
             size_hint_y=None,
-            height=dp(180)
+            height=dp(300)
         )
         content.add_widget(self.descrizione_field)
         content.add_widget(self.importo_field)
         content.add_widget(self.date_btn)
+        content.add_widget(self.intervallo_field)
+        content.add_widget(self.rate_field)
         
-        self.dialog = MDDialog(
+        return MDDialog(
             title="Nuova Tassa",
             type="custom",
             content_cls=content,
@@ -257,7 +428,6 @@ class TasseScreen(Screen):
                 )
             ]
         )
-        self.dialog.open()
     
     def show_date_picker(self, instance):
         """Mostra date picker"""
@@ -289,15 +459,34 @@ class TasseScreen(Screen):
                 return
             
             app = self.get_app()
-            app.db.add_tassa(
-                descrizione=descrizione,
-                importo=importo,
-                scadenza=self.selected_date
-            )
+            intervallo = self.intervallo_field.text.strip()
+            
+            if intervallo:
+                rate = self.rate_field.text.strip()
+                if not rate:
+                    app.show_snackbar("❌ Inserisci il numero di rate")
+                    return
+                
+                app.db.add_tassa_ricorrente(
+                    descrizione=descrizione,
+                    importo=importo,
+                    inizio=self.selected_date,
+                    intervallo_mesi=int(intervallo),
+                    occorrenze=int(rate)
+                )
+                # Una serie aggiunge più rate: si ricarica tutto
+                self.refresh_list()
+            else:
+                tassa_id = app.db.add_tassa(
+                    descrizione=descrizione,
+                    importo=importo,
+                    scadenza=self.selected_date
+                )
+                nuova = app.db.get_tassa_by_id(tassa_id)
+                self.tasse_list.inserisci(self.create_tassa_item(nuova))
+                self.update_riepiloghi(nuova=nuova)
             
             self.dialog.dismiss()
-            self.refresh_list()
-            self.update_summary()
             app.show_snackbar(f"✅ Tassa aggiunta: {descrizione}")
             
         except ValueError:
@@ -310,30 +499,30 @@ class TasseScreen(Screen):
         if self.dialog:
             self.dialog.dismiss()
         
-        self.dialog = MDDialog(
-            title="Elimina Tassa",
-            text=f"Vuoi eliminare '{tassa.descrizione}'?",
-            buttons=[
-                MDFlatButton(
-                    text="ANNULLA",
-                    on_release=lambda x: self.dialog.dismiss()
-                ),
-                MDRaisedButton(
-                    text="ELIMINA",
-                    on_release=lambda x: self.delete_tassa(tassa)
-                )
-            ]
-        )
-        self.dialog.open()
+        # Le rate ricorrenti si eliminano come serie
+        testo = f"Vuoi eliminare '{tassa.descrizione}'?"
+        if tassa.ricorrenza_id is not None:
+            testo = (f"Vuoi eliminare la serie '{tassa.descrizione}'?\n"
+                     "Le rate già pagate resteranno nello storico.")
+        
+        if self.conferma is None:
+            self.conferma = DialogoConferma()
+        
+        self.dialog = self.conferma
+        self.conferma.apri("Elimina Tassa", testo, lambda: self.delete_tassa(tassa))
     
     def delete_tassa(self, tassa):
         """Elimina una tassa"""
         app = self.get_app()
-        app.db.delete_tassa(tassa.id)
+        if tassa.ricorrenza_id is not None:
+            app.db.delete_tassa_ricorrente(tassa.ricorrenza_id)
+            self.refresh_list()
+        else:
+            app.db.delete_tassa(tassa.id)
+            self.tasse_list.rimuovi(tassa.chiave)
+            self.update_riepiloghi(vecchia=tassa)
         
         self.dialog.dismiss()
-        self.refresh_list()
-        self.update_summary()
         app.show_snackbar(f"🗑️ Tassa eliminata")
     
     def get_app(self):
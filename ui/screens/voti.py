@@ -5,19 +5,30 @@ Schermata gestione voti
 
 from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDRaisedButton, MDIconButton, MDFlatButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.textfield import MDTextField
-from kivymd.uix.list import MDList, ThreeLineAvatarIconListItem, IconLeftWidget, IconRightWidget
 from kivymd.uix.pickers import MDDatePicker
 from kivymd.uix.menu import MDDropdownMenu
-from kivy.metrics import dp
+from kivy.graphics.texture import Texture
+from kivy.metrics import dp, Metrics
+from kivy.uix.image import Image
+from kivy.uix.relativelayout import RelativeLayout
+from kivy.core.window import Window
 from kivymd.app import MDApp
 from datetime import datetime
+from importlib.util import find_spec
+
+from core.calculator import StatisticheIncrementali
+from core.events import LAUREE, VOTI
+from core.models import Voto
+from utils.grafici import disegna_andamento
+from utils.pdf import esporta_carriera_pdf
+from utils.pipeline import esporta_formati
+from ui.widgets import ListaVirtuale, DialogoConferma, apri_menu, azzera_campo
 
 
 class VotiScreen(Screen):
@@ -25,12 +36,25 @@ class VotiScreen(Screen):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        # Dialog e menu costruiti alla prima apertura e poi riusati
         self.dialog = None
+        self.add_dialog = None
+        self.conferma = None
         self.date_picker = None
         self.selected_date = datetime.now()
         self.voto_menu = None
+        self.azioni_menu = None
+        self.grafico_dialog = None
         self.selected_voto = 18
+        self.statistiche = None
+        # Corso dei voti mostrati e se vanno ricaricati all'ingresso
+        self.laurea_mostrata = None
+        self.da_ricaricare = True
+        # Grafici già disegnati: laurea_id -> ((versione, dimensioni), texture)
+        self.versione_voti = 0
+        self.grafici = {}
         self.build_ui()
+        self.get_app().db.eventi.iscrivi((LAUREE, VOTI), self.su_modifica)
     
     def build_ui(self):
         """Costruisce l'interfaccia"""
@@ -44,11 +68,14 @@ class VotiScreen(Screen):
         self.stats_card = self.create_stats_card()
         self.main_layout.add_widget(self.stats_card)
         
-        # Lista voti
-        self.scroll = ScrollView()
-        self.voti_list = MDList()
-        self.scroll.add_widget(self.voti_list)
-        self.main_layout.add_widget(self.scroll)
+        # Lista voti (virtualizzata)
+        self.voti_list = ListaVirtuale(
+            viewclass='RigaTreLinee',
+            altezza_riga=dp(88),
+            ordine=lambda voto: (-voto.data.toordinal(), -voto.id),  # Più recenti prima
+            elimina=self.confirm_delete_voto
+        )
+        self.main_layout.add_widget(self.voti_list)
         
         # Bottone add
         add_btn = MDRaisedButton(
@@ -122,40 +149,41 @@ class VotiScreen(Screen):
         )
         card.add_widget(title)
         
-        # Grid statistiche
+        # Grid statistiche (i box vengono creati una volta, poi cambia solo il testo)
         self.stats_grid = GridLayout(
             cols=3,
             spacing=dp(10),
             size_hint_y=None,
             height=dp(80)
         )
+        self.media_value = self.add_stat_box(self.stats_grid, "Media", "---", "🎯")
+        self.voto_laurea_value = self.add_stat_box(self.stats_grid, "Voto Laurea", "---", "🎓")
+        self.crediti_value = self.add_stat_box(self.stats_grid, "Crediti", "0/180", "📚")
         card.add_widget(self.stats_grid)
         
         return card
     
     def update_stats(self):
-        """Aggiorna le statistiche"""
-        self.stats_grid.clear_widgets()
-        
-        app = self.get_app()
-        if not app.current_laurea:
+        """Aggiorna le statistiche dalle somme correnti (nessuna query)"""
+        if self.statistiche is None:
+            # Voti in caricamento
+            self.media_value.text = "…"
+            self.voto_laurea_value.text = "…"
+            self.crediti_value.text = "…"
             return
         
-        voti = app.db.get_voti_by_laurea(app.current_laurea.id)
+        stats = self.statistiche.statistiche()
         
-        if voti:
-            stats = app.calculator.calcola_statistiche(voti, app.current_laurea)
-            
-            self.add_stat_box(self.stats_grid, "Media", f"{stats.media:.2f}", "🎯")
-            self.add_stat_box(self.stats_grid, "Voto Laurea", f"{stats.voto_laurea}/110", "🎓")
-            self.add_stat_box(self.stats_grid, "Crediti", f"{stats.crediti_acquisiti}/{stats.crediti_totali}", "📚")
+        if stats.esami_sostenuti:
+            self.media_value.text = f"{stats.media:.2f}"
+            self.voto_laurea_value.text = f"{stats.voto_laurea}/110"
         else:
-            self.add_stat_box(self.stats_grid, "Media", "---", "🎯")
-            self.add_stat_box(self.stats_grid, "Voto Laurea", "---", "🎓")
-            self.add_stat_box(self.stats_grid, "Crediti", "0/180", "📚")
+            self.media_value.text = "---"
+            self.voto_laurea_value.text = "---"
+        self.crediti_value.text = f"{stats.crediti_acquisiti}/{stats.crediti_totali}"
     
     def add_stat_box(self, parent, label, value, emoji):
-        """Aggiunge un box statistica"""
+        """Aggiunge un box statistica e ne restituisce la label del valore"""
         box = BoxLayout(orientation='vertical', spacing=dp(5))
         
         emoji_label = MDLabel(text=emoji, halign="center", font_style="H6")
@@ -168,6 +196,7 @@ class VotiScreen(Screen):
         box.add_widget(label_label)
         
         parent.add_widget(box)
+        return value_label
     
     def on_enter(self):
         """Aggiorna quando si entra nella schermata"""
@@ -179,59 +208,110 @@ class VotiScreen(Screen):
             return
         
         self.title_label.text = app.current_laurea.nome
-        self.refresh_list()
-        self.update_stats()
+        if self.da_ricaricare or app.current_laurea != self.laurea_mostrata:
+            self.refresh_list()
+    
+    def on_leave(self):
+        """Annulla il caricamento se si esce prima che finisca"""
+        caricatore = self.get_app().caricatore
+        if caricatore.in_corso(self.name):
+            self.da_ricaricare = True
+        caricatore.annulla(self.name)
+    
+    def su_modifica(self, evento):
+        """Evento dal database: ricarica all'ingresso se tocca il corso mostrato"""
+        if evento.argomento == VOTI:
+            self.versione_voti += 1  # i grafici in cache non sono più validi
+        
+        # Le modifiche fatte qui sono già nella lista
+        if self.laurea_mostrata is None or (self.manager and self.manager.current == self.name):
+            return
+        if evento.argomento == VOTI:
+            tocca = evento.riguarda_laurea(self.laurea_mostrata.id)
+        else:
+            tocca = self.laurea_mostrata.id in evento.ids  # corso modificato o eliminato
+        if tocca:
+            self.da_ricaricare = True
     
     def refresh_list(self):
-        """Aggiorna lista voti"""
-        self.voti_list.clear_widgets()
+        """Carica lista voti e statistiche in background (una sola lettura dei voti)"""
         app = self.get_app()
+        self.statistiche = None
+        self.laurea_mostrata = app.current_laurea
+        self.da_ricaricare = False
         
         if not app.current_laurea:
+            self.voti_list.data = []
             return
         
-        voti = app.db.get_voti_by_laurea(app.current_laurea.id)
+        self.voti_list.mostra_caricamento()
+        self.update_stats()
         
-        if not voti:
-            empty_label = MDLabel(
-                text="Nessun voto registrato.\nAggiungi il tuo primo voto!",
-                halign="center",
-                theme_text_color="Secondary"
-            )
-            self.voti_list.add_widget(empty_label)
-        else:
-            for voto in reversed(voti):  # Più recenti prima
-                item = self.create_voto_item(voto)
-                self.voti_list.add_widget(item)
+        laurea = app.current_laurea
+        app.caricatore.carica(
+            self.name,
+            lambda db: self.leggi_voti(db, laurea),
+            self.mostra_voti
+        )
     
-    def create_voto_item(self, voto):
-        """Crea un item per un voto"""
-        item = ThreeLineAvatarIconListItem(
-            text=voto.materia,
-            secondary_text=f"{voto.data_formattata} • {voto.crediti} CFU",
-            tertiary_text=f"Voto: {voto.voto_display}"
+    def leggi_voti(self, db, laurea):
+        """Lettura in background: statistiche e righe della lista (nessun widget)"""
+        voti = db.get_voti_by_laurea(laurea.id)
+        return (
+            StatisticheIncrementali(laurea, voti),
+            [self.create_voto_item(voto) for voto in voti]
         )
-        
-        # Icona voto
-        icon_widget = IconLeftWidget(icon="trophy" if voto.voto >= 28 else "check")
-        item.add_widget(icon_widget)
-        
-        # Bottone elimina
-        delete_btn = IconRightWidget(
-            icon="delete",
-            on_release=lambda x: self.confirm_delete_voto(voto)
+    
+    def mostra_voti(self, risultato):
+        """Mostra voti e statistiche caricati"""
+        self.statistiche, righe = risultato
+        self.voti_list.mostra(
+            righe,
+            vuoto="Nessun voto registrato.\nAggiungi il tuo primo voto!"
         )
-        item.add_widget(delete_btn)
-        
-        return item
+        self.update_stats()
+    
+    def create_voto_item(self, voto):
+        """Dati della riga di un voto"""
+        return {
+            'text': voto.materia,
+            'secondary_text': f"{voto.data_formattata} • {voto.crediti} CFU",
+            'tertiary_text': f"Voto: {voto.voto_display}",
+            'icona': "trophy" if voto.voto >= 28 else "check",
+            'elemento': voto,
+            'chiave': voto.id
+        }
     
     def show_add_dialog(self, instance):
-        """Mostra dialog per aggiungere voto"""
+        """Mostra dialog per aggiungere voto (riusato: si azzerano solo i campi)"""
         if self.dialog:
             self.dialog.dismiss()
         
+        if self.add_dialog is None:
+            self.add_dialog = self.create_add_dialog()
+        
+        azzera_campo(self.materia_field)
+        self.suggerimenti_box.clear_widgets()
+        azzera_campo(self.crediti_field, "6")
+        self.date_btn.text = f"Data: {self.selected_date.strftime('%d/%m/%Y')}"
+        self.voto_btn.text = f"Voto: {'30L' if self.selected_voto == 31 else self.selected_voto}"
+        
+        self.dialog = self.add_dialog
+        self.dialog.open()
+    
+    def create_add_dialog(self):
+        """Costruisce il dialog per aggiungere voto"""
         # Campi
         self.materia_field = MDTextField(hint_text="Materia", required=True)
+        self.materia_field.bind(text=self.on_materia_text)
+        
+        # Suggerimenti materie già usate
+        self.suggerimenti_box = BoxLayout(
+            orientation='horizontal',
+            spacing=dp(5),
+            size_hint_y=None,
+            height=dp(36)
+        )
         
         self.crediti_field = MDTextField(
             hint_text="Crediti (CFU)",
@@ -240,14 +320,12 @@ class VotiScreen(Screen):
         )
         
         # Data picker button
-        date_btn = MDRaisedButton(
-            text=f"Data: {self.selected_date.strftime('%d/%m/%Y')}",
+        self.date_btn = MDRaisedButton(
             on_release=self.show_date_picker
         )
         
         # Voto picker button
         self.voto_btn = MDRaisedButton(
-            text=f"Voto: {self.selected_voto}",
             on_release=self.show_voto_menu
         )
         
@@ -255,14 +333,15 @@ class VotiScreen(Screen):
             orientation='vertical',
             spacing=dp(10),
             size_hint_y=None,
-            height=dp(240)
+            height=dp(280)
         )
         content.add_widget(self.materia_field)
+        content.add_widget(self.suggerimenti_box)
         content.add_widget(self.crediti_field)
-        content.add_widget(date_btn)
+        content.add_widget(self.date_btn)
         content.add_widget(self.voto_btn)
         
-        self.dialog = MDDialog(
+        return MDDialog(
             title="Nuovo Voto",
             type="custom",
             content_cls=content,
@@ -271,7 +350,21 @@ class VotiScreen(Screen):
                 MDRaisedButton(text="AGGIUNGI", on_release=self.add_voto)
             ]
         )
-        self.dialog.open()
+    
+    def on_materia_text(self, instance, text):
+        """Aggiorna i suggerimenti mentre si digita la materia"""
+        self.suggerimenti_box.clear_widgets()
+        
+        for nome in self.get_app().indice_materie.suggerisci(text):
+            self.suggerimenti_box.add_widget(MDFlatButton(
+                text=nome,
+                on_release=lambda x, n=nome: self.select_suggerimento(n)
+            ))
+    
+    def select_suggerimento(self, nome):
+        """Usa una materia suggerita"""
+        self.materia_field.text = nome
+        self.suggerimenti_box.clear_widgets()
     
     def show_date_picker(self, instance):
         """Mostra date picker"""
@@ -284,26 +377,28 @@ class VotiScreen(Screen):
     def on_date_selected(self, instance, value, date_range):
         """Callback selezione data"""
         self.selected_date = value
+        self.date_btn.text = f"Data: {value.strftime('%d/%m/%Y')}"
         instance.dismiss()
     
     def show_voto_menu(self, instance):
         """Mostra menu selezione voto"""
-        voti = [str(v) for v in range(18, 31)] + ["30L"]
-        
-        menu_items = [
-            {
-                "text": voto,
-                "viewclass": "OneLineListItem",
-                "on_release": lambda x=voto: self.select_voto(x)
-            } for voto in voti
-        ]
-        
-        self.voto_menu = MDDropdownMenu(
-            caller=instance,
-            items=menu_items,
-            width_mult=2
-        )
-        self.voto_menu.open()
+        if self.voto_menu is None:
+            voti = [str(v) for v in range(18, 31)] + ["30L"]
+            
+            menu_items = [
+                {
+                    "text": voto,
+                    "viewclass": "OneLineListItem",
+                    "on_release": lambda x=voto: self.select_voto(x)
+                } for voto in voti
+            ]
+            
+            self.voto_menu = MDDropdownMenu(
+                items=menu_items,
+                width_mult=2
+            )
+        
+        apri_menu(self.voto_menu, instance)
     
     def select_voto(self, voto_str):
         """Seleziona un voto"""
@@ -323,17 +418,28 @@ class VotiScreen(Screen):
             crediti = int(self.crediti_field.text or "6")
             app = self.get_app()
             
-            app.db.add_voto(
+            voto = Voto(
                 materia=materia,
                 data=self.selected_date,
                 crediti=crediti,
                 voto=self.selected_voto,
                 laurea_id=app.current_laurea.id
             )
+            voto.id = app.db.add_voto(
+                materia=voto.materia,
+                data=voto.data,
+                crediti=voto.crediti,
+                voto=voto.voto,
+                laurea_id=voto.laurea_id
+            )
+            app.indice_materie.aggiungi(materia)
             
+            # Solo la riga nuova e le somme delle statistiche
             self.dialog.dismiss()
-            self.refresh_list()
-            self.update_stats()
+            self.voti_list.inserisci(self.create_voto_item(voto))
+            if self.statistiche is not None:
+                self.statistiche.aggiungi(voto)
+                self.update_stats()
             app.show_snackbar(f"✅ Voto aggiunto: {materia}")
             
         except Exception as e:
@@ -344,48 +450,223 @@ class VotiScreen(Screen):
         if self.dialog:
             self.dialog.dismiss()
         
-        self.dialog = MDDialog(
-            title="Elimina Voto",
-            text=f"Vuoi eliminare il voto di '{voto.materia}'?",
-            buttons=[
-                MDFlatButton(text="ANNULLA", on_release=lambda x: self.dialog.dismiss()),
-                MDRaisedButton(text="ELIMINA", on_release=lambda x: self.delete_voto(voto))
-            ]
+        if self.conferma is None:
+            self.conferma = DialogoConferma()
+        
+        self.dialog = self.conferma
+        self.conferma.apri(
+            "Elimina Voto",
+            f"Vuoi eliminare il voto di '{voto.materia}'?",
+            lambda: self.delete_voto(voto)
         )
-        self.dialog.open()
     
     def delete_voto(self, voto):
         """Elimina un voto"""
         app = self.get_app()
         app.db.delete_voto(voto.id)
+        app.indice_materie.rimuovi(voto.materia)
         
         self.dialog.dismiss()
-        self.refresh_list()
-        self.update_stats()
+        self.voti_list.rimuovi(voto.id)
+        if self.statistiche is not None:
+            self.statistiche.rimuovi(voto)
+            self.update_stats()
         app.show_snackbar(f"🗑️ Voto eliminato")
     
     def show_menu(self, instance):
         """Mostra menu azioni"""
-        menu_items = [
-            {"text": "📊 Proiezione voti", "on_release": lambda x: self.show_proiezione()},
-            {"text": "📈 Grafico andamento", "on_release": lambda x: self.show_grafico()},
-            {"text": "📄 Esporta PDF", "on_release": lambda x: self.esporta_pdf()},
-        ]
+        if self.azioni_menu is None:
+            menu_items = [
+                {"text": "📊 Proiezione voti", "on_release": lambda x=None: self.show_proiezione()},
+                {"text": "📈 Grafico andamento", "on_release": lambda x=None: self.show_grafico()},
+                {"text": "📄 Esporta PDF", "on_release": lambda x=None: self.esporta_pdf()},
+                {"text": "📦 Esporta tutti i formati", "on_release": lambda x=None: self.esporta_formati()},
+                {"text": "🔤 Materie simili", "on_release": lambda x=None: self.show_unioni_materie()},
+            ]
+            self.azioni_menu = MDDropdownMenu(items=menu_items, width_mult=4)
+        
+        apri_menu(self.azioni_menu, instance)
+    
+    def show_unioni_materie(self):
+        """Propone di unire le varianti dello stesso nome di materia"""
+        self.azioni_menu.dismiss()
+        app = self.get_app()
+        gruppi = app.indice_materie.suggerisci_unioni()
+        
+        if not gruppi:
+            app.show_snackbar("✅ Nessuna materia duplicata")
+            return
+        
+        if self.dialog:
+            self.dialog.dismiss()
+        
+        righe = [f"{' / '.join(gruppo[1:])} → {gruppo[0]}" for gruppo in gruppi]
+        
+        if self.conferma is None:
+            self.conferma = DialogoConferma()
         
-        menu = MDDropdownMenu(caller=instance, items=menu_items, width_mult=4)
-        menu.open()
+        self.dialog = self.conferma
+        self.conferma.apri(
+            "Materie simili",
+            "\n".join(righe),
+            lambda: self.unisci_materie(gruppi),
+            conferma="UNISCI"
+        )
+    
+    def unisci_materie(self, gruppi):
+        """Unisce i gruppi di materie proposti"""
+        app = self.get_app()
+        aggiornate = sum(app.unisci_materie(gruppo) for gruppo in gruppi)
+        
+        self.dialog.dismiss()
+        self.refresh_list()
+        app.show_snackbar(f"✅ {aggiornate} righe aggiornate")
     
     def show_proiezione(self):
         """Mostra proiezione voti"""
+        self.azioni_menu.dismiss()
         self.get_app().show_snackbar("📊 Proiezione voti - Coming soon!")
     
     def show_grafico(self):
-        """Mostra grafico"""
-        self.get_app().show_snackbar("📈 Grafico - Coming soon!")
+        """Mostra l'andamento: dalla cache se i voti non sono cambiati, se no lo disegna in background"""
+        self.azioni_menu.dismiss()
+        app = self.get_app()
+        
+        if self.statistiche is None or not self.statistiche.esami:
+            app.show_snackbar("📈 Nessun voto da mostrare")
+            return
+        
+        if self.grafico_dialog is None:
+            self.grafico_dialog = self.create_grafico_dialog()
+        
+        if self.dialog:
+            self.dialog.dismiss()
+        
+        # Dimensioni in pixel: il grafico non viene riscalato
+        dimensioni = (int(Window.width * 0.8), int(dp(260)))
+        laurea = app.current_laurea
+        chiave = (self.versione_voti, dimensioni)
+        
+        in_cache = self.grafici.get(laurea.id)
+        if in_cache is not None and in_cache[0] == chiave:
+            self.mostra_texture(in_cache[1])
+        else:
+            self.mostra_texture(None)
+            app.caricatore.carica(
+                'grafico',
+                lambda db: disegna_andamento(db.get_voti_by_laurea(laurea.id), *dimensioni,
+                                             dpi=Metrics.dpi),
+                lambda risultato: self.mostra_grafico(laurea.id, chiave, risultato)
+            )
+        
+        self.dialog = self.grafico_dialog
+        self.dialog.open()
+    
+    def create_grafico_dialog(self):
+        """Costruisce il dialog del grafico"""
+        content = RelativeLayout(size_hint_y=None, height=dp(260))
+        self.grafico_image = Image(fit_mode="contain")
+        content.add_widget(self.grafico_image)
+        self.grafico_attesa = MDLabel(text="Caricamento…", halign="center",
+                                      theme_text_color="Hint")
+        content.add_widget(self.grafico_attesa)
+        
+        return MDDialog(
+            title="Andamento voti",
+            type="custom",
+            content_cls=content,
+            buttons=[MDFlatButton(text="CHIUDI", on_release=lambda x: self.dialog.dismiss())]
+        )
+    
+    def mostra_grafico(self, laurea_id, chiave, risultato):
+        """Carica il buffer disegnato in una texture e la mette in cache"""
+        buffer, larghezza, altezza = risultato
+        texture = Texture.create(size=(larghezza, altezza), colorfmt='rgba')
+        texture.blit_buffer(buffer, colorfmt='rgba', bufferfmt='ubyte')
+        texture.flip_vertical()  # Agg parte dalla riga in alto
+        self.grafici[laurea_id] = (chiave, texture)
+        
+        if self.dialog is self.grafico_dialog:
+            self.mostra_texture(texture)
+    
+    def mostra_texture(self, texture):
+        """Mostra un grafico nel dialog (None: in attesa)"""
+        self.grafico_image.texture = texture
+        self.grafico_image.opacity = 0 if texture is None else 1
+        self.grafico_attesa.opacity = 1 if texture is None else 0
     
     def esporta_pdf(self):
-        """Esporta in PDF"""
-        self.get_app().show_snackbar("📄 Esportazione - Coming soon!")
+        """Esporta la carriera in PDF su un thread di lavoro"""
+        self.azioni_menu.dismiss()
+        app = self.get_app()
+        laurea = app.current_laurea
+        
+        if laurea is None:
+            app.show_snackbar("📄 Seleziona prima un corso")
+            return
+        if app.caricatore.in_corso('pdf'):
+            app.show_snackbar("📄 Esportazione già in corso")
+            return
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        percorso = app.db.db_path.parent / f"carriera_{timestamp}.pdf"
+        app.show_snackbar("📄 Esportazione in corso…")
+        app.caricatore.carica(
+            'pdf',
+            lambda db: self.scrivi_pdf(db, laurea, percorso),
+            lambda pagine: app.show_snackbar(f"✅ PDF creato: {percorso} ({pagine} pagine)"),
+            lambda e: app.show_snackbar(f"❌ Errore PDF: {e}"),
+            riprova=False
+        )
+    
+    @staticmethod
+    def scrivi_pdf(db, laurea, percorso):
+        """Lavoro in background: legge i voti e scrive il PDF (nessun widget)"""
+        voti = db.get_voti_by_laurea(laurea.id)
+        stats = StatisticheIncrementali(laurea, voti).statistiche()
+        
+        grafico = None
+        if voti:
+            try:
+                grafico = disegna_andamento(voti, 700, 260)
+            except ImportError:
+                pass  # matplotlib è opzionale: il PDF esce senza grafico
+        
+        return esporta_carriera_pdf(voti, stats, laurea, percorso, grafico=grafico)
+    
+    def esporta_formati(self):
+        """Esporta CSV, JSON, HTML e PDF in una cartella, leggendo i voti una volta"""
+        self.azioni_menu.dismiss()
+        app = self.get_app()
+        laurea = app.current_laurea
+        
+        if laurea is None:
+            app.show_snackbar("📦 Seleziona prima un corso")
+            return
+        if app.caricatore.in_corso('formati'):
+            app.show_snackbar("📦 Esportazione già in corso")
+            return
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        cartella = app.db.db_path.parent / f"esportazione_{timestamp}"
+        app.show_snackbar("📦 Esportazione in corso…")
+        app.caricatore.carica(
+            'formati',
+            lambda db: self.scrivi_formati(db, laurea, cartella),
+            lambda risultati: app.show_snackbar(
+                f"✅ {len(risultati)} file creati in {cartella}"
+            ),
+            lambda e: app.show_snackbar(f"❌ Errore esportazione: {e}"),
+            riprova=False
+        )
+    
+    @staticmethod
+    def scrivi_formati(db, laurea, cartella):
+        """Lavoro in background: una lettura dei voti per tutti i formati"""
+        # Il grafico richiede matplotlib, che è opzionale
+        grafico = find_spec('matplotlib') is not None
+        return esporta_formati(db.get_voti_by_laurea(laurea.id), laurea, cartella,
+                               grafico=grafico)
     
     def get_app(self):
         return MDApp.get_running_app()
\ No newline at end of file
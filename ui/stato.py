@@ -0,0 +1,122 @@
+# ui/stato.py
+"""
+Stato osservabile dell'app, aggiornato dagli eventi del database
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+from kivy.clock import Clock
+
+from core.events import Evento
+
+_NON_CARICATO = object()
+
+
+class _Porzione:
+    """Un valore dello stato: come leggerlo, da cosa dipende, chi lo osserva"""
+
+    def __init__(self, argomenti, lettura, filtro):
+        self.argomenti = tuple(argomenti)
+        self.lettura = lettura
+        self.filtro = filtro
+        self.valore = _NON_CARICATO
+        self.osservatori: List[Callable] = []
+
+
+class StatoApp:
+    """
+    Porzioni di stato derivate dal database (lauree, media, tasse da pagare...)
+
+    Ogni porzione dichiara gli argomenti degli eventi da cui dipende
+    (core.events). Un evento la segna come da rileggere; le porzioni con
+    osservatori vengono rilette una volta sola al frame successivo, anche
+    dopo più eventi, con il caricatore in background. Gli osservatori sono
+    chiamati solo se il valore riletto è diverso dal precedente: chi
+    mostra una porzione non rilegge nulla quando si naviga.
+    """
+
+    def __init__(self, db, caricatore):
+        """
+        Args:
+            db: Database del thread principale (fonte degli eventi)
+            caricatore: CaricatoreAsincrono per le riletture
+        """
+        self.db = db
+        self.caricatore = caricatore
+        self._porzioni: Dict[str, _Porzione] = {}
+        self._da_rileggere = set()
+        self._rileggi = Clock.create_trigger(self._rileggi_porzioni)
+
+    def definisci(self, nome: str, argomenti: Iterable[str], lettura: Callable,
+                  filtro: Optional[Callable[[Evento], bool]] = None):
+        """
+        Definisce una porzione
+
+        Args:
+            nome: Nome della porzione
+            argomenti: Argomenti degli eventi da cui dipende
+            lettura: Chiamata con un Database su un thread del caricatore;
+                il risultato deve essere confrontabile con ==
+            filtro: Se dato, solo gli eventi per cui restituisce True
+                rendono la porzione da rileggere
+        """
+        porzione = _Porzione(argomenti, lettura, filtro)
+        self._porzioni[nome] = porzione
+        self.db.eventi.iscrivi(porzione.argomenti, lambda evento: self._su_evento(nome, evento))
+
+    def osserva(self, nome: str, callback: Callable[[object], None]):
+        """
+        Chiama callback con il valore della porzione ora (se già letto)
+        e a ogni cambiamento
+        """
+        porzione = self._porzioni[nome]
+        porzione.osservatori.append(callback)
+        if porzione.valore is _NON_CARICATO:
+            self.invalida(nome)
+        else:
+            callback(porzione.valore)
+
+    def smetti(self, nome: str, callback: Callable[[object], None]):
+        """Annulla un osserva()"""
+        osservatori = self._porzioni[nome].osservatori
+        if callback in osservatori:
+            osservatori.remove(callback)
+
+    def valore(self, nome: str, predefinito=None):
+        """Ultimo valore letto della porzione (predefinito se non ancora letto)"""
+        valore = self._porzioni[nome].valore
+        return predefinito if valore is _NON_CARICATO else valore
+
+    def invalida(self, nome: str):
+        """Segna una porzione da rileggere (es. quando cambia un parametro della lettura)"""
+        self._da_rileggere.add(nome)
+        self._rileggi()
+
+    def _su_evento(self, nome: str, evento: Evento):
+        porzione = self._porzioni[nome]
+        if porzione.filtro is None or porzione.filtro(evento):
+            self.invalida(nome)
+
+    def _rileggi_porzioni(self, dt):
+        """Rilegge in background le porzioni segnate che hanno osservatori"""
+        for nome in list(self._da_rileggere):
+            porzione = self._porzioni[nome]
+            if not porzione.osservatori:
+                # Nessuno la mostra: resta da rileggere fino al prossimo osserva()
+                porzione.valore = _NON_CARICATO
+                continue
+            self.caricatore.carica(
+                f'stato.{nome}',
+                porzione.lettura,
+                lambda valore, nome=nome: self._imposta(nome, valore)
+            )
+        self._da_rileggere.clear()
+
+    def _imposta(self, nome: str, valore):
+        """Salva un valore riletto e avvisa gli osservatori se è cambiato"""
+        porzione = self._porzioni[nome]
+        if valore == porzione.valore:
+            return
+        porzione.valore = valore
+        for callback in list(porzione.osservatori):
+            callback(valore)
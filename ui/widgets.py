@@ -0,0 +1,311 @@
+# ui/widgets.py
+"""
+Widget riutilizzabili: liste virtualizzate con RecycleView e dialog di conferma
+"""
+
+import bisect
+from typing import Callable, Optional
+
+from kivy.animation import Animation
+from kivy.factory import Factory
+from kivy.metrics import dp
+from kivy.properties import ObjectProperty
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivymd.uix.button import MDFlatButton, MDRaisedButton
+from kivymd.uix.dialog import MDDialog
+from kivymd.uix.label import MDLabel
+from kivymd.uix.list import (
+    TwoLineAvatarIconListItem, ThreeLineAvatarIconListItem,
+    IconLeftWidget, IconRightWidget
+)
+
+
+class RigaRiciclabile(RecycleDataViewBehavior):
+    """
+    Comportamento comune delle righe di una ListaVirtuale
+
+    Icona e bottone elimina vengono creati una sola volta per widget;
+    quando la riga viene riciclata per un altro elemento cambiano solo
+    testi, icona ed elemento. Le azioni sono quelle della lista, quindi
+    i dati non contengono callback per riga.
+    """
+
+    elemento = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lista = None
+        self._icona = IconLeftWidget(icon="circle-outline")
+        self.add_widget(self._icona)
+        self._elimina = IconRightWidget(icon="delete", on_release=self._elimina_premuto)
+        self.add_widget(self._elimina)
+
+    def refresh_view_attrs(self, rv, index, data):
+        """Aggiorna la riga con i dati di un altro elemento"""
+        self.lista = rv
+        self._icona.icon = data.get('icona', "circle-outline")
+        dati = {k: v for k, v in data.items() if k not in ('icona', 'viewclass', 'chiave')}
+        return super().refresh_view_attrs(rv, index, dati)
+
+    def on_release(self):
+        if self.lista is not None and self.lista.apri is not None:
+            self.lista.apri(self.elemento)
+
+    def _elimina_premuto(self, instance):
+        if self.lista is not None and self.lista.elimina is not None:
+            self.lista.elimina(self.elemento)
+
+
+class RigaDueLinee(RigaRiciclabile, TwoLineAvatarIconListItem):
+    """Riga a due linee con icona ed eliminazione"""
+
+
+class RigaTreLinee(RigaRiciclabile, ThreeLineAvatarIconListItem):
+    """Riga a tre linee con icona ed eliminazione"""
+
+
+class RigaVuota(RecycleDataViewBehavior, MDLabel):
+    """Messaggio mostrato quando la lista è vuota"""
+
+    def __init__(self, **kwargs):
+        super().__init__(halign="center", theme_text_color="Secondary", **kwargs)
+
+
+class RigaCaricamento(RecycleDataViewBehavior, MDLabel):
+    """Segnaposto mostrato mentre i dati arrivano dal caricatore"""
+
+    def __init__(self, **kwargs):
+        super().__init__(text="Caricamento…", halign="center",
+                         theme_text_color="Hint", **kwargs)
+
+
+Factory.register('RigaDueLinee', cls=RigaDueLinee)
+Factory.register('RigaTreLinee', cls=RigaTreLinee)
+Factory.register('RigaVuota', cls=RigaVuota)
+Factory.register('RigaCaricamento', cls=RigaCaricamento)
+
+# Righe che non rappresentano elementi
+_SEGNAPOSTO = ('RigaVuota', 'RigaCaricamento')
+
+
+class ListaVirtuale(RecycleView):
+    """
+    Lista che crea widget solo per le righe visibili
+
+    Le righe sono dizionari in data (testi, 'icona', 'elemento', 'chiave');
+    il numero di widget dipende dall'altezza dello schermo e non dal numero
+    di elementi. Dopo una modifica si inserisce, aggiorna o rimuove solo la
+    riga interessata (per 'chiave'): la RecycleView riaggiorna le righe
+    visibili senza creare widget.
+    """
+
+    apri = ObjectProperty(None, allownone=True)  # chiamata con l'elemento toccato
+    elimina = ObjectProperty(None, allownone=True)  # chiamata con l'elemento da eliminare
+
+    def __init__(self, viewclass: str = 'RigaDueLinee', altezza_riga: float = dp(72),
+                 ordine: Optional[Callable] = None, **kwargs):
+        """
+        Args:
+            viewclass: Classe delle righe ('RigaDueLinee' o 'RigaTreLinee')
+            altezza_riga: Altezza di ogni riga
+            ordine: Chiave di ordinamento di un elemento, per inserire le
+                nuove righe al loro posto (None: le nuove righe vanno in cima)
+        """
+        super().__init__(**kwargs)
+        self.ordine = ordine
+        self._ordini = []  # ordine di ogni riga, parallelo a data (None: da calcolare)
+        self._vuoto = ""
+
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, altezza_riga),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        # viewclass passa al layout manager: va impostata dopo averlo aggiunto
+        self.viewclass = viewclass
+        # Le righe segnaposto indicano la loro classe in 'viewclass'
+        self.key_viewclass = 'viewclass'
+
+    def mostra(self, righe: list, vuoto: str, ordinate: bool = False,
+               massimo: Optional[int] = None, oltre: str = ""):
+        """
+        Sostituisce le righe della lista
+
+        Args:
+            righe: Dizionari delle righe
+            vuoto: Messaggio da mostrare se non ci sono righe
+            ordinate: Le righe sono già nell'ordinamento della lista (niente
+                sort: con decine di migliaia di righe costa più di un frame)
+            massimo: Righe mostrate al massimo (il layout della RecycleView
+                è lineare nel numero di righe, anche se i widget no)
+            oltre: Messaggio in coda se ci sono più righe, con {n} nascoste
+        """
+        self._vuoto = vuoto
+        if self.ordine is not None:
+            if not ordinate:
+                # A parità di chiave l'ordine del chiamante resta quello
+                righe = sorted(righe, key=lambda riga: self.ordine(riga['elemento']))
+            # Chiavi calcolate alla prima modifica, non a ogni mostra()
+            self._ordini = None
+        if massimo is not None and len(righe) > massimo:
+            nascoste = len(righe) - massimo
+            righe = righe[:massimo] + [{'viewclass': 'RigaVuota', 'text': oltre.format(n=nascoste)}]
+        self.data = righe or [self._riga_vuota()]
+
+    def mostra_caricamento(self, righe: int = 6):
+        """Mostra righe segnaposto in attesa dei dati"""
+        self._ordini = []
+        self.data = [{'viewclass': 'RigaCaricamento'} for _ in range(righe)]
+
+    @property
+    def in_caricamento(self) -> bool:
+        """True se la lista mostra i segnaposto di caricamento"""
+        return bool(self.data) and self.data[0].get('viewclass') == 'RigaCaricamento'
+
+    def _riga_vuota(self) -> dict:
+        return {'viewclass': 'RigaVuota', 'text': self._vuoto}
+
+    def _vuota(self) -> bool:
+        return bool(self.data) and self.data[0].get('viewclass') in _SEGNAPOSTO
+
+    def _chiavi(self) -> list:
+        """Ordine di ogni riga, parallelo a data"""
+        if self._ordini is None:
+            self._ordini = [self.ordine(riga['elemento']) for riga in self.data
+                            if riga.get('viewclass') not in _SEGNAPOSTO]
+        return self._ordini
+
+    def _posizione(self, chiave) -> int:
+        """Indice della riga con la chiave data (-1 se non c'è)"""
+        for i, riga in enumerate(self.data):
+            if riga.get('chiave') == chiave:
+                return i
+        return -1
+
+    def inserisci(self, riga: dict):
+        """Inserisce una riga al suo posto nell'ordinamento"""
+        if self.in_caricamento:
+            return  # il caricamento in corso viene ripetuto e la includerà
+        if self._vuota():
+            # Assegnazione e non data.clear(): ObservableList non notifica
+            # clear() e la RecycleView perderebbe il conto delle righe
+            self._ordini = [] if self.ordine is None else [self.ordine(riga['elemento'])]
+            self.data = [riga]
+            return
+
+        if self.ordine is None:
+            self.data.insert(0, riga)
+            return
+
+        ordine = self.ordine(riga['elemento'])
+        chiavi = self._chiavi()
+        posizione = bisect.bisect_right(chiavi, ordine)
+        chiavi.insert(posizione, ordine)
+        self.data.insert(posizione, riga)
+
+    def aggiorna(self, riga: dict, chiave=None):
+        """
+        Sostituisce la riga con la stessa chiave (o con chiave, se cambia)
+
+        Se cambia la posizione nell'ordinamento la riga viene spostata.
+        """
+        posizione = self._posizione(riga['chiave'] if chiave is None else chiave)
+        if posizione < 0:
+            self.inserisci(riga)
+            return
+
+        if self.ordine is not None and self._chiavi()[posizione] != self.ordine(riga['elemento']):
+            self.rimuovi(self.data[posizione]['chiave'])
+            self.inserisci(riga)
+        else:
+            self.data[posizione] = riga
+
+    def rimuovi(self, chiave):
+        """Rimuove la riga con la chiave data"""
+        posizione = self._posizione(chiave)
+        if posizione < 0:
+            return
+
+        if self.ordine is not None:
+            del self._chiavi()[posizione]
+        del self.data[posizione]
+        if not self.data:
+            self.data.append(self._riga_vuota())
+
+
+def apri_menu(menu, caller):
+    """
+    Apre un MDDropdownMenu riusato accanto a caller
+
+    Se il menu è ancora nell'animazione di chiusura la si interrompe,
+    altrimenti la fine dell'animazione lo toglierebbe dalla finestra
+    appena riaperto.
+    """
+    if menu.parent is not None:
+        Animation.cancel_all(menu)
+        menu.parent.remove_widget(menu)
+    menu.caller = caller
+    menu.open()
+
+
+def azzera_campo(campo, testo: str = ""):
+    """
+    Riporta un MDTextField allo stato iniziale (per i dialog riusati)
+
+    Svuotare un campo obbligatorio lo metterebbe in errore e il suggerimento
+    resterebbe in alto come dopo la compilazione.
+    """
+    campo.focus = False
+    campo.text = testo
+    campo.on_focus(campo, False)  # riporta giù il suggerimento se il campo è vuoto
+    campo.error = False
+
+
+class DialogoConferma(MDDialog):
+    """
+    Dialog di conferma riutilizzabile
+
+    Si costruisce una volta per schermata: apri() cambia solo titolo,
+    testo, etichetta del bottone e azione, senza creare widget.
+    """
+
+    def __init__(self, **kwargs):
+        self._azione = None
+        self._conferma = MDRaisedButton(text="ELIMINA", on_release=self._conferma_premuto)
+        super().__init__(
+            title=" ",
+            text=" ",
+            buttons=[
+                MDFlatButton(text="ANNULLA", on_release=lambda x: self.dismiss()),
+                self._conferma
+            ],
+            **kwargs
+        )
+        # L'altezza segue il testo anche quando cambia tra un'apertura e l'altra
+        self.ids.container.bind(height=self.setter('height'))
+
+    def apri(self, titolo: str, testo: str, azione: Callable[[], None],
+             conferma: str = "ELIMINA"):
+        """
+        Apre il dialog
+
+        Args:
+            titolo: Titolo del dialog
+            testo: Messaggio
+            azione: Chiamata (senza argomenti) alla conferma
+            conferma: Testo del bottone di conferma
+        """
+        self.title = titolo
+        self.text = testo
+        self._conferma.text = conferma
+        self._azione = azione
+        self.open()
+
+    def _conferma_premuto(self, instance):
+        if self._azione is not None:
+            self._azione()
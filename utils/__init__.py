@@ -4,6 +4,51 @@ Package utilities
 """
 
 from .validators import Validators
-from .exporters import DataExporter
+from .exporters import (
+    DataExporter, ScrittoreCSV, ScrittoreJSONL, ScrittoreJSON, StatisticheEsportazione
+)
+from .grafici import lttb, disegna_andamento, andamento_png
+from .report_html import ReportHTML, genera_report_voti
+from .pdf import ScrittorePDF, PaginaPDF, esporta_carriera_pdf
+from .compressione import (
+    apri_scrittura, apri_lettura, apri_testo, rileva_compressione, compressione_file,
+    codec_disponibili
+)
+from .colonnare import esporta_colonnare, esporta_tabella, leggi_blocchi
+from .pipeline import (
+    PipelineEsportazione, Destinazione, DestinazioneCSV, DestinazioneJSON,
+    DestinazioneHTML, DestinazionePDF, esporta_formati
+)
 
-__all__ = ['Validators', 'DataExporter']
\ No newline at end of file
+__all__ = [
+    'Validators',
+    'DataExporter',
+    'ScrittoreCSV',
+    'ScrittoreJSONL',
+    'ScrittoreJSON',
+    'StatisticheEsportazione',
+    'lttb',
+    'disegna_andamento',
+    'andamento_png',
+    'ReportHTML',
+    'genera_report_voti',
+    'ScrittorePDF',
+    'PaginaPDF',
+    'esporta_carriera_pdf',
+    'esporta_colonnare',
+    'esporta_tabella',
+    'leggi_blocchi',
+    'PipelineEsportazione',
+    'Destinazione',
+    'DestinazioneCSV',
+    'DestinazioneJSON',
+    'DestinazioneHTML',
+    'DestinazionePDF',
+    'esporta_formati',
+    'apri_scrittura',
+    'apri_lettura',
+    'apri_testo',
+    'rileva_compressione',
+    'compressione_file',
+    'codec_disponibili'
+]
\ No newline at end of file
@@ -0,0 +1,217 @@
+# utils/colonnare.py
+"""
+Esportazione colonnare (Parquet o Feather) per l'analisi dei dati
+
+Le tabelle si leggono da SQLite a blocchi con pd.read_sql(chunksize=...)
+in DataFrame già tipizzati: interi stretti, date vere, categorie per
+materia, anno e difficoltà. Ogni blocco diventa un row group (o un
+record batch) scritto subito, quindi la memoria dipende dal blocco e non
+dalla tabella.
+
+Formati e motori, tutti opzionali:
+    parquet: pyarrow (ParquetWriter), altrimenti fastparquet (append)
+    feather: pyarrow (file Arrow IPC, cioè Feather v2)
+
+pandas e i motori si importano solo all'esportazione.
+"""
+
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from core.database import Database
+from .exporters import StatisticheEsportazione
+
+# Righe lette da SQLite per ogni blocco (e per ogni row group)
+DIMENSIONE_BLOCCO = 50_000
+
+# Codec preferiti, nell'ordine (si usa il primo disponibile in pyarrow)
+CODEC_PREFERITI = ('zstd', 'lz4', 'snappy')
+
+# Per tabella: query, tipi delle colonne, colonne data e colonne categoria.
+# Le categorie sono lette prima dei blocchi (SELECT DISTINCT), così tutti i
+# blocchi hanno lo stesso dizionario e lo stesso schema.
+TABELLE = {
+    'voti': {
+        'query': 'SELECT id, materia, data, crediti, voto, laurea_id FROM voti ORDER BY id',
+        'tipi': {'id': 'int64', 'crediti': 'int16', 'voto': 'int8', 'laurea_id': 'int32'},
+        'date': {'data': '%Y-%m-%d'},
+        'categorie': ('materia',),
+    },
+    'tasse': {
+        'query': ('SELECT id, descrizione, importo_centesimi, scadenza, pagata, data_pagamento, '
+                  'ricorrenza_id, occorrenza FROM tasse ORDER BY id'),
+        'tipi': {'id': 'int64', 'descrizione': 'string', 'importo_centesimi': 'int64',
+                 'pagata': 'boolean', 'ricorrenza_id': 'Int64', 'occorrenza': 'Int32'},
+        'date': {'scadenza': '%Y-%m-%d', 'data_pagamento': '%Y-%m-%d'},
+        'categorie': (),
+    },
+    'domande': {
+        'query': ('SELECT id, materia, anno, testo, difficolta, created_at '
+                  'FROM domande ORDER BY id'),
+        'tipi': {'id': 'int64', 'testo': 'string'},
+        'date': {'created_at': 'ISO8601'},
+        'categorie': ('materia', 'anno', 'difficolta'),
+    },
+}
+
+ESTENSIONI = {'parquet': '.parquet', 'feather': '.feather'}
+
+
+def _pyarrow():
+    """Modulo pyarrow, o None se manca (o non è compatibile con numpy)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def _fastparquet():
+    try:
+        import fastparquet
+        return fastparquet
+    except ImportError:
+        return None
+
+
+def motore_disponibile(formato: str = 'parquet') -> Optional[str]:
+    """Motore che scriverà il formato ('pyarrow', 'fastparquet') o None"""
+    if _pyarrow() is not None:
+        return 'pyarrow'
+    if formato == 'parquet' and _fastparquet() is not None:
+        return 'fastparquet'
+    return None
+
+
+def leggi_blocchi(db: Database, tabella: str, blocco: int = DIMENSIONE_BLOCCO) -> Iterator:
+    """
+    DataFrame tipizzati di una tabella, blocco per blocco
+
+    Args:
+        db: Database da leggere (la connessione del thread corrente)
+        tabella: 'voti', 'tasse' o 'domande'
+        blocco: Righe per DataFrame
+    """
+    import pandas as pd
+
+    if tabella not in TABELLE:
+        raise ValueError(f"Tabella non esportabile in formato colonnare: {tabella}")
+    definizione = TABELLE[tabella]
+
+    categorie = {}
+    for colonna in definizione['categorie']:
+        valori = [riga[0] for riga in db.conn.execute(
+            f'SELECT DISTINCT {colonna} FROM {tabella} WHERE {colonna} IS NOT NULL ORDER BY 1'
+        )]
+        categorie[colonna] = pd.CategoricalDtype(valori)
+
+    for parte in pd.read_sql(definizione['query'], db.conn, chunksize=blocco,
+                             parse_dates=definizione['date']):
+        # read_sql applicherebbe dtype prima delle date: i tipi si fissano qui
+        yield parte.astype({**definizione['tipi'], **categorie})
+
+
+def _codec(pyarrow) -> Optional[str]:
+    for codec in CODEC_PREFERITI:
+        if pyarrow.Codec.is_available(codec):
+            return codec
+    return None
+
+
+def _scrivi_pyarrow(blocchi: Iterable, percorso: Path, formato: str) -> int:
+    """Un row group (o record batch) per blocco, con lo schema del primo"""
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+
+    codec = _codec(pa)
+    scrittore = None
+    righe = 0
+    try:
+        for parte in blocchi:
+            tabella = pa.Table.from_pandas(parte, preserve_index=False)
+            if scrittore is None:
+                schema = tabella.schema
+                if formato == 'parquet':
+                    scrittore = pq.ParquetWriter(percorso, schema, compression=codec or 'none')
+                else:
+                    opzioni = pa.ipc.IpcWriteOptions(compression=codec if codec != 'snappy' else None)
+                    scrittore = pa.ipc.new_file(str(percorso), schema, options=opzioni)
+            else:
+                tabella = tabella.cast(schema)
+            scrittore.write_table(tabella)
+            righe += len(parte)
+    finally:
+        if scrittore is not None:
+            scrittore.close()
+    return righe
+
+
+def _scrivi_fastparquet(blocchi: Iterable, percorso: Path) -> int:
+    """Il primo blocco crea il file, i successivi si accodano come row group"""
+    fastparquet = _fastparquet()
+    righe = 0
+    for numero, parte in enumerate(blocchi):
+        fastparquet.write(str(percorso), parte, append=numero > 0, write_index=False)
+        righe += len(parte)
+    return righe
+
+
+def esporta_tabella(db: Database, tabella: str, percorso, formato: str = 'parquet',
+                    blocco: int = DIMENSIONE_BLOCCO) -> StatisticheEsportazione:
+    """
+    Esporta una tabella in un file colonnare
+
+    Anche una tabella vuota produce il file, con il solo schema.
+
+    Raises:
+        ImportError: Se nessun motore può scrivere il formato
+        ValueError: Se formato o tabella non sono validi
+    """
+    if formato not in ESTENSIONI:
+        raise ValueError(f"Formato colonnare non valido: {formato}")
+    motore = motore_disponibile(formato)
+    if motore is None:
+        richiesto = "pyarrow" if formato == 'feather' else "pyarrow o fastparquet"
+        raise ImportError(f"Per esportare in {formato} serve {richiesto}")
+
+    percorso = Path(percorso)
+    inizio = time.perf_counter()
+    blocchi = leggi_blocchi(db, tabella, blocco)
+    if motore == 'pyarrow':
+        righe = _scrivi_pyarrow(blocchi, percorso, formato)
+    else:
+        righe = _scrivi_fastparquet(blocchi, percorso)
+
+    return StatisticheEsportazione(
+        righe=righe,
+        byte=percorso.stat().st_size if percorso.exists() else 0,
+        secondi=time.perf_counter() - inizio
+    )
+
+
+def esporta_colonnare(db: Database, cartella, tabelle: Iterable[str] = tuple(TABELLE),
+                      formato: Optional[str] = None,
+                      blocco: int = DIMENSIONE_BLOCCO) -> Dict[str, StatisticheEsportazione]:
+    """
+    Esporta più tabelle in una cartella, un file per tabella
+
+    Args:
+        db: Database da leggere
+        cartella: Cartella di output (creata se manca)
+        tabelle: Tabelle da esportare
+        formato: 'parquet' o 'feather' (None: parquet)
+        blocco: Righe per blocco
+
+    Returns:
+        Statistiche per tabella
+    """
+    formato = formato or 'parquet'
+    cartella = Path(cartella)
+    cartella.mkdir(parents=True, exist_ok=True)
+    return {
+        tabella: esporta_tabella(db, tabella, cartella / f"{tabella}{ESTENSIONI[formato]}",
+                                 formato, blocco)
+        for tabella in tabelle
+    }
@@ -0,0 +1,160 @@
+# utils/compressione.py
+"""
+Compressione a flusso per esportazioni e backup (gzip, lzma, bz2)
+
+I file compressi si scrivono e si leggono attraverso un oggetto file
+che comprime o decomprime al volo: nessun file temporaneo e memoria
+costante. In lettura il formato si riconosce dai primi byte, quindi un
+file si apre allo stesso modo che sia compresso o no.
+
+I moduli dei codec sono importati solo quando servono: alcune build di
+Python (per esempio su Android) non hanno lzma o bz2.
+"""
+
+import importlib
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+@dataclass(frozen=True)
+class Codec:
+    """Un formato di compressione e come aprirlo"""
+    nome: str
+    modulo: str
+    firma: bytes          # primi byte di ogni file in questo formato
+    estensione: str
+    livello_predefinito: int
+    livello_minimo: int
+    livello_massimo: int
+    parametro_livello: str  # nome dell'argomento di open() per il livello
+
+
+CODEC = {
+    'gzip': Codec('gzip', 'gzip', b'\x1f\x8b', '.gz', 6, 1, 9, 'compresslevel'),
+    'lzma': Codec('lzma', 'lzma', b'\xfd7zXZ\x00', '.xz', 6, 0, 9, 'preset'),
+    'bz2': Codec('bz2', 'bz2', b'BZh', '.bz2', 9, 1, 9, 'compresslevel'),
+}
+
+# Byte letti per riconoscere il formato (la firma più lunga)
+_BYTE_FIRMA = max(len(codec.firma) for codec in CODEC.values())
+
+
+def codec(nome: str) -> Codec:
+    """
+    Codec per nome
+
+    Raises:
+        ValueError: Se il codec non esiste
+    """
+    try:
+        return CODEC[nome]
+    except KeyError:
+        raise ValueError(
+            f"Compressione non valida: {nome} (disponibili: {', '.join(CODEC)})"
+        ) from None
+
+
+def _modulo(codec: Codec):
+    try:
+        return importlib.import_module(codec.modulo)
+    except ImportError as e:
+        raise ImportError(f"Compressione {codec.nome} non disponibile in questo Python") from e
+
+
+def codec_disponibili() -> list:
+    """Nomi dei codec utilizzabili in questo Python"""
+    disponibili = []
+    for nome, c in CODEC.items():
+        try:
+            _modulo(c)
+        except ImportError:
+            continue
+        disponibili.append(nome)
+    return disponibili
+
+
+def con_estensione(percorso, compressione: Optional[str]) -> Path:
+    """Percorso con l'estensione del codec aggiunta (se manca)"""
+    percorso = Path(percorso)
+    if compressione is None:
+        return percorso
+    estensione = codec(compressione).estensione
+    if percorso.suffix == estensione:
+        return percorso
+    return percorso.with_name(percorso.name + estensione)
+
+
+def apri_scrittura(percorso, compressione: Optional[str] = None,
+                   livello: Optional[int] = None) -> BinaryIO:
+    """
+    File binario in scrittura, compresso al volo se richiesto
+
+    Args:
+        percorso: File di output (sovrascritto)
+        compressione: 'gzip', 'lzma', 'bz2' o None
+        livello: Livello del codec (None: quello predefinito); più alto
+            comprime di più ed è più lento
+
+    Raises:
+        ValueError: Se codec o livello non sono validi
+        ImportError: Se il codec manca in questo Python
+    """
+    if compressione is None:
+        return open(percorso, 'wb')
+
+    c = codec(compressione)
+    if livello is None:
+        livello = c.livello_predefinito
+    if not c.livello_minimo <= livello <= c.livello_massimo:
+        raise ValueError(
+            f"Livello {compressione} non valido: {livello} "
+            f"(da {c.livello_minimo} a {c.livello_massimo})"
+        )
+    return _modulo(c).open(percorso, 'wb', **{c.parametro_livello: livello})
+
+
+def rileva_compressione(testa: bytes) -> Optional[str]:
+    """Codec riconosciuto dai primi byte di un file (None: non compresso)"""
+    for nome, c in CODEC.items():
+        if testa.startswith(c.firma):
+            return nome
+    return None
+
+
+def compressione_file(percorso) -> Optional[str]:
+    """Codec di un file, letto dalla firma (non dall'estensione)"""
+    with open(percorso, 'rb') as f:
+        return rileva_compressione(f.read(_BYTE_FIRMA))
+
+
+def apri_lettura(percorso) -> BinaryIO:
+    """
+    File binario in lettura, decompresso al volo se è compresso
+
+    Raises:
+        ImportError: Se il file usa un codec che manca in questo Python
+    """
+    compressione = compressione_file(percorso)
+    if compressione is None:
+        return open(percorso, 'rb')
+    return _modulo(codec(compressione)).open(percorso, 'rb')
+
+
+def apri_testo(percorso, modo: str = 'r', compressione: Optional[str] = None,
+               livello: Optional[int] = None, newline: Optional[str] = None) -> io.TextIOWrapper:
+    """
+    File di testo UTF-8: in lettura riconosce la compressione, in
+    scrittura comprime con il codec dato
+
+    Args:
+        modo: 'r' o 'w'
+    """
+    if modo == 'r':
+        binario = apri_lettura(percorso)
+    elif modo == 'w':
+        binario = apri_scrittura(percorso, compressione, livello)
+    else:
+        raise ValueError(f"Modo non valido: {modo}")
+    return io.TextIOWrapper(binario, encoding='utf-8', newline=newline)
@@ -1,32 +1,48 @@
 # utils/exporters.py
 """
 Esportatori dati in vari formati
+
+Gli scrittori a flusso (ScrittoreCSV, ScrittoreJSONL, ScrittoreJSON)
+consumano qualsiasi iterabile di righe, anche Database.scorri(), con un
+buffer di dimensione fissa: la memoria non dipende dal numero di righe.
+Tutti gli esportatori possono comprimere al volo (vedi utils.compressione).
 """
 
 import json
 import csv
+import itertools
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List
-from datetime import datetime
+from typing import Callable, Iterable, List, Optional
+from datetime import date, datetime
+
+from .compressione import apri_scrittura, apri_testo
+
+# Caratteri accumulati prima di ogni scrittura su file
+DIMENSIONE_BUFFER = 64 * 1024
 
 
 class DataExporter:
     """Esporta dati in vari formati"""
     
     @staticmethod
-    def export_to_json(data: dict, filepath: str) -> bool:
+    def export_to_json(data: dict, filepath: str, compressione: str = None,
+                       livello: int = None) -> bool:
         """
         Esporta dati in JSON
         
         Args:
             data: Dizionario con i dati
             filepath: Percorso file output
+            compressione: 'gzip', 'lzma', 'bz2' o None
+            livello: Livello di compressione (None: predefinito del codec)
             
         Returns:
             True se successo, False altrimenti
         """
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
+            with apri_testo(filepath, 'w', compressione, livello) as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
             return True
         except Exception as e:
@@ -34,29 +50,31 @@ class DataExporter:
             return False
     
     @staticmethod
-    def export_to_csv(data: List[dict], filepath: str, fieldnames: List[str] = None) -> bool:
+    def export_to_csv(data: Iterable[dict], filepath: str, fieldnames: List[str] = None,
+                      compressione: str = None, livello: int = None) -> bool:
         """
         Esporta dati in CSV
         
         Args:
-            data: Lista di dizionari
+            data: Righe (lista, generatore o cursore: vengono lette a flusso)
             filepath: Percorso file output
-            fieldnames: Nomi delle colonne (opzionale)
+            fieldnames: Nomi delle colonne (opzionale, altrimenti quelli
+                della prima riga)
+            compressione: 'gzip', 'lzma', 'bz2' o None
+            livello: Livello di compressione (None: predefinito del codec)
             
         Returns:
             True se successo, False altrimenti
         """
-        if not data:
+        righe = iter(data)
+        prima = next(righe, None)
+        if prima is None:
             return False
         
         try:
-            if fieldnames is None:
-                fieldnames = list(data[0].keys())
-            
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(data)
+            with ScrittoreCSV(filepath, colonne=fieldnames, compressione=compressione,
+                              livello=livello) as scrittore:
+                scrittore.scrivi_tutte(itertools.chain((prima,), righe))
             
             return True
         except Exception as e:
@@ -64,19 +82,22 @@ class DataExporter:
             return False
     
     @staticmethod
-    def export_to_txt(text: str, filepath: str) -> bool:
+    def export_to_txt(text: str, filepath: str, compressione: str = None,
+                      livello: int = None) -> bool:
         """
         Esporta testo in file TXT
         
         Args:
             text: Testo da esportare
             filepath: Percorso file output
+            compressione: 'gzip', 'lzma', 'bz2' o None
+            livello: Livello di compressione (None: predefinito del codec)
             
         Returns:
             True se successo, False altrimenti
         """
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
+            with apri_testo(filepath, 'w', compressione, livello) as f:
                 f.write(text)
             return True
         except Exception as e:
@@ -95,4 +116,243 @@ class DataExporter:
             Nome file con timestamp
         """
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        return f"{base_name}_{timestamp}.db"
\ No newline at end of file
+        return f"{base_name}_{timestamp}.db"
+
+
+@dataclass
+class StatisticheEsportazione:
+    """Righe e byte (prima della compressione) scritti da uno scrittore, e in quanto tempo"""
+    righe: int = 0
+    byte: int = 0
+    secondi: float = 0.0
+    
+    @property
+    def righe_al_secondo(self) -> float:
+        return self.righe / self.secondi if self.secondi > 0 else 0.0
+    
+    @property
+    def byte_al_secondo(self) -> float:
+        return self.byte / self.secondi if self.secondi > 0 else 0.0
+    
+    def __str__(self) -> str:
+        return (f"{self.righe} righe, {self.byte / 1e6:.1f} MB in {self.secondi:.2f} s "
+                f"({self.righe_al_secondo:,.0f} righe/s, {self.byte_al_secondo / 1e6:.1f} MB/s)")
+
+
+def come_dizionario(riga) -> dict:
+    """
+    Riga come dizionario: dict, sqlite3.Row o modello con to_dict()
+    
+    Raises:
+        TypeError: Se la riga non è di un tipo riconosciuto
+    """
+    if isinstance(riga, dict):
+        return riga
+    if hasattr(riga, 'keys'):
+        return {chiave: riga[chiave] for chiave in riga.keys()}
+    if hasattr(riga, 'to_dict'):
+        return riga.to_dict()
+    raise TypeError(f"Riga non esportabile: {type(riga).__name__}")
+
+
+def _json_default(valore):
+    """Date in ISO 8601, il resto come testo"""
+    if isinstance(valore, (date, datetime)):
+        return valore.isoformat()
+    return str(valore)
+
+
+class _Parti(list):
+    """Lista con write(): csv.writer ci accoda il testo formattato"""
+    write = list.append
+
+
+class ScrittoreFlusso:
+    """
+    Base degli scrittori a flusso
+    
+    Le righe codificate si accumulano in un buffer di DIMENSIONE_BUFFER
+    caratteri, poi vanno su file in una sola write. Si usa come context
+    manager, o con scrivi()/chiudi():
+    
+        with ScrittoreJSONL(percorso) as scrittore:
+            scrittore.scrivi_tutte(db.scorri_tabella('voti'))
+        print(scrittore.statistiche)
+    
+    Le sottoclassi definiscono _codifica(riga) e, se servono, _inizio() e
+    _fine().
+    """
+    
+    def __init__(self, filepath, buffer: int = DIMENSIONE_BUFFER,
+                 avanzamento: Optional[Callable[[StatisticheEsportazione], None]] = None,
+                 compressione: Optional[str] = None, livello: Optional[int] = None):
+        """
+        Args:
+            filepath: File di output (sovrascritto)
+            buffer: Caratteri accumulati prima di scrivere su file
+            avanzamento: Chiamata con le statistiche dopo ogni scrittura su file
+            compressione: 'gzip', 'lzma', 'bz2' o None (il buffer arriva
+                compresso su file, senza file temporanei)
+            livello: Livello di compressione (None: predefinito del codec)
+        """
+        self.filepath = Path(filepath)
+        self.buffer = buffer
+        self.compressione = compressione
+        self.livello = livello
+        self.avanzamento = avanzamento
+        self.statistiche = StatisticheEsportazione()
+        self._file = None
+        self._parti = _Parti()
+        self._in_buffer = 0
+        self._inizio_tempo = None
+    
+    def _apri_file(self):
+        """File binario di destinazione"""
+        return apri_scrittura(self.filepath, self.compressione, self.livello)
+    
+    def _inizio(self, riga: dict) -> str:
+        """Testo prima della prima riga (riceve la prima riga)"""
+        return ''
+    
+    def _codifica(self, riga: dict) -> str:
+        raise NotImplementedError
+    
+    def _fine(self) -> str:
+        """Testo dopo l'ultima riga"""
+        return ''
+    
+    def _accoda(self, testo: str):
+        if testo:
+            self._parti.append(testo)
+            self._in_buffer += len(testo)
+            if self._in_buffer >= self.buffer:
+                self._svuota()
+    
+    def _svuota(self):
+        """Scrive su file il buffer accumulato"""
+        if not self._parti:
+            return
+        dati = ''.join(self._parti).encode('utf-8')
+        self._parti.clear()
+        self._in_buffer = 0
+        self._file.write(dati)
+        self.statistiche.byte += len(dati)
+        self.statistiche.secondi = time.perf_counter() - self._inizio_tempo
+        if self.avanzamento is not None:
+            self.avanzamento(self.statistiche)
+    
+    def apri(self) -> 'ScrittoreFlusso':
+        """Apre il file (lo fanno anche with e la prima scrivi())"""
+        if self._file is None:
+            self._inizio_tempo = time.perf_counter()
+            self._file = self._apri_file()
+        return self
+    
+    def scrivi(self, riga):
+        """Accoda una riga (dict, sqlite3.Row o modello con to_dict())"""
+        if self._file is None:
+            self.apri()
+        riga = come_dizionario(riga)
+        if self.statistiche.righe == 0:
+            self._accoda(self._inizio(riga))
+        self._accoda(self._codifica(riga))
+        self.statistiche.righe += 1
+    
+    def scrivi_tutte(self, righe: Iterable) -> StatisticheEsportazione:
+        """Accoda tutte le righe di un iterabile, una alla volta"""
+        for riga in righe:
+            self.scrivi(riga)
+        return self.statistiche
+    
+    def chiudi(self) -> StatisticheEsportazione:
+        """Scrive il resto del buffer e chiude il file"""
+        if self._file is None:
+            self.apri()
+        if self.statistiche.righe == 0:
+            self._accoda(self._inizio(None))
+        self._accoda(self._fine())
+        self._svuota()
+        self._file.close()
+        self.statistiche.secondi = time.perf_counter() - self._inizio_tempo
+        return self.statistiche
+    
+    def __enter__(self):
+        return self.apri()
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.chiudi()
+        elif self._file is not None:
+            self._file.close()
+
+
+class ScrittoreCSV(ScrittoreFlusso):
+    """CSV con intestazione: le colonne date o quelle della prima riga"""
+    
+    def __init__(self, filepath, colonne: List[str] = None, **kwargs):
+        super().__init__(filepath, **kwargs)
+        self.colonne = colonne
+        self._writer = None
+        self._riga = _Parti()  # il writer formatta qui, una riga alla volta
+    
+    def _formattata(self) -> str:
+        testo = ''.join(self._riga)
+        self._riga.clear()
+        return testo
+    
+    def _inizio(self, riga):
+        if self.colonne is None:
+            if riga is None:
+                return ''  # nessuna riga e nessuna colonna: file vuoto
+            self.colonne = list(riga.keys())
+        self._writer = csv.DictWriter(self._riga, fieldnames=self.colonne)
+        self._writer.writeheader()
+        return self._formattata()
+    
+    def _codifica(self, riga):
+        self._writer.writerow(riga)
+        return self._formattata()
+
+
+class ScrittoreJSONL(ScrittoreFlusso):
+    """JSON Lines: un oggetto per riga"""
+    
+    def _codifica(self, riga):
+        return json.dumps(riga, ensure_ascii=False, default=_json_default) + '\n'
+
+
+class ScrittoreJSON(ScrittoreFlusso):
+    """
+    Array JSON scritto un elemento alla volta
+    
+    Con chiave l'array è il valore di quella chiave in un oggetto che
+    contiene anche campi (scritti prima, in testa):
+    
+        ScrittoreJSON(percorso, chiave='voti', campi={'esportato_il': ...})
+        -> {"esportato_il": "...", "voti": [...]}
+    """
+    
+    def __init__(self, filepath, chiave: str = None, campi: dict = None, **kwargs):
+        super().__init__(filepath, **kwargs)
+        self.chiave = chiave
+        self.campi = campi or {}
+    
+    def _inizio(self, riga):
+        if self.chiave is None:
+            return '['
+        testa = ''.join(
+            f'  {json.dumps(nome, ensure_ascii=False)}: '
+            f'{json.dumps(valore, ensure_ascii=False, default=_json_default)},\n'
+            for nome, valore in self.campi.items()
+        )
+        return f'{{\n{testa}  {json.dumps(self.chiave, ensure_ascii=False)}: ['
+    
+    def _codifica(self, riga):
+        separatore = ',' if self.statistiche.righe else ''
+        rientro = '    ' if self.chiave is not None else '  '
+        return f'{separatore}\n{rientro}{json.dumps(riga, ensure_ascii=False, default=_json_default)}'
+    
+    def _fine(self):
+        if self.chiave is None:
+            return '\n]\n' if self.statistiche.righe else ']\n'
+        return ('\n  ]' if self.statistiche.righe else ']') + '\n}\n'
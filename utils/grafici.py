@@ -0,0 +1,166 @@
+# utils/grafici.py
+"""
+Grafici renderizzati fuori dal thread della UI
+
+Le funzioni non toccano Kivy: producono un buffer RGBA che la UI carica
+in una Texture. matplotlib e numpy sono importati al primo grafico.
+"""
+
+from typing import List, Sequence, Tuple
+
+from core.calculator import CalcolatoreVoti
+from core.models import Voto
+
+# Colori del tema (Blue 700 e grigi Material)
+COLORE_MEDIA = '#1976D2'
+COLORE_VOTI = '#90A4AE'
+COLORE_GRIGLIA = '#E0E0E0'
+
+# Margini del grafico in pollici (sinistra, destra, sotto, sopra)
+MARGINI = (0.4, 0.1, 0.35, 0.1)
+
+
+def lttb(x: Sequence[float], y: Sequence[float], punti: int):
+    """
+    Largest-Triangle-Three-Buckets: sceglie i punti che conservano la forma
+
+    Il primo e l'ultimo punto restano; gli altri sono divisi in punti - 2
+    gruppi e da ogni gruppo si tiene il punto che forma il triangolo più
+    grande con il punto tenuto prima e la media del gruppo successivo.
+    Picchi e valli restano visibili, a differenza di una media mobile.
+
+    Args:
+        x: Ascisse crescenti
+        y: Ordinate
+        punti: Punti da tenere
+
+    Returns:
+        Indici (array numpy crescente) dei punti tenuti
+    """
+    import numpy as np
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if punti >= n or punti < 3:
+        return np.arange(n)
+
+    # Confini dei gruppi: punti - 2 gruppi tra il secondo e il penultimo punto
+    bordi = np.linspace(1, n - 1, punti - 1).astype(np.intp)
+    indici = np.empty(punti, dtype=np.intp)
+    indici[0] = 0
+    indici[-1] = n - 1
+
+    scelto = 0
+    for i in range(punti - 2):
+        inizio, fine = bordi[i], bordi[i + 1]
+        # Vertice fisso sul gruppo successivo: la sua media (o l'ultimo punto)
+        if i + 2 < len(bordi):
+            successivo = slice(bordi[i + 1], bordi[i + 2])
+            xc, yc = x[successivo].mean(), y[successivo].mean()
+        else:
+            xc, yc = x[-1], y[-1]
+
+        xa, ya = x[scelto], y[scelto]
+        aree = np.abs((xa - xc) * (y[inizio:fine] - ya) - (xa - x[inizio:fine]) * (yc - ya))
+        scelto = inizio + int(aree.argmax())
+        indici[i + 1] = scelto
+
+    return indici
+
+
+def serie_andamento(voti: List[Voto]):
+    """
+    Serie del grafico di andamento
+
+    Args:
+        voti: Voti ordinati per data
+
+    Returns:
+        (date come numeri matplotlib, voti numerici, media progressiva)
+    """
+    import numpy as np
+    from matplotlib.dates import date2num
+
+    return (
+        np.asarray(date2num([voto.data for voto in voti]), dtype=np.float64),
+        np.fromiter((voto.voto_numerico for voto in voti), dtype=np.float64, count=len(voti)),
+        np.asarray(CalcolatoreVoti.media_progressiva(voti), dtype=np.float64),
+    )
+
+
+def _figura_andamento(voti: List[Voto], larghezza: int, altezza: int, dpi: float):
+    """Canvas Agg del grafico di andamento, pronto ma non ancora disegnato"""
+    from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    date, valori, medie = serie_andamento(voti)
+
+    # Un punto ogni due pixel basta: il resto si sovrapporrebbe
+    massimo = max(3, larghezza // 2)
+    indici_voti = lttb(date, valori, massimo)
+    indici_media = lttb(date, medie, massimo)
+
+    figura = Figure(figsize=(larghezza / dpi, altezza / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figura)
+    assi = figura.add_subplot()
+
+    assi.scatter(date[indici_voti], valori[indici_voti], s=12, color=COLORE_VOTI,
+                 label="Voti", zorder=2)
+    assi.plot(date[indici_media], medie[indici_media], color=COLORE_MEDIA, linewidth=2,
+              label="Media", zorder=3)
+
+    locator = AutoDateLocator()
+    assi.xaxis.set_major_locator(locator)
+    assi.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+    assi.set_ylim(17.5, 30.5)
+    assi.grid(True, color=COLORE_GRIGLIA, linewidth=0.8, zorder=0)
+    for lato in ('top', 'right'):
+        assi.spines[lato].set_visible(False)
+    assi.legend(loc='best', frameon=False)
+    # Margini fissi in pollici: tight_layout misurerebbe ogni etichetta
+    # e costerebbe quanto tutto il resto del disegno
+    sinistra, destra, sotto, sopra = MARGINI
+    figura.subplots_adjust(
+        left=sinistra * dpi / larghezza, right=1 - destra * dpi / larghezza,
+        bottom=sotto * dpi / altezza, top=1 - sopra * dpi / altezza
+    )
+
+    return canvas
+
+
+def disegna_andamento(voti: List[Voto], larghezza: int, altezza: int,
+                      dpi: float = 100) -> Tuple[memoryview, int, int]:
+    """
+    Disegna voti e media progressiva con il backend Agg
+
+    Usa Figure e FigureCanvasAgg senza pyplot (nessuno stato globale),
+    quindi si può chiamare da un thread di lavoro. Con più punti che
+    pixel le serie sono ridotte con LTTB: la curva è la stessa a vista e
+    il rendering non dipende dalla lunghezza dello storico.
+
+    Args:
+        voti: Voti ordinati per data (almeno uno)
+        larghezza: Larghezza in pixel
+        altezza: Altezza in pixel
+        dpi: Densità (scala testi e linee)
+
+    Returns:
+        (buffer RGBA dal renderer, larghezza, altezza). Il buffer è quello
+        di Agg, senza copie, con la prima riga in alto.
+    """
+    canvas = _figura_andamento(voti, larghezza, altezza, dpi)
+    canvas.draw()
+    larghezza, altezza = canvas.get_width_height()
+    # Vista piatta (righe x colonne x RGBA -> byte) dello stesso buffer
+    return canvas.buffer_rgba().cast('B'), larghezza, altezza
+
+
+def andamento_png(voti: List[Voto], larghezza: int, altezza: int, dpi: float = 100) -> bytes:
+    """Lo stesso grafico di disegna_andamento, codificato in PNG (per i report)"""
+    import io
+
+    flusso = io.BytesIO()
+    _figura_andamento(voti, larghezza, altezza, dpi).print_png(flusso)
+    return flusso.getvalue()
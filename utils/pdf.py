@@ -0,0 +1,338 @@
+# utils/pdf.py
+"""
+Esportazione PDF senza dipendenze esterne
+
+ScrittorePDF scrive un PDF 1.4 un oggetto alla volta: ogni pagina finisce
+sul file appena è completa e in memoria restano solo le posizioni degli
+oggetti per la tabella xref finale. Font (Helvetica standard, non
+incorporati) e immagini sono oggetti unici, condivisi da tutte le pagine
+attraverso un solo dizionario di risorse.
+"""
+
+import zlib
+from datetime import datetime
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from core.models import Laurea, StatisticheVoti, Voto
+
+# Pagina A4 in punti tipografici e margini
+LARGHEZZA_PAGINA = 595.28
+ALTEZZA_PAGINA = 841.89
+MARGINE = 50
+
+# Tabella dei voti: altezza delle righe e colonne (x relativa al margine, larghezza)
+ALTEZZA_RIGA = 16
+CORPO_TABELLA = 9
+COLONNE = (
+    ('Materia', 0, 300),
+    ('Data', 310, 80),
+    ('Crediti', 400, 50),
+    ('Voto', 460, 35),
+)
+
+# Colori del tema (Blue 500 e grigi Material), componenti RGB 0-1
+BLU = (0.129, 0.588, 0.953)
+GRIGIO_LINEE = (0.867, 0.867, 0.867)
+GRIGIO_TESTO = (0.459, 0.459, 0.459)
+
+# Larghezze Helvetica (millesimi di em) dei caratteri da spazio a tilde,
+# dalle metriche AFM standard; gli altri caratteri valgono 556
+_LARGHEZZE_HELVETICA = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+
+def larghezza_testo(testo: str, corpo: float) -> float:
+    """Larghezza in punti di un testo in Helvetica (grassetto: circa +5%)"""
+    millesimi = 0
+    for carattere in testo:
+        codice = ord(carattere) - 32
+        millesimi += _LARGHEZZE_HELVETICA[codice] if 0 <= codice < 95 else 556
+    return millesimi * corpo / 1000
+
+
+def tronca(testo: str, corpo: float, larghezza: float) -> str:
+    """Testo accorciato con … per stare nella larghezza data"""
+    if larghezza_testo(testo, corpo) <= larghezza:
+        return testo
+    while testo and larghezza_testo(testo + '…', corpo) > larghezza:
+        testo = testo[:-1]
+    return testo.rstrip() + '…'
+
+
+def _stringa(testo: str) -> bytes:
+    """Stringa letterale PDF in WinAnsiEncoding (lettere accentate comprese)"""
+    dati = testo.encode('cp1252', errors='replace')
+    return b'(' + dati.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _numero(valore: float) -> str:
+    return f'{valore:.2f}'.rstrip('0').rstrip('.')
+
+
+class ScrittorePDF:
+    """
+    Scrive un PDF su un file binario, pagina per pagina
+
+        with open(percorso, 'wb') as f:
+            pdf = ScrittorePDF(f)
+            pagina = PaginaPDF()
+            pagina.testo(50, 800, "Ciao", corpo=12)
+            pdf.aggiungi_pagina(pagina)
+            pdf.chiudi()
+
+    Non serve un file posizionabile: le posizioni degli oggetti si contano
+    dai byte scritti.
+    """
+
+    # Oggetti con numero fisso: il catalogo, l'albero delle pagine e le
+    # risorse si scrivono alla fine, ma le pagine li citano da subito
+    _CATALOGO = 1
+    _PAGINE = 2
+    _RISORSE = 3
+
+    def __init__(self, f: BinaryIO, titolo: str = '', comprimi: bool = True):
+        """
+        Args:
+            f: File binario aperto in scrittura
+            titolo: Titolo nelle proprietà del documento
+            comprimi: Comprime i contenuti delle pagine (FlateDecode)
+        """
+        self.f = f
+        self.titolo = titolo
+        self.comprimi = comprimi
+        self.pagine = 0
+        self._posizione = 0
+        self._offset = {}  # numero oggetto -> posizione nel file
+        self._prossimo = 4
+        self._id_pagine: List[int] = []
+        self._font = {}
+        self._immagini = {}
+
+        self._scrivi(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._font['F1'] = self._oggetto(
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>'
+        )
+        self._font['F2'] = self._oggetto(
+            b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>'
+        )
+
+    def _scrivi(self, dati: bytes):
+        self.f.write(dati)
+        self._posizione += len(dati)
+
+    def _nuovo_id(self) -> int:
+        numero = self._prossimo
+        self._prossimo += 1
+        return numero
+
+    def _oggetto(self, corpo: bytes, numero: int = None) -> int:
+        """Scrive un oggetto e ne registra la posizione"""
+        if numero is None:
+            numero = self._nuovo_id()
+        self._offset[numero] = self._posizione
+        self._scrivi(b'%d 0 obj\n' % numero + corpo + b'\nendobj\n')
+        return numero
+
+    def _flusso(self, dizionario: bytes, dati: bytes, comprimi: bool) -> int:
+        """Scrive un oggetto stream (compresso se richiesto)"""
+        if comprimi:
+            dati = zlib.compress(dati, 6)
+            dizionario += b' /Filter /FlateDecode'
+        return self._oggetto(
+            b'<< ' + dizionario + b' /Length %d >>\nstream\n' % len(dati) + dati + b'\nendstream'
+        )
+
+    def aggiungi_immagine_rgba(self, buffer, larghezza: int, altezza: int) -> str:
+        """
+        Aggiunge un'immagine da un buffer RGBA (prima riga in alto)
+
+        L'immagine è scritta subito e una sola volta; il nome restituito
+        ("Im1") si usa in PaginaPDF.immagine() su qualsiasi pagina.
+        """
+        rgba = bytes(buffer)
+        rgb = bytearray(larghezza * altezza * 3)
+        rgb[0::3] = rgba[0::4]
+        rgb[1::3] = rgba[1::4]
+        rgb[2::3] = rgba[2::4]
+        numero = self._flusso(
+            b'/Type /XObject /Subtype /Image /Width %d /Height %d '
+            b'/ColorSpace /DeviceRGB /BitsPerComponent 8' % (larghezza, altezza),
+            bytes(rgb), comprimi=True
+        )
+        nome = f'Im{len(self._immagini) + 1}'
+        self._immagini[nome] = numero
+        return nome
+
+    def aggiungi_pagina(self, pagina: 'PaginaPDF'):
+        """Scrive contenuto e oggetto di una pagina completa"""
+        contenuto = self._flusso(b'', pagina.contenuto(), self.comprimi)
+        self._id_pagine.append(self._oggetto(
+            b'<< /Type /Page /Parent %d 0 R /Resources %d 0 R /Contents %d 0 R >>'
+            % (self._PAGINE, self._RISORSE, contenuto)
+        ))
+        self.pagine += 1
+
+    def chiudi(self):
+        """Scrive risorse, albero delle pagine, catalogo, xref e trailer"""
+        font = b' '.join(b'/%s %d 0 R' % (nome.encode(), numero) for nome, numero in self._font.items())
+        risorse = b'<< /ProcSet [/PDF /Text /ImageC] /Font << ' + font + b' >>'
+        if self._immagini:
+            immagini = b' '.join(b'/%s %d 0 R' % (nome.encode(), numero)
+                                 for nome, numero in self._immagini.items())
+            risorse += b' /XObject << ' + immagini + b' >>'
+        self._oggetto(risorse + b' >>', self._RISORSE)
+
+        figli = b' '.join(b'%d 0 R' % numero for numero in self._id_pagine)
+        self._oggetto(
+            b'<< /Type /Pages /Kids [' + figli + b'] /Count %d '
+            b'/MediaBox [0 0 %s %s] >>' % (len(self._id_pagine), _numero(LARGHEZZA_PAGINA).encode(),
+                                            _numero(ALTEZZA_PAGINA).encode()),
+            self._PAGINE
+        )
+        self._oggetto(b'<< /Type /Catalog /Pages %d 0 R >>' % self._PAGINE, self._CATALOGO)
+        data = datetime.now().strftime("D:%Y%m%d%H%M%S")
+        info = self._oggetto(
+            b'<< /Title ' + _stringa(self.titolo) + b' /Producer (University Manager)'
+            b' /CreationDate (' + data.encode() + b') >>'
+        )
+
+        inizio_xref = self._posizione
+        totale = self._prossimo
+        righe = [b'xref\n0 %d\n' % totale, b'0000000000 65535 f \n']
+        for numero in range(1, totale):
+            righe.append(b'%010d 00000 n \n' % self._offset[numero])
+        self._scrivi(b''.join(righe))
+        self._scrivi(
+            b'trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (totale, self._CATALOGO, info, inizio_xref)
+        )
+
+
+class PaginaPDF:
+    """Operatori di disegno di una pagina (coordinate in punti, origine in basso)"""
+
+    def __init__(self):
+        self._operatori: List[bytes] = []
+
+    def testo(self, x: float, y: float, testo: str, corpo: float = 10,
+              grassetto: bool = False, colore: Tuple[float, float, float] = (0, 0, 0)):
+        font = b'F2' if grassetto else b'F1'
+        self._operatori.append(
+            b'BT /%s %s Tf %s rg %s %s Td %s Tj ET' % (
+                font, _numero(corpo).encode(), ' '.join(map(_numero, colore)).encode(),
+                _numero(x).encode(), _numero(y).encode(), _stringa(testo)
+            )
+        )
+
+    def rettangolo(self, x: float, y: float, larghezza: float, altezza: float,
+                   colore: Tuple[float, float, float]):
+        self._operatori.append(b'%s rg %s %s %s %s re f' % (
+            ' '.join(map(_numero, colore)).encode(), _numero(x).encode(), _numero(y).encode(),
+            _numero(larghezza).encode(), _numero(altezza).encode()
+        ))
+
+    def linea(self, x1: float, y1: float, x2: float, y2: float,
+              colore: Tuple[float, float, float], spessore: float = 0.5):
+        self._operatori.append(b'%s RG %s w %s %s m %s %s l S' % (
+            ' '.join(map(_numero, colore)).encode(), _numero(spessore).encode(),
+            _numero(x1).encode(), _numero(y1).encode(), _numero(x2).encode(), _numero(y2).encode()
+        ))
+
+    def immagine(self, nome: str, x: float, y: float, larghezza: float, altezza: float):
+        """Disegna un'immagine aggiunta con ScrittorePDF.aggiungi_immagine_rgba"""
+        self._operatori.append(b'q %s 0 0 %s %s %s cm /%s Do Q' % (
+            _numero(larghezza).encode(), _numero(altezza).encode(),
+            _numero(x).encode(), _numero(y).encode(), nome.encode()
+        ))
+
+    def contenuto(self) -> bytes:
+        return b'\n'.join(self._operatori)
+
+
+def _intestazione_tabella(pagina: PaginaPDF, y: float):
+    """Fascia blu con i titoli delle colonne; restituisce la y della prima riga"""
+    pagina.rettangolo(MARGINE, y - ALTEZZA_RIGA, LARGHEZZA_PAGINA - 2 * MARGINE, ALTEZZA_RIGA, BLU)
+    for titolo, x, _ in COLONNE:
+        pagina.testo(MARGINE + x + 4, y - ALTEZZA_RIGA + 4.5, titolo, CORPO_TABELLA,
+                     grassetto=True, colore=(1, 1, 1))
+    return y - ALTEZZA_RIGA
+
+
+def _piede(pagina: PaginaPDF, numero: int, titolo: str):
+    pagina.testo(MARGINE, MARGINE / 2, titolo, 8, colore=GRIGIO_TESTO)
+    etichetta = f"Pagina {numero}"
+    pagina.testo(LARGHEZZA_PAGINA - MARGINE - larghezza_testo(etichetta, 8), MARGINE / 2,
+                 etichetta, 8, colore=GRIGIO_TESTO)
+
+
+def esporta_carriera_pdf(voti: Iterable[Voto], stats: StatisticheVoti, laurea: Laurea,
+                         filepath, grafico: Optional[tuple] = None) -> int:
+    """
+    PDF della carriera: statistiche, grafico (opzionale) e tabella dei voti
+
+    La tabella continua su quante pagine servono, con l'intestazione
+    ripetuta; ogni pagina è scritta appena piena, quindi i voti possono
+    arrivare da un generatore.
+
+    Args:
+        voti: Voti in ordine di tabella
+        stats: Statistiche della laurea
+        laurea: Laurea esportata
+        filepath: File PDF di output
+        grafico: (buffer RGBA, larghezza, altezza) da grafici.disegna_andamento
+
+    Returns:
+        Numero di pagine scritte
+    """
+    titolo = f"Carriera - {laurea.nome}"
+    with open(filepath, 'wb') as f:
+        pdf = ScrittorePDF(f, titolo=titolo)
+        immagine = pdf.aggiungi_immagine_rgba(*grafico) if grafico else None
+
+        # Prima pagina: titolo, statistiche e grafico sopra la tabella
+        pagina = PaginaPDF()
+        y = ALTEZZA_PAGINA - MARGINE
+        pagina.testo(MARGINE, y - 20, titolo, 20, grassetto=True, colore=BLU)
+        y -= 50
+        riepilogo = (
+            ("Media", stats.media_display),
+            ("Voto di laurea", f"{stats.voto_laurea}/110"),
+            ("Crediti", f"{stats.crediti_acquisiti}/{stats.crediti_totali} "
+                        f"({stats.percentuale_display})"),
+            ("Esami sostenuti", str(stats.esami_sostenuti)),
+        )
+        for etichetta, valore in riepilogo:
+            pagina.testo(MARGINE, y, f"{etichetta}:", 11, grassetto=True)
+            pagina.testo(MARGINE + 110, y, valore, 11)
+            y -= 16
+        if immagine:
+            _, larghezza, altezza = grafico
+            scala = min(1.0, (LARGHEZZA_PAGINA - 2 * MARGINE) / larghezza)
+            y -= altezza * scala + 10
+            pagina.immagine(immagine, MARGINE, y, larghezza * scala, altezza * scala)
+        y = _intestazione_tabella(pagina, y - 20)
+
+        for voto in voti:
+            if y - ALTEZZA_RIGA < MARGINE:
+                _piede(pagina, pdf.pagine + 1, titolo)
+                pdf.aggiungi_pagina(pagina)
+                pagina = PaginaPDF()
+                y = _intestazione_tabella(pagina, ALTEZZA_PAGINA - MARGINE)
+
+            y -= ALTEZZA_RIGA
+            celle = (voto.materia, voto.data_formattata, str(voto.crediti), voto.voto_display)
+            for testo, (_, x, larghezza) in zip(celle, COLONNE):
+                pagina.testo(MARGINE + x + 4, y + 4.5, tronca(testo, CORPO_TABELLA, larghezza - 8),
+                             CORPO_TABELLA)
+            pagina.linea(MARGINE, y, LARGHEZZA_PAGINA - MARGINE, y, GRIGIO_LINEE)
+
+        _piede(pagina, pdf.pagine + 1, titolo)
+        pdf.aggiungi_pagina(pagina)
+        pdf.chiudi()
+    return pdf.pagine
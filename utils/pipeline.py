@@ -0,0 +1,304 @@
+# utils/pipeline.py
+"""
+Esportazione della carriera in più formati con una sola lettura
+
+I voti si leggono una volta e le statistiche si calcolano una volta; i
+blocchi di voti passano poi a ogni destinazione (CSV, JSON, HTML, PDF)
+attraverso una coda limitata. Ogni destinazione scrive su un suo thread,
+così i formati avanzano insieme e il tempo totale si avvicina a quello
+del formato più lento, non alla somma. La coda limitata tiene in memoria
+al più pochi blocchi anche se una destinazione resta indietro.
+
+    pipeline = PipelineEsportazione([
+        DestinazioneCSV(cartella / 'voti.csv'),
+        DestinazioneHTML(cartella / 'report.html', grafico=True),
+    ])
+    risultati = pipeline.esegui(voti, laurea)
+"""
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from core.calculator import StatisticheIncrementali
+from core.models import Laurea, StatisticheVoti, Voto
+from .exporters import ScrittoreCSV, ScrittoreJSON, StatisticheEsportazione
+
+# Voti in ogni blocco passato alle destinazioni
+DIMENSIONE_BLOCCO = 500
+
+# Blocchi in attesa per ogni destinazione prima che la lettura si fermi
+CODA_MASSIMA = 8
+
+# Colonne del CSV, come in EsportatoreStatistiche.esporta_csv
+COLONNE_CSV = ['Materia', 'Data', 'Crediti', 'Voto']
+
+# Segnali di fine nella coda: lettura completata o interrotta
+_FINE = object()
+_INTERROTTA = object()
+
+
+class EsportazioneInterrotta(Exception):
+    """La lettura dei voti è fallita: le destinazioni si fermano"""
+
+
+class _Flusso:
+    """Voti di una coda, blocco dopo blocco, fino al segnale di fine"""
+
+    def __init__(self, coda: queue.Queue):
+        self.coda = coda
+        self.finito = False
+
+    def __iter__(self):
+        while True:
+            blocco = self.coda.get()
+            if blocco is _FINE:
+                self.finito = True
+                return
+            if blocco is _INTERROTTA:
+                self.finito = True
+                raise EsportazioneInterrotta("Lettura dei voti interrotta")
+            yield from blocco
+
+    def scarta(self):
+        """Consuma la coda senza usarla (la destinazione è uscita prima)"""
+        while not self.finito:
+            blocco = self.coda.get()
+            self.finito = blocco is _FINE or blocco is _INTERROTTA
+
+
+class Destinazione:
+    """
+    Un formato di uscita della pipeline
+
+    Le sottoclassi definiscono esporta(); con serve_elenco ricevono la
+    lista completa dei voti invece del flusso (per esempio per il grafico,
+    che ha bisogno di tutti i punti prima della tabella).
+    """
+
+    formato = ''
+    serve_elenco = False
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+
+    def esporta(self, voti: Iterable[Voto], stats: StatisticheVoti, laurea: Laurea) -> int:
+        """Scrive il file e restituisce il numero di voti scritti"""
+        raise NotImplementedError
+
+
+class DestinazioneCSV(Destinazione):
+    """CSV con le colonne di EsportatoreStatistiche.esporta_csv"""
+
+    formato = 'csv'
+
+    def esporta(self, voti, stats, laurea):
+        with ScrittoreCSV(self.filepath, colonne=COLONNE_CSV) as scrittore:
+            scrittore.scrivi_tutte(
+                {'Materia': voto.materia, 'Data': voto.data_formattata,
+                 'Crediti': voto.crediti, 'Voto': voto.voto_display}
+                for voto in voti
+            )
+        return scrittore.statistiche.righe
+
+
+class DestinazioneJSON(Destinazione):
+    """JSON come EsportatoreStatistiche.esporta_json"""
+
+    formato = 'json'
+
+    def esporta(self, voti, stats, laurea):
+        campi = {'esportato_il': datetime.now().isoformat()}
+        with ScrittoreJSON(self.filepath, chiave='voti', campi=campi) as scrittore:
+            scrittore.scrivi_tutte(voti)
+        return scrittore.statistiche.righe
+
+
+class DestinazioneHTML(Destinazione):
+    """Report HTML (vedi utils.report_html)"""
+
+    formato = 'html'
+
+    def __init__(self, filepath, grafico: bool = False):
+        super().__init__(filepath)
+        self.grafico = grafico
+        self.serve_elenco = grafico
+
+    def esporta(self, voti, stats, laurea):
+        from .report_html import genera_report_voti
+
+        return genera_report_voti(voti, stats, laurea, self.filepath, grafico=self.grafico)
+
+
+class DestinazionePDF(Destinazione):
+    """PDF della carriera (vedi utils.pdf), con il grafico se matplotlib c'è"""
+
+    formato = 'pdf'
+
+    def __init__(self, filepath, grafico: bool = False):
+        super().__init__(filepath)
+        self.grafico = grafico
+        self.serve_elenco = grafico
+
+    def esporta(self, voti, stats, laurea):
+        from .pdf import esporta_carriera_pdf
+
+        immagine = None
+        if self.grafico and voti:
+            try:
+                from .grafici import disegna_andamento
+                immagine = disegna_andamento(voti, 700, 260)
+            except ImportError:
+                pass  # matplotlib è opzionale: il PDF esce senza grafico
+
+        conteggio = _Conteggio(voti)
+        esporta_carriera_pdf(conteggio, stats, laurea, self.filepath, grafico=immagine)
+        return conteggio.voti
+
+
+class _Conteggio:
+    """Iterabile che conta i voti passati (esporta_carriera_pdf conta le pagine)"""
+
+    def __init__(self, voti: Iterable[Voto]):
+        self._voti = voti
+        self.voti = 0
+
+    def __iter__(self):
+        for voto in self._voti:
+            self.voti += 1
+            yield voto
+
+
+class PipelineEsportazione:
+    """Legge i voti una volta e li distribuisce a più destinazioni"""
+
+    def __init__(self, destinazioni: List[Destinazione], blocco: int = DIMENSIONE_BLOCCO,
+                 coda: int = CODA_MASSIMA):
+        """
+        Args:
+            destinazioni: Formati da scrivere (un thread ciascuno)
+            blocco: Voti per blocco
+            coda: Blocchi in attesa per destinazione
+        """
+        if not destinazioni:
+            raise ValueError("Serve almeno una destinazione")
+        self.destinazioni = destinazioni
+        self.blocco = blocco
+        self.coda = coda
+
+    def esegui(self, voti: Iterable[Voto], laurea: Laurea,
+               stats: Optional[StatisticheVoti] = None) -> Dict[str, StatisticheEsportazione]:
+        """
+        Scrive tutte le destinazioni
+
+        Con stats già note e nessuna destinazione che chieda l'elenco, i
+        voti passano a flusso (anche da un generatore); altrimenti vengono
+        letti una volta in una lista, da cui si calcolano le statistiche.
+
+        Args:
+            voti: Voti in ordine di tabella
+            laurea: Laurea esportata
+            stats: Statistiche della laurea (None: calcolate qui)
+
+        Returns:
+            Statistiche per destinazione, con chiave il formato (o il nome
+            del file se due destinazioni hanno lo stesso formato)
+
+        Raises:
+            La prima eccezione di una destinazione o della lettura; le
+            altre destinazioni completano o chiudono comunque i loro file
+        """
+        elenco = None
+        if stats is None or any(d.serve_elenco for d in self.destinazioni):
+            elenco = voti if isinstance(voti, list) else list(voti)
+            if stats is None:
+                stats = StatisticheIncrementali(laurea, elenco).statistiche()
+
+        flussi = {d: _Flusso(queue.Queue(self.coda))
+                  for d in self.destinazioni if not d.serve_elenco}
+
+        with ThreadPoolExecutor(max_workers=len(self.destinazioni),
+                                thread_name_prefix='esportazione') as executor:
+            futuri = [
+                executor.submit(self._scrivi, d, flussi.get(d, elenco), flussi.get(d), stats, laurea)
+                for d in self.destinazioni
+            ]
+            if flussi:
+                self._distribuisci(elenco if elenco is not None else voti, list(flussi.values()))
+            risultati = [futuro.result() for futuro in futuri]
+
+        formati = [d.formato for d in self.destinazioni]
+        return {
+            (d.formato if formati.count(d.formato) == 1 else d.filepath.name): risultato
+            for d, risultato in zip(self.destinazioni, risultati)
+        }
+
+    def _distribuisci(self, voti: Iterable[Voto], flussi: List[_Flusso]):
+        """Lettura: ogni blocco va in tutte le code (la stessa lista, solo letta)"""
+        voti = iter(voti)
+        fine = _INTERROTTA
+        try:
+            while True:
+                blocco = list(islice(voti, self.blocco))
+                if not blocco:
+                    break
+                for flusso in flussi:
+                    flusso.coda.put(blocco)
+            fine = _FINE
+        finally:
+            for flusso in flussi:
+                flusso.coda.put(fine)
+
+    @staticmethod
+    def _scrivi(destinazione: Destinazione, voti, flusso: Optional[_Flusso],
+                stats: StatisticheVoti, laurea: Laurea) -> StatisticheEsportazione:
+        """Lavoro di una destinazione, sul suo thread"""
+        inizio = time.perf_counter()
+        try:
+            righe = destinazione.esporta(voti, stats, laurea)
+        finally:
+            # Una destinazione fallita (o uscita prima) non deve bloccare la lettura
+            if flusso is not None:
+                flusso.scarta()
+        return StatisticheEsportazione(
+            righe=righe,
+            byte=destinazione.filepath.stat().st_size,
+            secondi=time.perf_counter() - inizio
+        )
+
+
+def esporta_formati(voti: Iterable[Voto], laurea: Laurea, cartella,
+                    formati: Iterable[str] = ('csv', 'json', 'html', 'pdf'),
+                    stats: Optional[StatisticheVoti] = None,
+                    grafico: bool = False) -> Dict[str, StatisticheEsportazione]:
+    """
+    Esporta la carriera in più formati in una cartella
+
+    I file si chiamano voti.csv, voti.json, report.html e carriera.pdf.
+
+    Args:
+        voti: Voti in ordine di tabella
+        laurea: Laurea esportata
+        cartella: Cartella di output (creata se manca)
+        formati: Formati da scrivere, tra 'csv', 'json', 'html', 'pdf'
+        stats: Statistiche della laurea (None: calcolate una volta qui)
+        grafico: Grafico dell'andamento in HTML e PDF (richiede matplotlib)
+    """
+    cartella = Path(cartella)
+    cartella.mkdir(parents=True, exist_ok=True)
+    costruttori = {
+        'csv': lambda: DestinazioneCSV(cartella / 'voti.csv'),
+        'json': lambda: DestinazioneJSON(cartella / 'voti.json'),
+        'html': lambda: DestinazioneHTML(cartella / 'report.html', grafico=grafico),
+        'pdf': lambda: DestinazionePDF(cartella / 'carriera.pdf', grafico=grafico),
+    }
+    destinazioni = []
+    for formato in formati:
+        if formato not in costruttori:
+            raise ValueError(f"Formato non valido: {formato}")
+        destinazioni.append(costruttori[formato]())
+    return PipelineEsportazione(destinazioni).esegui(voti, laurea, stats)
@@ -0,0 +1,225 @@
+# utils/report_html.py
+"""
+Report HTML scritti a sezioni su un file aperto
+
+Ogni sezione viene scritta appena è pronta, quindi tempo e memoria non
+dipendono da quanto è lunga la pagina: le righe della tabella passano una
+alla volta dal generatore dei voti al file. I modelli sono compilati una
+volta sola e ogni testo passa da html.escape.
+"""
+
+import base64
+import html
+from itertools import islice
+from string import Template
+from typing import Iterable, List, TextIO
+
+from core.models import Laurea, StatisticheVoti, Voto
+
+# Righe di ogni pagina della tabella: oltre si apre una nuova tabella, che
+# in stampa parte su un nuovo foglio e nel browser si impagina da sola
+RIGHE_PER_PAGINA = 500
+
+# Dimensioni del grafico incorporato (pixel)
+LARGHEZZA_GRAFICO = 800
+ALTEZZA_GRAFICO = 300
+
+_INIZIO = Template('''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>$titolo</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        h1 { color: #2196F3; }
+        .stats { background: #f5f5f5; padding: 15px; border-radius: 5px; }
+        .grafico { max-width: 100%; margin-top: 20px; }
+        table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+        th, td { padding: 10px; text-align: left; border-bottom: 1px solid #ddd; }
+        th { background: #2196F3; color: white; }
+        .pagina + .pagina { break-before: page; }
+        .pagina h3 { color: #757575; font-weight: normal; }
+    </style>
+</head>
+<body>
+    <h1>$titolo</h1>
+''')
+
+_STATISTICHE = Template('''
+    <div class="stats">
+        <h2>Statistiche</h2>
+        <p><strong>Media:</strong> $media</p>
+        <p><strong>Voto di Laurea:</strong> $voto_laurea/110</p>
+        <p><strong>Crediti:</strong> $crediti_acquisiti/$crediti_totali ($percentuale)</p>
+        <p><strong>Esami sostenuti:</strong> $esami_sostenuti</p>
+    </div>
+''')
+
+_GRAFICO = Template('''
+    <h2>Andamento</h2>
+    <img class="grafico" alt="Andamento dei voti" width="$larghezza" height="$altezza"
+         src="data:image/png;base64,$png">
+''')
+
+_TITOLO_TABELLA = Template('''
+    <h2>$titolo</h2>
+''')
+
+_INIZIO_PAGINA = Template('''
+    <section class="pagina">
+    <h3>Righe $prima–$ultima</h3>
+    <table>
+        <thead>
+            <tr><th>Materia</th><th>Data</th><th>Crediti</th><th>Voto</th></tr>
+        </thead>
+        <tbody>
+''')
+
+_RIGA_VOTO = Template(
+    '            <tr><td>$materia</td><td>$data</td><td>$crediti</td><td>$voto</td></tr>\n'
+)
+
+_FINE_PAGINA = '''        </tbody>
+    </table>
+    </section>
+'''
+
+_NESSUNA_RIGA = Template('''
+    <p>$testo</p>
+''')
+
+_FINE = '''</body>
+</html>
+'''
+
+
+def _e(valore) -> str:
+    """Testo sicuro dentro l'HTML"""
+    return html.escape(str(valore), quote=True)
+
+
+class ReportHTML:
+    """
+    Scrittore di un report HTML su un file già aperto
+
+        with open(percorso, 'w', encoding='utf-8') as f:
+            report = ReportHTML(f)
+            report.inizio("Report Voti")
+            report.tabella_voti(voti)
+            report.fine()
+
+    Le sezioni vanno chiamate nell'ordine in cui devono apparire.
+    """
+
+    def __init__(self, f: TextIO, righe_per_pagina: int = RIGHE_PER_PAGINA):
+        """
+        Args:
+            f: File di testo aperto in scrittura
+            righe_per_pagina: Righe di ogni tabella prima di aprirne un'altra
+        """
+        self.f = f
+        self.righe_per_pagina = righe_per_pagina
+
+    def inizio(self, titolo: str):
+        """Intestazione della pagina e titolo"""
+        self.f.write(_INIZIO.substitute(titolo=_e(titolo)))
+
+    def statistiche(self, stats: StatisticheVoti):
+        """Riquadro con media, voto di laurea e crediti"""
+        self.f.write(_STATISTICHE.substitute(
+            media=_e(stats.media_display),
+            voto_laurea=_e(stats.voto_laurea),
+            crediti_acquisiti=_e(stats.crediti_acquisiti),
+            crediti_totali=_e(stats.crediti_totali),
+            percentuale=_e(stats.percentuale_display),
+            esami_sostenuti=_e(stats.esami_sostenuti)
+        ))
+
+    def grafico_andamento(self, voti: List[Voto], larghezza: int = LARGHEZZA_GRAFICO,
+                          altezza: int = ALTEZZA_GRAFICO):
+        """
+        Grafico dell'andamento come immagine PNG incorporata
+
+        Serve la lista completa dei voti (il grafico ha bisogno di tutti i
+        punti); senza voti la sezione non viene scritta.
+        """
+        if not voti:
+            return
+        from .grafici import andamento_png
+
+        ordinati = sorted(voti, key=lambda voto: voto.data)
+        png = andamento_png(ordinati, larghezza, altezza)
+        self.f.write(_GRAFICO.substitute(
+            larghezza=larghezza,
+            altezza=altezza,
+            png=base64.b64encode(png).decode('ascii')
+        ))
+
+    def tabella_voti(self, voti: Iterable[Voto], titolo: str = "Elenco Voti") -> int:
+        """
+        Tabella dei voti, divisa in pagine di righe_per_pagina righe
+
+        Args:
+            voti: Voti nell'ordine della tabella (anche un generatore)
+            titolo: Titolo della sezione
+
+        Returns:
+            Numero di righe scritte
+        """
+        self.f.write(_TITOLO_TABELLA.substitute(titolo=_e(titolo)))
+        voti = iter(voti)
+        scritte = 0
+        while True:
+            pagina = list(islice(voti, self.righe_per_pagina))
+            if not pagina:
+                break
+            self.f.write(_INIZIO_PAGINA.substitute(prima=scritte + 1, ultima=scritte + len(pagina)))
+            self.f.writelines(
+                _RIGA_VOTO.substitute(
+                    materia=_e(voto.materia),
+                    data=_e(voto.data_formattata),
+                    crediti=_e(voto.crediti),
+                    voto=_e(voto.voto_display)
+                )
+                for voto in pagina
+            )
+            self.f.write(_FINE_PAGINA)
+            scritte += len(pagina)
+
+        if scritte == 0:
+            self.f.write(_NESSUNA_RIGA.substitute(testo=_e("Nessun voto registrato.")))
+        return scritte
+
+    def fine(self):
+        """Chiude la pagina"""
+        self.f.write(_FINE)
+
+
+def genera_report_voti(voti: Iterable[Voto], stats: StatisticheVoti, laurea: Laurea,
+                       filepath: str, grafico: bool = False,
+                       righe_per_pagina: int = RIGHE_PER_PAGINA) -> int:
+    """
+    Report completo dei voti di una laurea
+
+    Args:
+        voti: Voti da elencare (a flusso, salvo che serva il grafico)
+        stats: Statistiche della laurea
+        laurea: Laurea del report
+        filepath: File HTML di output
+        grafico: Incorpora il grafico dell'andamento (richiede matplotlib;
+            i voti vengono letti tutti in memoria per disegnarlo)
+        righe_per_pagina: Righe di ogni pagina della tabella
+
+    Returns:
+        Numero di voti nella tabella
+    """
+    with open(filepath, 'w', encoding='utf-8') as f:
+        report = ReportHTML(f, righe_per_pagina)
+        report.inizio(f"Report Voti - {laurea.nome}")
+        report.statistiche(stats)
+        if grafico:
+            voti = list(voti)
+            report.grafico_andamento(voti)
+        scritte = report.tabella_voti(voti)
+        report.fine()
+    return scritte